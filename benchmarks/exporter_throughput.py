@@ -0,0 +1,72 @@
+"""
+Скорость записи результатов в каждом формате выгрузки.
+
+Пишет синтетические строки через потоковый интерфейс экспортеров и выводит
+строк в секунду, время закрытия файла и размер файла.
+
+Запуск:
+    python -m benchmarks.exporter_throughput --rows 100000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.utils.exporters import get_exporter_classes
+
+
+def make_row(i):
+    return {
+        'url': f"https://www.ozon.ru/product/tovar-nomer-{i}-{100000000 + i}/",
+        'product_name': f"Смартфон тестовый модель {i % 500}, 128 ГБ, черный",
+        'company_name': f"ООО \"Продавец {i % 300}\"",
+        'image_url': f"https://ir.ozone.ru/s3/multimedia-{i % 10}/wc1000/{6000000000 + i}.jpg",
+        'status': 'out_of_stock' if i % 7 == 0 else 'success'
+    }
+
+
+def run_format(extension, exporter_class, rows, output_dir):
+    """Запись rows строк: (строк/с, время закрытия, размер файла) или None"""
+    exporter = exporter_class('benchmark', extension, output_dir)
+    if not exporter.open_stream():
+        return None
+
+    start = time.perf_counter()
+    for i in range(rows):
+        exporter.append_result(make_row(i))
+    write_time = time.perf_counter() - start
+
+    close_start = time.perf_counter()
+    if not exporter.close_stream():
+        return None
+    close_time = time.perf_counter() - close_start
+
+    total_time = write_time + close_time
+    return rows / total_time, close_time, os.path.getsize(exporter.get_filename())
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Скорость записи форматов выгрузки")
+    arg_parser.add_argument('--rows', type=int, default=50000)
+    arg_parser.add_argument('--formats', nargs='*', default=None, help="По умолчанию все форматы")
+    args = arg_parser.parse_args()
+
+    exporter_classes = get_exporter_classes()
+    formats = args.formats or list(exporter_classes)
+
+    print(f"{'формат':<10}{'строк/с':>12}{'закрытие, с':>14}{'размер, МБ':>13}")
+    with tempfile.TemporaryDirectory() as output_dir:
+        for extension in formats:
+            result = run_format(extension, exporter_classes[extension], args.rows, output_dir)
+            if result is None:
+                print(f"{extension:<10}{'недоступен':>12}")
+                continue
+            rows_per_second, close_time, size = result
+            print(f"{extension:<10}{rows_per_second:>12.0f}{close_time:>14.2f}{size / 1024 / 1024:>13.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,238 @@
+"""
+Сквозная скорость парсинга на локальном стенде Ozon без обращений к живому сайту.
+
+Генерирует синтетический сайт (benchmarks/standin_site.py), поднимает стенд с
+заданной задержкой и для каждого числа воркеров в отдельном процессе собирает
+ссылки категории (OzonLinkParser) и парсит товары (OzonProductParser) в
+headless Chrome. Выводит товаров в минуту, p50/p95 времени страницы, время
+сбора ссылок и пиковую память процесса вместе с браузерами.
+
+Запуск:
+    python -m benchmarks.scrape_throughput --workers 1 4 8 --products 200 --latency 0.2 --jitter 0.1
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.standin_site import build_site
+from src.utils.standin_server import StandinServer
+
+RESULT_PREFIX = "BENCHMARK_RESULT "
+
+
+def percentile(values, share):
+    """Перцентиль по ближайшему рангу"""
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, max(0, int(round(share * len(values))) - 1))]
+
+
+def process_tree_rss(pid):
+    """Суммарный RSS процесса и всех его потомков (байты, Linux /proc). None - недоступно"""
+    if not os.path.isdir('/proc'):
+        return None
+    children = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat', 'r') as f:
+                # Имя процесса в скобках может содержать пробелы: ppid - второе поле после него
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+
+    total = 0
+    stack = [pid]
+    while stack:
+        current = stack.pop()
+        stack.extend(children.get(current, []))
+        try:
+            with open(f'/proc/{current}/status', 'r') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        total += int(line.split()[1]) * 1024
+                        break
+        except OSError:
+            continue
+    return total
+
+
+def run_configuration(args, base_url, category_path, workers, output_dir):
+    """Запуск одного числа воркеров в отдельном процессе с замером пиковой памяти"""
+    run_dir = os.path.join(output_dir, f"workers-{workers}")
+    os.makedirs(run_dir, exist_ok=True)
+    command = [
+        sys.executable, os.path.abspath(__file__), '--child',
+        '--base-url', base_url, '--category-path', category_path,
+        '--workers', str(workers), '--tabs', str(args.tabs)
+    ]
+    if args.adaptive:
+        command.append('--adaptive')
+    if args.rate_limit:
+        command.append('--rate-limit')
+
+    # Процесс парсера работает в своем каталоге: кэш, журналы и выгрузка не смешиваются между запусками
+    env = dict(os.environ, OZON_BASE_URL=base_url)
+    log_path = os.path.join(run_dir, 'benchmark.log')
+    with open(log_path, 'w', encoding='utf-8') as log_file:
+        process = subprocess.Popen(command, cwd=run_dir, env=env, stdout=subprocess.PIPE,
+                                   stderr=None if args.verbose else log_file, text=True)
+        peak_rss = [None]
+        stop = threading.Event()
+
+        def sample_rss():
+            while not stop.wait(0.5):
+                rss = process_tree_rss(process.pid)
+                if rss is not None:
+                    peak_rss[0] = max(peak_rss[0] or 0, rss)
+
+        sampler = threading.Thread(target=sample_rss, daemon=True)
+        sampler.start()
+        output, _ = process.communicate()
+        stop.set()
+        sampler.join()
+
+    for line in output.splitlines():
+        if line.startswith(RESULT_PREFIX):
+            result = json.loads(line[len(RESULT_PREFIX):])
+            result['peak_rss'] = peak_rss[0]
+            return result
+    print(f"Запуск с {workers} воркерами завершился без результата, журнал: {log_path}")
+    return None
+
+
+def run_child(args):
+    """Процесс одного замера: сбор ссылок и парсинг товаров на стенде"""
+    import logging
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    from src.parser import main_parser
+    from src.parser.main_parser import OzonProductParser
+    from src.parser.link_parser import OzonLinkParser
+    from src.utils.driver_manager import get_driver_pool, shutdown_driver_pool
+    from src.utils.rate_limiter import get_rate_limiter
+
+    class BenchmarkParser(OzonProductParser):
+        """Парсер, запоминающий время каждой страницы и итоговые статусы"""
+
+        def __init__(self, *parser_args, **kwargs):
+            super().__init__(*parser_args, **kwargs)
+            self.page_latencies = []
+            self.status_counts = {}
+
+        def _finish_url(self, driver, worker_id, url, result):
+            with self.results_lock:
+                self.page_latencies.append(result.get('latency', 0))
+            return super()._finish_url(driver, worker_id, url, result)
+
+        def _record_result(self, worker_id, url, result):
+            with self.results_lock:
+                status = result.get('status', 'success')
+                self.status_counts[status] = self.status_counts.get(status, 0) + 1
+            super()._record_result(worker_id, url, result)
+
+    # Замер при фиксированном числе воркеров и без паузы перед повторным проходом
+    main_parser.CONCURRENCY_ADAPTIVE = args.adaptive
+    main_parser.RETRY_COOLDOWN = 0
+    if not args.rate_limit:
+        get_rate_limiter().host_limits[urlsplit(args.base_url).hostname] = (1000.0, 1000)
+
+    pool = get_driver_pool()
+    try:
+        # Запуск браузеров не входит в замер
+        warmup_start = time.perf_counter()
+        pool.warm_up(args.workers + 1)
+        warmup_time = time.perf_counter() - warmup_start
+
+        links_start = time.perf_counter()
+        success, links = OzonLinkParser(args.base_url + args.category_path, base_url=args.base_url).run()
+        links_time = time.perf_counter() - links_start
+        if not success or not links:
+            print(RESULT_PREFIX + json.dumps({'workers': args.workers, 'error': 'ссылки не собраны'}))
+            return
+
+        parser = BenchmarkParser('benchmark', force_refresh=True, tabs_per_worker=args.tabs)
+        parser.worker_count = args.workers
+        products_start = time.perf_counter()
+        parser.run(list(links))
+        products_time = time.perf_counter() - products_start
+    finally:
+        shutdown_driver_pool()
+
+    print(RESULT_PREFIX + json.dumps({
+        'workers': args.workers,
+        'products': parser.processed_count,
+        'products_per_minute': parser.processed_count / products_time * 60 if products_time else 0.0,
+        'p50': percentile(parser.page_latencies, 0.5),
+        'p95': percentile(parser.page_latencies, 0.95),
+        'links': len(links),
+        'links_time': links_time,
+        'warmup_time': warmup_time,
+        'statuses': parser.status_counts
+    }, ensure_ascii=False), flush=True)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Скорость парсинга на локальном стенде Ozon")
+    arg_parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 8])
+    arg_parser.add_argument('--tabs', type=int, default=1, help="Вкладок на воркера")
+    arg_parser.add_argument('--products', type=int, default=200, help="Товаров в категории (не больше TOTAL_LINKS)")
+    arg_parser.add_argument('--latency', type=float, default=0.2, help="Задержка ответа стенда (секунды)")
+    arg_parser.add_argument('--jitter', type=float, default=0.1, help="Случайная добавка к задержке (секунды)")
+    arg_parser.add_argument('--out-of-stock', type=float, default=0.05, help="Доля товаров не в наличии")
+    arg_parser.add_argument('--access-denied', type=float, default=0.02, help="Доля страниц блокировки")
+    arg_parser.add_argument('--missing-seller', type=float, default=0.02, help="Доля товаров без продавца")
+    arg_parser.add_argument('--seed', type=int, default=1)
+    arg_parser.add_argument('--adaptive', action='store_true', help="Адаптивный параллелизм вместо фиксированного")
+    arg_parser.add_argument('--rate-limit', action='store_true', help="Ограничение частоты из конфигурации")
+    arg_parser.add_argument('--verbose', action='store_true', help="Логи парсера в консоль")
+    arg_parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    arg_parser.add_argument('--base-url', help=argparse.SUPPRESS)
+    arg_parser.add_argument('--category-path', help=argparse.SUPPRESS)
+    args = arg_parser.parse_args()
+
+    if args.child:
+        args.workers = args.workers[0]
+        run_child(args)
+        return
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        site = build_site(os.path.join(output_dir, 'site'), products=args.products,
+                          out_of_stock=args.out_of_stock, access_denied=args.access_denied,
+                          missing_seller=args.missing_seller, seed=args.seed)
+        server = StandinServer(os.path.join(output_dir, 'site'), latency=args.latency, jitter=args.jitter)
+        base_url = server.start()
+        print(f"Стенд: {base_url}, товаров {args.products} {site['counts']}, "
+              f"задержка {args.latency}+{args.jitter} с")
+
+        print(f"{'воркеры':<9}{'товаров':>9}{'товаров/мин':>13}{'p50, с':>9}{'p95, с':>9}"
+              f"{'ссылки, с':>11}{'пик RSS, МБ':>13}  статусы")
+        try:
+            for workers in args.workers:
+                result = run_configuration(args, base_url, site['category_path'], workers, output_dir)
+                if result is None:
+                    continue
+                if 'error' in result:
+                    print(f"{workers:<9}{result['error']}")
+                    continue
+                rss = f"{result['peak_rss'] / 1024 / 1024:.0f}" if result['peak_rss'] else '-'
+                statuses = ', '.join(f"{status}={count}" for status, count in sorted(result['statuses'].items()))
+                print(f"{workers:<9}{result['products']:>9}{result['products_per_minute']:>13.1f}"
+                      f"{result['p50']:>9.2f}{result['p95']:>9.2f}{result['links_time']:>11.1f}{rss:>13}  {statuses}")
+        finally:
+            server.stop()
+
+
+if __name__ == '__main__':
+    main()
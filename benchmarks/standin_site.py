@@ -0,0 +1,180 @@
+"""
+Синтетический сайт для локального стенда Ozon (src/utils/standin_server.py).
+
+Страницы повторяют разметку, на которую опираются парсеры: лента категории
+с подгрузкой карточек при скролле, карточки товара с галереей, продавцом,
+подгружаемым при скролле к paginator, и тултипом с юридическим названием.
+Доли товаров "нет в наличии", страниц блокировки и товаров без продавца задаются.
+Состояния виджетов (data-state, ?page=N) позволяют прогонять и HTTP-движки.
+"""
+import html
+import json
+import os
+import random
+
+CATEGORY_PATH = "/category/benchmark-10001/"
+
+CATEGORY_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Бенчмарк - категория</title></head>
+<body>
+{states}
+<div id="contentScrollPaginator"><div class="tiles">{tiles}</div></div>
+<script>
+const PAGES = {pages};
+const grid = document.querySelector('#contentScrollPaginator .tiles');
+let page = 1, loading = false;
+function maybeLoad() {{
+    if (loading || page >= PAGES) return;
+    if (window.innerHeight + window.scrollY < document.body.scrollHeight - 1000) return;
+    loading = true;
+    page += 1;
+    fetch('/feed/' + page + '.json').then(r => r.json()).then(tiles => {{
+        grid.insertAdjacentHTML('beforeend', tiles.join(''));
+    }}).finally(() => {{ loading = false; }});
+}}
+window.addEventListener('scroll', maybeLoad);
+</script>
+</body></html>
+"""
+
+TILE = ('<div data-index="{index}" style="height:320px"><a class="tile-clickable-element" href="{path}">'
+        '<img src="/img/{sku}.jpg" width="200" height="200"><span>{name}</span></a></div>')
+
+PRODUCT_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{name} | OZON</title></head>
+<body>
+<div data-widget="webPdpGrid">
+{states}
+{main}
+<div data-widget="webGallery"><img src="https://ir.ozone.ru/s3/multimedia-1/wc1000/{sku}.jpg"></div>
+<div style="height:1600px"></div>
+{seller}
+</div>
+<div class="vue-portal-target" style="display:none"></div>
+<script>
+const portal = document.querySelector('.vue-portal-target');
+document.addEventListener('click', (event) => {{
+    const button = event.target.closest ? event.target.closest('button[data-tooltip]') : null;
+    if (button) {{
+        portal.innerText = button.getAttribute('data-tooltip');
+        portal.style.display = 'block';
+    }} else {{
+        portal.style.display = 'none';
+    }}
+}});
+const paginator = document.querySelector('div[data-widget="paginator"]');
+if (paginator) {{
+    // Секция продавца подгружается с сервера, когда paginator попадает в окно
+    new IntersectionObserver((entries, observer) => {{
+        if (!entries.some(entry => entry.isIntersecting)) return;
+        observer.disconnect();
+        fetch(paginator.getAttribute('data-src')).then(r => r.text()).then(text => {{
+            paginator.insertAdjacentHTML('afterend', text);
+        }});
+    }}).observe(paginator);
+}}
+</script>
+</body></html>
+"""
+
+SELLER_WIDGET = ('<div data-widget="webCurrentSeller"><div class="seller"><div>'
+                 '<a title="{name}" href="/seller/{slug}-{seller_id}/">{name}</a></div>'
+                 '<button aria-label="" data-tooltip="{tooltip}" style="width:24px;height:24px;padding:0">'
+                 '<svg width="16" height="16"><circle cx="8" cy="8" r="7"></circle></svg></button>'
+                 '</div></div>')
+
+ACCESS_DENIED_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Доступ ограничен</title></head>
+<body><h1>Доступ ограничен</h1></body></html>
+"""
+
+
+def widget_states(states):
+    """Блоки data-state, как в HTML страницы Ozon"""
+    return '\n'.join(
+        f'<div id="state-{widget}-{index}-default-1" data-state=\'{html.escape(json.dumps(state, ensure_ascii=False))}\'></div>'
+        for index, (widget, state) in enumerate(states.items(), start=1))
+
+
+def build_site(records_dir, products=200, page_size=12, sellers=30, out_of_stock=0.05,
+               access_denied=0.02, missing_seller=0.02, seed=1):
+    """
+    Записывает страницы и manifest.json в records_dir
+
+    Returns:
+        dict: Путь категории и число товаров каждого вида
+    """
+    rng = random.Random(seed)
+    os.makedirs(records_dir, exist_ok=True)
+    manifest = {}
+    counts = {'success': 0, 'out_of_stock': 0, 'access_denied': 0, 'missing_seller': 0}
+
+    def write(path, file_name, body, status=200, content_type='text/html; charset=utf-8'):
+        with open(os.path.join(records_dir, file_name), 'w', encoding='utf-8') as f:
+            f.write(body)
+        manifest[path] = {'file': file_name, 'status': status, 'content_type': content_type}
+
+    for seller_id in range(1, sellers + 1):
+        tooltip = f'ООО "Продавец {seller_id}"\nИНН {7700000000 + seller_id}\nРежим работы: 9:00-21:00'
+        write(f"/widget/seller/{seller_id}.html", f"seller-{seller_id}.html", SELLER_WIDGET.format(
+            name=f"Магазин {seller_id}", slug=f"magazin-{seller_id}", seller_id=seller_id,
+            tooltip=html.escape(tooltip)))
+
+    tiles = []
+    items = []  # Карточки листинга для HTTP-сбора ссылок
+    for index in range(products):
+        sku = 100000000 + index
+        path = f"/product/benchmark-tovar-{index}-{sku}/"
+        name = f"Тестовый товар {index}, модель {index % 97}"
+        tiles.append(TILE.format(index=index, path=path, sku=sku, name=html.escape(name)))
+        items.append({'sku': sku, 'action': {'link': path},
+                      'tileImage': {'items': [{'image': {'link': f"/img/{sku}.jpg"}}]},
+                      'mainState': [{'id': 'name', 'atom': {'textAtom': {'text': name}}}]})
+
+        kind = rng.random()
+        if kind < access_denied:
+            counts['access_denied'] += 1
+            write(path, f"product-{sku}.html", ACCESS_DENIED_PAGE, status=403)
+            continue
+
+        if kind < access_denied + out_of_stock:
+            counts['out_of_stock'] += 1
+            main = f'<div data-widget="webOutOfStock"><p>{html.escape(name)}</p><span>Нет в наличии</span></div>'
+        else:
+            counts['success'] += 1
+            main = f'<div data-widget="webProductHeading"><h1>{html.escape(name)}</h1></div>'
+
+        # Состояния виджетов для HTTP-движка: юридическое название, как на Ozon, только в тултипе
+        states = {'webGallery': {'coverImage': f"https://ir.ozone.ru/s3/multimedia-1/wc1000/{sku}.jpg"}}
+        if main.startswith('<div data-widget="webOutOfStock"'):
+            states['webOutOfStock'] = {'skuName': name}
+        else:
+            states['webProductHeading'] = {'title': name}
+
+        if rng.random() < missing_seller:
+            counts['missing_seller'] += 1
+            seller = ''
+        else:
+            seller_id = rng.randint(1, sellers)
+            seller = f'<div data-widget="paginator" data-src="/widget/seller/{seller_id}.html" style="height:1px"></div>'
+            states['webCurrentSeller'] = {'name': f"Магазин {seller_id}",
+                                          'link': f"/seller/magazin-{seller_id}-{seller_id}/"}
+        write(path, f"product-{sku}.html", PRODUCT_PAGE.format(
+            states=widget_states(states), name=html.escape(name), main=main, sku=sku, seller=seller))
+
+    # Первая страница ленты - в HTML категории, остальные подгружаются при скролле
+    pages = [tiles[start:start + page_size] for start in range(0, len(tiles), page_size)] or [[]]
+    listing = [items[start:start + page_size] for start in range(0, len(items), page_size)] or [[]]
+    write(CATEGORY_PATH, "category.html", CATEGORY_PAGE.format(
+        states=widget_states({'searchResultsV2': {'items': listing[0]}}), tiles=''.join(pages[0]), pages=len(pages)))
+    for page, page_tiles in enumerate(pages[1:], start=2):
+        write(f"/feed/{page}.json", f"feed-{page}.json", json.dumps(page_tiles, ensure_ascii=False),
+              content_type='application/json; charset=utf-8')
+        # Та же страница листинга для HTTP-сбора (?page=N), в формате entrypoint API
+        write(f"{CATEGORY_PATH}?page={page}", f"listing-{page}.json", json.dumps({'widgetStates': {
+            'searchResultsV2-1-default-1': json.dumps({'items': listing[page - 1]}, ensure_ascii=False)
+        }}, ensure_ascii=False), content_type='application/json; charset=utf-8')
+
+    with open(os.path.join(records_dir, 'manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+    return {'category_path': CATEGORY_PATH, 'counts': counts}
@@ -5,6 +5,11 @@ import os
 import tkinter as tk
 from aiogram import Bot, Dispatcher
 from src.bot.register_handlers import register_handlers
+from src.config import DRIVER_POOL_PREWARM, NOTIFY_UNFINISHED_JOBS
+from src.bot.utils import notify_unfinished_jobs
+from src.bot.job_manager import get_job_manager
+from src.utils.driver_manager import get_driver_pool, shutdown_driver_pool
+from src.utils.metrics import start_metrics_server, stop_metrics_server
 
 class BotManager:
     def __init__(self, root, log_manager, utils):
@@ -30,6 +35,20 @@ class BotManager:
             self.dp = Dispatcher()
             register_handlers(self.dp, self.bot)
             
+            # Прогреваем пул браузеров в фоне
+            threading.Thread(
+                target=get_driver_pool().warm_up,
+                args=(DRIVER_POOL_PREWARM,),
+                daemon=True
+            ).start()
+            
+            # Эндпоинт метрик Prometheus (если METRICS_ENABLED)
+            start_metrics_server()
+            
+            # Незавершенные задачи после перезапуска можно продолжить командой /resume
+            if NOTIFY_UNFINISHED_JOBS:
+                asyncio.create_task(notify_unfinished_jobs(self.bot))
+            
             self.log_manager.logger.info("Telegram бот инициализирован")
             await self.dp.start_polling(self.bot)
         except Exception as e:
@@ -119,6 +138,10 @@ class BotManager:
             if self.bot:
                 await self.bot.session.close()
                 self.log_manager.logger.info("Сессия бота закрыта")
+            # Сначала останавливаются задачи (журналы и выгрузки завершаются), затем браузеры
+            await get_job_manager().shutdown()
+            await asyncio.get_running_loop().run_in_executor(None, shutdown_driver_pool)
+            await asyncio.get_running_loop().run_in_executor(None, stop_metrics_server)
         except Exception as e:
             self.log_manager.logger.error(f"Ошибка при закрытии сессии бота: {e}")
 
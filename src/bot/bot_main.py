@@ -1,9 +1,11 @@
 """
 Основной модуль Telegram бота
 """
+import asyncio
 import logging
 import sys
 import os
+import threading
 
 # Добавляем корневую директорию в sys.path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
@@ -13,7 +15,11 @@ from aiogram import Bot, Dispatcher
 from .config import BOT_TOKEN
 from .register_handlers import register_handlers
 from .logging_handler import setup_queue_logging
-from src.config import LOG_FILE
+from src.config import LOG_FILE, DRIVER_POOL_PREWARM, NOTIFY_UNFINISHED_JOBS
+from .utils import notify_unfinished_jobs
+from .job_manager import get_job_manager
+from src.utils.driver_manager import get_driver_pool, shutdown_driver_pool
+from src.utils.metrics import start_metrics_server
 
 
 # Настройка логирования
@@ -42,6 +48,20 @@ async def main():
     # Регистрируем обработчики
     register_handlers(dp, bot)
     
+    # Прогреваем пул браузеров в фоне, чтобы первая задача не ждала запуска Chrome
+    threading.Thread(
+        target=get_driver_pool().warm_up,
+        args=(DRIVER_POOL_PREWARM,),
+        daemon=True
+    ).start()
+    
+    # Локальный эндпоинт метрик Prometheus (METRICS_ENABLED=1)
+    start_metrics_server()
+    
+    # Незавершенные задачи после перезапуска можно продолжить командой /resume
+    if NOTIFY_UNFINISHED_JOBS:
+        asyncio.create_task(notify_unfinished_jobs(bot))
+    
     # Запускаем бота
     try:
         await dp.start_polling(bot)
@@ -49,4 +69,7 @@ async def main():
         logger.exception(f"Критическая ошибка бота: {e}")
     finally:
         await bot.session.close()
+        # Выполняющиеся задачи останавливаются и сохраняют журнал для /resume
+        await get_job_manager().shutdown()
+        await asyncio.get_running_loop().run_in_executor(None, shutdown_driver_pool)
         logger.info("Бот остановлен")
\ No newline at end of file
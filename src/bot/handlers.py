@@ -4,6 +4,7 @@
 import asyncio
 import logging
 import os
+import time
 
 from aiogram import Bot, types, F
 from aiogram.fsm.context import FSMContext
@@ -12,18 +13,23 @@ from aiogram.exceptions import TelegramNetworkError, TelegramBadRequest
 
 from .config import TELEGRAM_CHAT_ID
 from .states import ParserState
-from .keywords import BOT_MESSAGES, KEYBOARD_BUTTONS
+from .keywords import BOT_MESSAGES, KEYBOARD_BUTTONS, JOB_STATUS_LABELS
 from .utils import (
     check_access, 
     validate_ozon_url, 
     validate_product_links,
     run_parser_sync, 
     run_product_parser_sync,
+    run_resumed_parser_sync,
+    parse_export_formats,
+    get_unfinished_jobs,
     cleanup_file
 )
 from .logging_handler import LogUpdater
+from .job_manager import get_job_manager
 from .file_utils import validate_file_for_telegram, compress_file
-from src.config import LINKS_OUTPUT_FILE
+from src.config import LINKS_OUTPUT_FILE, EXPORT_FORMATS, get_category_name
+from src.utils.job_journal import reserve_journal, release_journal
 
 logger = logging.getLogger(__name__)
 
@@ -33,6 +39,8 @@ class BotHandlers:
     
     def __init__(self, bot: Bot):
         self.bot = bot
+        self.export_formats = {}  # Форматы выгрузки, выбранные пользователями
+        self.job_manager = get_job_manager()  # Очередь и ограничение одновременных задач
     
     def _get_main_menu_keyboard(self):
         """Возвращает основную клавиатуру меню"""
@@ -100,6 +108,150 @@ class BotHandlers:
             reply_markup=ReplyKeyboardRemove()
         )
     
+    async def cmd_parse_fresh(self, message: types.Message, state: FSMContext):
+        """
+        Обработчик команды /parse_fresh: парсинг категории без кэша результатов
+        
+        Args:
+            message: Сообщение пользователя
+            state: Состояние FSM
+        """
+        await self.cmd_parse(message, state)
+        if check_access(message.from_user.id):
+            await state.update_data(force_refresh=True)
+    
+    async def cmd_parse_products_fresh(self, message: types.Message, state: FSMContext):
+        """
+        Обработчик команды /parse_products_fresh: парсинг товаров без кэша результатов
+        
+        Args:
+            message: Сообщение пользователя
+            state: Состояние FSM
+        """
+        await self.cmd_parse_products(message, state)
+        if check_access(message.from_user.id):
+            await state.update_data(force_refresh=True)
+    
+    async def cmd_format(self, message: types.Message):
+        """
+        Обработчик команды /format: выбор форматов выгрузки для следующих задач
+        
+        Args:
+            message: Сообщение пользователя (например, "/format xlsx csv")
+        """
+        if not check_access(message.from_user.id):
+            await message.answer(BOT_MESSAGES['access_denied'])
+            return
+        
+        args = message.text.split(maxsplit=1)
+        if len(args) < 2:
+            current = self.export_formats.get(message.from_user.id, EXPORT_FORMATS)
+            await message.answer(BOT_MESSAGES['format_help'].format(current=', '.join(current)))
+            return
+        
+        is_valid, formats = parse_export_formats(args[1])
+        if not is_valid:
+            await message.answer(BOT_MESSAGES['invalid_format'])
+            return
+        
+        self.export_formats[message.from_user.id] = formats
+        await message.answer(f"✅ Форматы выгрузки: {', '.join(formats)}")
+    
+    async def cmd_resume(self, message: types.Message, state: FSMContext):
+        """
+        Обработчик команды /resume: продолжение последней прерванной задачи
+        
+        Args:
+            message: Сообщение пользователя
+            state: Состояние FSM
+        """
+        if not check_access(message.from_user.id):
+            await message.answer(BOT_MESSAGES['access_denied'])
+            return
+        
+        journals = get_unfinished_jobs()
+        if not journals:
+            await message.answer(BOT_MESSAGES['no_unfinished_jobs'])
+            return
+        
+        await state.clear()
+        journal_path = journals[0]
+        # Журнал закрепляется до постановки в очередь: повторный /resume не запустит
+        # ту же задачу второй раз, пока первая ждет или выполняется
+        if not reserve_journal(journal_path):
+            await message.answer(BOT_MESSAGES['resume_busy'])
+            return
+        try:
+            await message.answer(f"{BOT_MESSAGES['resume_start']}\n📄 {os.path.basename(journal_path)}")
+            await self._run_job(
+                message,
+                'resume',
+                os.path.basename(journal_path),
+                run_resumed_parser_sync,
+                journal_path,
+                message.from_user.id
+            )
+        finally:
+            release_journal(journal_path)
+    
+    async def cmd_status(self, message: types.Message):
+        """
+        Обработчик команды /status: выполняющиеся, ожидающие и недавние задачи
+        
+        Args:
+            message: Сообщение пользователя
+        """
+        if not check_access(message.from_user.id):
+            await message.answer(BOT_MESSAGES['access_denied'])
+            return
+        
+        running = self.job_manager.get_running()
+        queued = self.job_manager.get_queued()
+        history = self.job_manager.get_history()
+        if not running and not queued and not history:
+            await message.answer(BOT_MESSAGES['no_jobs'])
+            return
+        
+        lines = []
+        if running:
+            lines.append("▶️ <b>Выполняются:</b>")
+            for job in running:
+                progress = job.get_progress()
+                lines.append(f"• #{job.id} {job.title} - {self._format_duration(job.started_at)}"
+                             + (f", товаров {progress}" if progress else ""))
+        if queued:
+            lines.append("⏳ <b>В очереди:</b>")
+            for position, job in enumerate(queued, 1):
+                lines.append(f"• {position}. #{job.id} {job.title}")
+        if history:
+            lines.append("🗂 <b>Завершены:</b>")
+            for job in history:
+                lines.append(f"• #{job.id} {job.title} - {JOB_STATUS_LABELS.get(job.status, job.status)}")
+        lines.append("\nОтменить задачу: /cancel &lt;номер&gt;")
+        await message.answer('\n'.join(lines), parse_mode="HTML")
+    
+    async def cmd_cancel(self, message: types.Message):
+        """
+        Обработчик команды /cancel: отмена задачи из очереди или остановка выполняющейся
+        
+        Args:
+            message: Сообщение пользователя (например, "/cancel 3")
+        """
+        if not check_access(message.from_user.id):
+            await message.answer(BOT_MESSAGES['access_denied'])
+            return
+        
+        args = message.text.split(maxsplit=1)
+        job_id = args[1].strip().lstrip('#') if len(args) > 1 else ''
+        if not job_id.isdigit():
+            await message.answer(BOT_MESSAGES['cancel_help'])
+            return
+        
+        if self.job_manager.cancel(int(job_id)):
+            await message.answer(BOT_MESSAGES['cancel_requested'].format(job_id=job_id))
+        else:
+            await message.answer(BOT_MESSAGES['job_not_found'].format(job_id=job_id))
+    
     async def handle_menu_actions(self, message: types.Message, state: FSMContext):
         """
         Обработчик действий из меню после парсинга
@@ -123,12 +275,17 @@ class BotHandlers:
                 "🤖 <b>Помощь по использованию бота</b>\n\n"
                 "📋 <b>Доступные команды:</b>\n"
                 "• <b>Парсить категорию</b> - парсинг товаров из категории Ozon\n"
-                "• <b>Парсить товары</b> - парсинг конкретных товаров по ссылкам\n\n"
+                "• <b>Парсить товары</b> - парсинг конкретных товаров по ссылкам\n"
+                "• /parse_fresh, /parse_products_fresh - то же без кэша результатов\n"
+                "• /resume - продолжить прерванную задачу\n"
+                "• /status - очередь и ход задач\n"
+                "• /cancel номер - отменить задачу\n"
+                "• /format xlsx csv jsonl parquet - форматы выгрузки\n\n"
                 "🔗 <b>Форматы ссылок:</b>\n"
                 "• Для категорий: ссылки на категории Ozon\n"
                 "• Для товаров: по одной ссылке на строку\n\n"
                 "📊 <b>Результаты:</b>\n"
-                "• Excel файл с данными о товарах\n"
+                "• Файлы с данными о товарах (по умолчанию Excel)\n"
                 "• Файл со ссылками (при парсинге категорий)\n\n"
                 "⚠️ <b>Ограничения:</b>\n"
                 "• Максимальный размер файла: 50MB\n"
@@ -159,45 +316,19 @@ class BotHandlers:
             await message.answer(BOT_MESSAGES[error_key])
             return
         
+        force_refresh = (await state.get_data()).get('force_refresh', False)
         await state.clear()
-        await message.answer(BOT_MESSAGES['parsing_start'])
-        
-        # Запускаем обновление логов
-        log_updater = LogUpdater(self.bot)
-        log_task = asyncio.create_task(log_updater.start(message.chat.id))
-        
-        try:
-            # Запускаем парсер категории в отдельном потоке
-            loop = asyncio.get_running_loop()
-            file_path = await loop.run_in_executor(
-                None, 
-                run_parser_sync, 
-                url, 
-                message.from_user.id
-            )
-            
-            if not file_path:
-                await message.answer(BOT_MESSAGES['parsing_error'])
-                return
-            
-            # Отправляем основной файл
-            await self._send_parsing_results(message, file_path)
-            
-            # Ищем и отправляем links.json
-            await self._send_links_file(message, file_path)
-            
-            # Показываем меню с действиями после парсинга
-            await self._show_post_parsing_menu(message)
-                
-        except Exception as e:
-            logger.exception(f"Ошибка при обработке URL: {e}")
-            await message.answer(BOT_MESSAGES['parsing_error'])
-        finally:
-            log_task.cancel()
-            try:
-                await log_task
-            except asyncio.CancelledError:
-                pass
+        await self._run_job(
+            message,
+            'category',
+            get_category_name(url),
+            run_parser_sync,
+            url,
+            message.from_user.id,
+            force_refresh,
+            self.export_formats.get(message.from_user.id),
+            send_links=True
+        )
     
     async def process_product_links(self, message: types.Message, state: FSMContext):
         """
@@ -219,46 +350,94 @@ class BotHandlers:
             await message.answer(BOT_MESSAGES[error_key])
             return
         
+        force_refresh = (await state.get_data()).get('force_refresh', False)
         await state.clear()
-        await message.answer(
-            f"🚀 Парсинг товаров запущен...\n"
-            f"📦 Найдено {len(valid_links)} валидных ссылок\n"
-            f"📊 Следите за обновлениями в реальном времени"
+        await message.answer(f"📦 Найдено {len(valid_links)} валидных ссылок")
+        await self._run_job(
+            message,
+            'products',
+            f"{len(valid_links)} товаров",
+            run_product_parser_sync,
+            valid_links,
+            message.from_user.id,
+            force_refresh,
+            self.export_formats.get(message.from_user.id)
         )
+    
+    async def _run_job(self, message: types.Message, kind: str, title: str, func, *args, send_links: bool = False):
+        """
+        Ставит задачу парсинга в очередь, дожидается ее и отправляет результаты
+        
+        Args:
+            message: Сообщение для ответа
+            kind: Тип задачи (определяет приоритет в очереди)
+            title: Описание задачи для /status
+            func: Синхронная функция задачи из utils
+            *args: Аргументы функции
+            send_links: Отправить также файл со ссылками категории
+        """
+        job = self.job_manager.submit(kind, title, message.from_user.id, func, *args)
+        if job is None:
+            await message.answer(BOT_MESSAGES['queue_full'])
+            return
         
-        # Запускаем обновление логов
-        log_updater = LogUpdater(self.bot)
-        log_task = asyncio.create_task(log_updater.start(message.chat.id))
+        position = self.job_manager.get_position(job)
+        if len(self.job_manager.get_running()) + position > self.job_manager.max_concurrent:
+            await message.answer(BOT_MESSAGES['job_queued'].format(job_id=job.id, position=position))
+        else:
+            await message.answer(BOT_MESSAGES['job_started'].format(job_id=job.id))
         
+        # Обновление логов запускается, когда задача дошла до выполнения: пока она
+        # в очереди, в логе идут чужие задачи
+        log_task = None
         try:
-            # Запускаем парсер товаров в отдельном потоке
-            loop = asyncio.get_running_loop()
-            file_path = await loop.run_in_executor(
-                None, 
-                run_product_parser_sync, 
-                valid_links, 
-                message.from_user.id
-            )
-            
-            if not file_path:
+            if await self.job_manager.wait_started(job):
+                log_updater = LogUpdater(self.bot)
+                log_task = asyncio.create_task(log_updater.start(message.chat.id))
+            file_paths = await self.job_manager.wait(job)
+        finally:
+            if log_task is not None:
+                log_task.cancel()
+                try:
+                    await log_task
+                except asyncio.CancelledError:
+                    pass
+        
+        try:
+            # Остановленная задача сохраняет уже разобранные товары и может быть продолжена через /resume
+            if job.status == 'cancelled':
+                await message.answer(BOT_MESSAGES['job_cancelled'].format(job_id=job.id))
+                if not file_paths:
+                    return
+                await message.answer(BOT_MESSAGES['job_cancelled_partial'])
+            elif not file_paths:
                 await message.answer(BOT_MESSAGES['parsing_error'])
                 return
             
-            # Отправляем файл с результатами
-            await self._send_parsing_results(message, file_path)
+            # Отправляем файлы результатов во всех выбранных форматах
+            for file_path in file_paths:
+                await self._send_parsing_results(message, file_path)
+            
+            if job.status != 'done':
+                return
+            
+            # Ищем и отправляем links.json
+            if send_links:
+                await self._send_links_file(message, file_paths[0])
             
             # Показываем меню с действиями после парсинга
             await self._show_post_parsing_menu(message)
                 
         except Exception as e:
-            logger.exception(f"Ошибка при обработке ссылок на товары: {e}")
+            logger.exception(f"Ошибка при отправке результатов задачи #{job.id}: {e}")
             await message.answer(BOT_MESSAGES['parsing_error'])
-        finally:
-            log_task.cancel()
-            try:
-                await log_task
-            except asyncio.CancelledError:
-                pass
+    
+    def _format_duration(self, started_at: float) -> str:
+        """Время с момента запуска задачи в виде "1ч 05м" или "3м 12с" """
+        seconds = int(time.time() - started_at)
+        hours, seconds = divmod(seconds, 3600)
+        minutes, seconds = divmod(seconds, 60)
+        return f"{hours}ч {minutes:02d}м" if hours else f"{minutes}м {seconds:02d}с"
     
     async def _show_post_parsing_menu(self, message: types.Message):
         """
@@ -0,0 +1,267 @@
+"""
+Очередь задач парсинга для Telegram бота
+"""
+import asyncio
+import itertools
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+from src.config import MAX_CONCURRENT_JOBS, JOB_QUEUE_LIMIT, JOB_HISTORY_SIZE, JOB_PRIORITIES
+from src.utils.metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+
+class Job:
+    """Задача парсинга: синхронная функция, выполняемая в пуле задач"""
+
+    def __init__(self, job_id: int, kind: str, title: str, user_id: int, func: Callable, args: tuple):
+        self.id = job_id
+        self.kind = kind  # "category", "products" или "resume"
+        self.title = title
+        self.user_id = user_id
+        self.func = func
+        self.args = args
+        self.status = 'queued'  # queued, running, done, failed, cancelled
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.parser = None  # OzonProductParser выполняющейся задачи
+        self.cancel_requested = threading.Event()
+        self.lock = threading.Lock()
+        self.future: Optional[asyncio.Future] = None
+        self.run_started: Optional[asyncio.Future] = None  # True - задача запущена, False - завершена в очереди
+
+    def attach_parser(self, parser):
+        """
+        Привязывает парсер задачи (вызывается из потока задачи)
+
+        Args:
+            parser: Экземпляр OzonProductParser
+        """
+        with self.lock:
+            self.parser = parser
+            cancelled = self.cancel_requested.is_set()
+        # Отмена могла прийти до создания парсера
+        if cancelled:
+            parser.stop_parsing()
+
+    def request_cancel(self):
+        """Останавливает парсер задачи, если он уже создан"""
+        with self.lock:
+            self.cancel_requested.set()
+            parser = self.parser
+        if parser is not None:
+            parser.stop_parsing()
+
+    def get_progress(self) -> Optional[str]:
+        """Прогресс выполняющейся задачи: "обработано/всего" """
+        parser = self.parser
+        if parser is None or not parser.total_urls:
+            return None
+        return f"{parser.processed_count}/{parser.total_urls}"
+
+
+class JobManager:
+    """Ограниченное число одновременных задач и приоритетная очередь для остальных.
+
+    Задачи выполняются в собственном пуле из max_concurrent потоков, а не в
+    общем пуле цикла событий, поэтому нагрузка на машину не зависит от числа запросов
+    """
+
+    def __init__(self, max_concurrent: int = MAX_CONCURRENT_JOBS, queue_limit: int = JOB_QUEUE_LIMIT,
+                 history_size: int = JOB_HISTORY_SIZE):
+        self.max_concurrent = max_concurrent
+        self.queue_limit = queue_limit
+        self.queue: Optional[asyncio.PriorityQueue] = None
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrent, thread_name_prefix='job')
+        self.ids = itertools.count(1)
+        self.sequence = itertools.count()  # Порядок поступления при равном приоритете
+        self.jobs = {}  # Ожидающие и выполняющиеся задачи {id: Job}
+        self.history = deque(maxlen=history_size)
+        self.runners = []
+
+    def start(self):
+        """Запускает обработчики очереди (нужен работающий цикл событий)"""
+        if self.runners:
+            return
+        self.queue = asyncio.PriorityQueue()
+        get_metrics().register_source('jobs', self.metric_values)
+        self.runners = [asyncio.create_task(self._runner()) for _ in range(self.max_concurrent)]
+        logger.info(f"Очередь задач запущена: {self.max_concurrent} одновременно, до {self.queue_limit} в очереди")
+
+    async def shutdown(self):
+        """Отменяет все задачи и дожидается остановки парсеров.
+
+        После остановки менеджер можно снова запустить в новом цикле событий
+        (перезапуск бота из интерфейса)
+        """
+        for job in list(self.jobs.values()):
+            self.cancel(job.id)
+        for runner in self.runners:
+            runner.cancel()
+        await asyncio.gather(*self.runners, return_exceptions=True)
+        self.runners = []
+        await asyncio.get_running_loop().run_in_executor(None, self.executor.shutdown)
+
+        # Обработчики отменены во время выполнения: задачи завершаются здесь
+        for job in list(self.jobs.values()):
+            self._finish(job, 'cancelled', None)
+        self.queue = None
+        self.executor = ThreadPoolExecutor(max_workers=self.max_concurrent, thread_name_prefix='job')
+
+    def submit(self, kind: str, title: str, user_id: int, func: Callable, *args) -> Optional[Job]:
+        """
+        Ставит задачу в очередь
+
+        Args:
+            kind: Тип задачи (ключ JOB_PRIORITIES)
+            title: Описание для /status
+            user_id: ID пользователя
+            func: Синхронная функция задачи; получает args и on_parser=Job.attach_parser
+
+        Returns:
+            Optional[Job]: Задача или None, если очередь заполнена
+        """
+        self.start()
+        if len(self.get_queued()) >= self.queue_limit:
+            return None
+
+        job = Job(next(self.ids), kind, title, user_id, func, args)
+        loop = asyncio.get_running_loop()
+        job.future = loop.create_future()
+        job.run_started = loop.create_future()
+        self.jobs[job.id] = job
+        self.queue.put_nowait((JOB_PRIORITIES.get(kind, max(JOB_PRIORITIES.values(), default=0)),
+                               next(self.sequence), job))
+        logger.info(f"Задача #{job.id} ({title}) поставлена в очередь")
+        return job
+
+    async def wait(self, job: Job):
+        """
+        Ожидает завершения задачи
+
+        Returns:
+            Результат функции задачи; None для задачи, отмененной в очереди
+        """
+        return await asyncio.shield(job.future)
+
+    async def wait_started(self, job: Job) -> bool:
+        """
+        Ожидает запуска задачи из очереди
+
+        Returns:
+            bool: True если задача начала выполняться, False если она завершилась в очереди (отмена)
+        """
+        return await asyncio.shield(job.run_started)
+
+    def cancel(self, job_id: int) -> bool:
+        """
+        Отменяет задачу: из очереди убирает, выполняющуюся останавливает через stop_event парсера
+
+        Args:
+            job_id: ID задачи
+
+        Returns:
+            bool: True если задача найдена и еще не завершена
+        """
+        job = self.jobs.get(job_id)
+        if job is None or job.cancel_requested.is_set():
+            return False
+
+        job.request_cancel()
+        if job.status == 'queued':
+            # Элемент остается в очереди и пропускается обработчиком
+            self._finish(job, 'cancelled', None)
+        logger.info(f"Задача #{job.id} отменена")
+        return True
+
+    def get_position(self, job: Job) -> int:
+        """Номер задачи в очереди (1 - следующая), 0 - уже выполняется или завершена"""
+        queued = self.get_queued()
+        return queued.index(job) + 1 if job in queued else 0
+
+    def get_queued(self) -> List[Job]:
+        """Ожидающие задачи в порядке запуска"""
+        if self.queue is None:
+            return []
+        # Внутренний список PriorityQueue - куча, порядок восстанавливается сортировкой
+        return [job for _, _, job in sorted(self.queue._queue, key=lambda item: item[:2])
+                if job.status == 'queued']
+
+    def get_running(self) -> List[Job]:
+        """Выполняющиеся задачи"""
+        return [job for job in self.jobs.values() if job.status == 'running']
+
+    def get_history(self) -> List[Job]:
+        """Завершенные задачи, от новых к старым"""
+        return list(reversed(self.history))
+
+    def metric_values(self):
+        """Очередь задач для эндпоинта метрик"""
+        return {
+            'ozon_queue_depth': {(('queue', 'jobs'),): sum(job.status == 'queued' for job in list(self.jobs.values()))},
+            'ozon_jobs_running': {(): sum(job.status == 'running' for job in list(self.jobs.values()))}
+        }
+
+    async def _runner(self):
+        """Обработчик очереди: одна задача за раз"""
+        loop = asyncio.get_running_loop()
+        while True:
+            _, _, job = await self.queue.get()
+            try:
+                if job.status != 'queued':
+                    continue
+                job.status = 'running'
+                job.started_at = time.time()
+                if not job.run_started.done():
+                    job.run_started.set_result(True)
+                logger.info(f"Задача #{job.id} запущена")
+                try:
+                    result = await loop.run_in_executor(
+                        self.executor,
+                        lambda: job.func(*job.args, on_parser=job.attach_parser)
+                    )
+                except Exception as e:
+                    logger.exception(f"Ошибка задачи #{job.id}: {e}")
+                    self._finish(job, 'failed', None)
+                    continue
+
+                if job.cancel_requested.is_set():
+                    status = 'cancelled'
+                else:
+                    status = 'done' if result else 'failed'
+                self._finish(job, status, result)
+            finally:
+                self.queue.task_done()
+
+    def _finish(self, job: Job, status: str, result):
+        job.status = status
+        job.finished_at = time.time()
+        job.parser = None  # Парсер держит результаты и браузерные ресурсы задачи
+        self.jobs.pop(job.id, None)
+        self.history.append(job)
+        if job.run_started is not None and not job.run_started.done():
+            job.run_started.set_result(False)
+        if job.future is not None and not job.future.done():
+            job.future.set_result(result)
+        duration = job.finished_at - (job.started_at or job.created_at)
+        logger.info(f"Задача #{job.id} завершена со статусом {status} за {duration:.1f} с")
+
+
+# Общий менеджер задач бота
+_job_manager = None
+_job_manager_lock = threading.Lock()
+
+
+def get_job_manager() -> JobManager:
+    """Получение общего менеджера задач"""
+    global _job_manager
+    with _job_manager_lock:
+        if _job_manager is None:
+            _job_manager = JobManager()
+        return _job_manager
@@ -29,7 +29,12 @@ BOT_MESSAGES = {
     'welcome': '🤖 Привет! Я бот для парсинга товаров с Ozon.\n\n'
                '📊 Доступные команды:\n'
                '• /parse - Парсинг категории по URL\n'
-               '• /parse_products - Парсинг конкретных товаров по ссылкам\n\n'
+               '• /parse_products - Парсинг конкретных товаров по ссылкам\n'
+               '• /parse_fresh, /parse_products_fresh - То же без кэша результатов\n'
+               '• /resume - Продолжить прерванную задачу\n'
+               '• /status - Очередь и ход задач\n'
+               '• /cancel - Отменить задачу по номеру\n'
+               '• /format - Форматы выгрузки (xlsx, csv, jsonl, parquet)\n\n'
                'Используйте кнопки или команды для начала работы.',
     
     'access_denied': '❌ У вас нет доступа к этому боту',
@@ -45,12 +50,28 @@ BOT_MESSAGES = {
                               'https://www.ozon.ru/product/tovار-3/\n\n'
                               f"⚠️ Максимум {TOTAL_LINKS} ссылок за раз",
     
-    'parsing_start': '🚀 Парсинг запущен...\n'
-                     '📊 Следите за обновлениями в реальном времени',
-    
     'parsing_error': '❌ Произошла ошибка при парсинге',
+    'resume_start': '🔁 Продолжаю прерванную задачу...',
+    'no_unfinished_jobs': '✅ Незавершенных задач нет',
+    'resume_busy': '⏳ Эта задача уже в очереди или выполняется\nХод задач: /status',
+    'format_help': '📁 Текущие форматы выгрузки: {current}\n'
+                   'Изменить: /format xlsx csv jsonl parquet',
+    'invalid_format': '❌ Неизвестный формат. Доступны: xlsx, csv, jsonl, parquet',
     'file_send_error': '❌ Не удалось отправить файл',
     
+    'job_started': '🚀 Задача #{job_id} запущена, следите за обновлениями в реальном времени\n'
+                   'Ход задач: /status, отмена: /cancel {job_id}',
+    'job_queued': '⏳ Задача #{job_id} поставлена в очередь, место: {position}\n'
+                  'Ход задач: /status, отмена: /cancel {job_id}',
+    'queue_full': '❌ Очередь задач заполнена, попробуйте позже',
+    'no_jobs': '✅ Задач нет',
+    'cancel_help': '📝 Укажите номер задачи: /cancel 3\nНомера задач: /status',
+    'cancel_requested': '⏹ Останавливаю задачу #{job_id}...',
+    'job_not_found': '❌ Задача #{job_id} не найдена или уже завершена',
+    'job_cancelled': '⏹ Задача #{job_id} отменена',
+    'job_cancelled_partial': '📄 Уже разобранные товары - в файлах ниже\n'
+                             'Продолжить задачу: /resume',
+    
     'invalid_url': '❌ Неверный URL. Проверьте правильность ссылки',
     'not_ozon_url': '❌ Это не ссылка на Ozon. Отправьте корректную ссылку',
     'invalid_category_url': '❌ Это не ссылка на категорию Ozon',
@@ -59,6 +80,15 @@ BOT_MESSAGES = {
     'no_valid_links': '❌ Не найдено валидных ссылок на товары Ozon'
 }
 
+# Статусы задач в /status
+JOB_STATUS_LABELS = {
+    'queued': '⏳ в очереди',
+    'running': '▶️ выполняется',
+    'done': '✅ готово',
+    'failed': '❌ ошибка',
+    'cancelled': '⏹ отменена'
+}
+
 # Кнопки клавиатуры
 KEYBOARD_BUTTONS = {
     'parse': '🔍 Парсить категорию',
@@ -34,6 +34,20 @@ def register_handlers(dp, bot: Bot):
         F.text.lower() == KEYBOARD_BUTTONS['parse_products'].lower()
     )
     
+    # Те же команды без кэша результатов
+    dp.message.register(handlers.cmd_parse_fresh, Command("parse_fresh"))
+    dp.message.register(handlers.cmd_parse_products_fresh, Command("parse_products_fresh"))
+    
+    # Выбор форматов выгрузки
+    dp.message.register(handlers.cmd_format, Command("format"))
+    
+    # Продолжение прерванной задачи по журналу
+    dp.message.register(handlers.cmd_resume, Command("resume"))
+    
+    # Очередь задач: ход выполнения и отмена
+    dp.message.register(handlers.cmd_status, Command("status"))
+    dp.message.register(handlers.cmd_cancel, Command("cancel"))
+    
     # Обработчик действий из меню после парсинга
     dp.message.register(
         handlers.handle_menu_actions,
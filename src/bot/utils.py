@@ -10,7 +10,9 @@ from typing import Tuple, List
 
 from .config import TELEGRAM_CHAT_ID
 from src.parser.main_parser import OzonProductParser
-from src.config import get_category_name
+from src.config import get_category_name, LINK_STREAMING, CATEGORY_ENGINE
+from src.utils.job_journal import find_unfinished_journals
+from src.utils.exporters import get_exporter_classes
 
 logger = logging.getLogger(__name__)
 
@@ -104,27 +106,69 @@ def validate_product_links(text: str) -> Tuple[bool, str, List[str]]:
     return True, '', valid_links
 
 
-def run_parser_sync(url: str, user_id: int) -> str:
+def collect_category_links(url: str, on_links=None) -> Tuple[bool, dict]:
+    """
+    Сбор ссылок категории: HTTP-краулер (CATEGORY_ENGINE="http") с откатом на браузер
+    
+    Args:
+        url: URL категории
+        on_links: Получатель новых ссылок по ходу сбора
+        
+    Returns:
+        Tuple[bool, dict]: (успех, {ссылка: изображение})
+    """
+    if CATEGORY_ENGINE == 'http':
+        from src.parser.http_category_parser import HttpCategoryParser
+        success, links_with_images = HttpCategoryParser(url, on_links=on_links).run()
+        if links_with_images:
+            return success, links_with_images
+        logger.warning("HTTP-сбор ссылок не дал результата, переходим к браузеру")
+
+    from src.parser.link_parser import OzonLinkParser
+    return OzonLinkParser(url, on_links=on_links).run()
+
+
+def run_parser_sync(url: str, user_id: int, force_refresh: bool = False,
+                    export_formats: List[str] = None, on_parser=None) -> List[str]:
     """
     Синхронная функция для запуска парсера категории
+    
+    Args:
+        url: URL категории
+        user_id: ID пользователя
+        force_refresh: Перепарсить товары, игнорируя кэш результатов
+        export_formats: Форматы выгрузки (None - по умолчанию)
+        on_parser: Получатель созданного парсера (для отмены задачи)
+        
+    Returns:
+        List[str]: Пути к файлам результатов или None при ошибке
     """
     try:
         category_name = get_category_name(url)
-        parser = OzonProductParser(category_name)
+        parser = OzonProductParser(category_name, force_refresh=force_refresh, export_formats=export_formats)
+        if on_parser is not None:
+            on_parser(parser)
+
+        # Товары парсятся по мере сбора ссылок: сбор ждет, если воркеры не успевают
+        if LINK_STREAMING:
+            if parser.run_streaming(lambda: collect_category_links(url, on_links=parser.add_links)):
+                return parser.get_output_files()
+            return None
 
         # Сбор ссылок
-        from src.parser.link_parser import OzonLinkParser
-        link_parser = OzonLinkParser(url)
-        success, links_with_images = link_parser.run()
+        success, links_with_images = collect_category_links(url)
         if not success or not links_with_images:
             logger.error("Ошибка при парсинге ссылок или ссылки не найдены")
             return None
+        if parser.stop_event.is_set():
+            logger.warning("Задача остановлена во время сбора ссылок")
+            return None
 
         # Запускаем парсер товаров (передаем только ссылки - ключи словаря)
         links = list(links_with_images.keys())
         success = parser.run(links)
         if success:
-            return parser.excel_filename
+            return parser.get_output_files()
         else:
             return None
 
@@ -134,25 +178,31 @@ def run_parser_sync(url: str, user_id: int) -> str:
 
 
 
-def run_product_parser_sync(links: List[str], user_id: int) -> str:
+def run_product_parser_sync(links: List[str], user_id: int, force_refresh: bool = False,
+                            export_formats: List[str] = None, on_parser=None) -> List[str]:
     """
     Синхронная функция для парсинга конкретных товаров
     
     Args:
         links: Список ссылок на товары
         user_id: ID пользователя
+        force_refresh: Перепарсить товары, игнорируя кэш результатов
+        export_formats: Форматы выгрузки (None - по умолчанию)
+        on_parser: Получатель созданного парсера (для отмены задачи)
         
     Returns:
-        str: Путь к созданному файлу или None при ошибке
+        List[str]: Пути к файлам результатов или None при ошибке
     """
     try:
         # Создаем парсер с названием "product_links"
-        parser = OzonProductParser("product_links")
+        parser = OzonProductParser("product_links", force_refresh=force_refresh, export_formats=export_formats)
+        if on_parser is not None:
+            on_parser(parser)
         
         # Запускаем парсер товаров
         success = parser.run(links)
         if success:
-            return parser.excel_filename
+            return parser.get_output_files()
         else:
             return None
             
@@ -161,6 +211,81 @@ def run_product_parser_sync(links: List[str], user_id: int) -> str:
         return None
 
 
+def run_resumed_parser_sync(journal_path: str, user_id: int, on_parser=None) -> List[str]:
+    """
+    Синхронная функция для продолжения прерванной задачи по журналу
+    
+    Args:
+        journal_path: Путь к журналу задачи
+        user_id: ID пользователя
+        on_parser: Получатель созданного парсера (для отмены задачи)
+        
+    Returns:
+        List[str]: Пути к файлам результатов или None при ошибке
+    """
+    try:
+        parser, links = OzonProductParser.resume(journal_path)
+        if on_parser is not None:
+            on_parser(parser)
+        success = parser.run(links)
+        if success:
+            return parser.get_output_files()
+        else:
+            return None
+            
+    except Exception as e:
+        logger.exception(f"Ошибка в run_resumed_parser_sync: {e}")
+        return None
+
+
+def parse_export_formats(text: str) -> Tuple[bool, List[str]]:
+    """
+    Разбирает список форматов выгрузки из аргументов команды
+    
+    Args:
+        text: Форматы через пробел или запятую (например, "xlsx csv")
+        
+    Returns:
+        Tuple[bool, List[str]]: (валидность, список форматов)
+    """
+    formats = [f.strip().lower().lstrip('.') for f in re.split(r'[\s,]+', text or '') if f.strip()]
+    if not formats or any(f not in get_exporter_classes() for f in formats):
+        return False, []
+    return True, list(dict.fromkeys(formats))
+
+
+def get_unfinished_jobs() -> List[str]:
+    """
+    Журналы незавершенных задач, от новых к старым
+    """
+    try:
+        return find_unfinished_journals()
+    except Exception as e:
+        logger.error(f"Ошибка при поиске незавершенных задач: {e}")
+        return []
+
+
+async def notify_unfinished_jobs(bot) -> None:
+    """
+    Сообщает в чат о незавершенных задачах после перезапуска бота
+    
+    Args:
+        bot: Экземпляр бота
+    """
+    journals = get_unfinished_jobs()
+    if not journals:
+        return
+    names = '\n'.join(f"• {os.path.basename(path)}" for path in journals[:10])
+    try:
+        await bot.send_message(
+            TELEGRAM_CHAT_ID,
+            f"⚠️ Найдены незавершенные задачи ({len(journals)}):\n{names}\n\n"
+            f"Отправьте /resume, чтобы продолжить последнюю"
+        )
+    except Exception as e:
+        logger.error(f"Не удалось отправить уведомление о незавершенных задачах: {e}")
+
+
 async def cleanup_file(file_path: str, delay: int = 300):
     """
     Удаляет файл через заданное время
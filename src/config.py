@@ -8,17 +8,166 @@ load_dotenv()
 
 # Общие настройки
 LOG_FILE = "ozon_parser.log"
-WORKER_COUNT = 20  # Количество воркеров
-TABS_PER_WORKER = 1  # Количество вкладок на каждого воркера
+WORKER_COUNT = 20  # Количество воркеров (при адаптивном параллелизме - потолок)
+TABS_PER_WORKER = 1  # Количество вкладок на каждого воркера (>1 - конвейерная загрузка)
+TAB_LOAD_TIMEOUT = 15  # Сколько ждать загрузки вкладки перед разбором
+TAB_POLL_INTERVAL = 0.2  # Интервал опроса готовности вкладок
+
+# Настройки пула браузеров
+DRIVER_POOL_SIZE = WORKER_COUNT + 1  # Максимум браузеров в пуле (воркеры + парсер ссылок)
+DRIVER_MAX_PAGES = 200  # Перезапуск браузера после указанного числа страниц
+DRIVER_START_CONCURRENCY = 4  # Максимум одновременно запускаемых браузеров
+URL_MAX_REQUEUES = 2  # Сколько раз URL возвращается в очередь при падении браузера
+
+# Адаптивный параллелизм (AIMD): число активных воркеров растет, пока задержка
+# и доля блокировок в норме, и резко снижается при их росте
+CONCURRENCY_ADAPTIVE = True
+CONCURRENCY_MIN_WORKERS = 2  # Нижняя граница активных воркеров
+CONCURRENCY_INITIAL_WORKERS = 4  # Сколько воркеров активно в начале задачи
+CONCURRENCY_WINDOW = 10  # Страниц между корректировками
+CONCURRENCY_MAX_BLOCK_RATE = 0.1  # Допустимая доля access_denied в окне
+CONCURRENCY_MAX_ERROR_RATE = 0.2  # Допустимая доля ошибок и таймаутов в окне
+CONCURRENCY_MAX_P50_LATENCY = 30  # Предельная медианная задержка страницы (секунды)
+CONCURRENCY_LATENCY_FACTOR = 2.0  # Во сколько раз p50 может превысить лучшую за задачу
+CONCURRENCY_INCREASE_STEP = 1  # Аддитивное увеличение
+CONCURRENCY_DECREASE_FACTOR = 0.5  # Мультипликативное уменьшение
+
+# Сколько браузеров прогреть при старте бота: при адаптивном параллелизме - только
+# стартовые воркеры, остальные браузеры запускаются по мере роста числа воркеров
+DRIVER_POOL_PREWARM = CONCURRENCY_INITIAL_WORKERS if CONCURRENCY_ADAPTIVE else WORKER_COUNT
+
+# Блокировка ресурсов через DevTools (Network.setBlockedURLs)
+RESOURCE_TYPE_PATTERNS = {
+    'image': ['*.jpg*', '*.jpeg*', '*.png*', '*.gif*', '*.webp*', '*.avif*', '*.ico*', '*.svg*'],
+    'media': ['*.mp4*', '*.webm*', '*.m3u8*', '*.mov*'],
+    'font': ['*.woff*', '*.woff2*', '*.ttf*', '*.otf*', '*.eot*'],
+    'stylesheet': ['*.css*']
+}
+# Аналитика, рекламные маяки и сторонние скрипты
+TRACKER_URL_PATTERNS = [
+    '*mc.yandex.ru*', '*an.yandex.ru*', '*yandex.ru/ads*', '*adfox.ru*',
+    '*google-analytics.com*', '*googletagmanager.com*', '*doubleclick.net*',
+    '*top-fwz1.mail.ru*', '*vk.com/rtrg*', '*criteo.*', '*mytarget.ru*'
+]
+# Профили блокировки: стили не блокируются, от раскладки зависят
+# проверки видимости, подгрузка ленты и тултип продавца
+BLOCK_PROFILES = {
+    'product': {
+        'resource_types': ['image', 'media', 'font'],
+        'url_patterns': TRACKER_URL_PATTERNS
+    },
+    'category': {
+        'resource_types': ['image', 'media', 'font'],
+        'url_patterns': TRACKER_URL_PATTERNS
+    }
+}
+BLOCKING_STATS = True  # Считать заблокированные запросы и трафик на страницу
+
+# Ограничение частоты запросов к хосту (общее для всех браузеров и задач процесса)
+RATE_LIMIT_ENABLED = True
+RATE_LIMIT_PER_SECOND = 4.0  # Средняя частота навигаций и подгрузок на хост
+RATE_LIMIT_BURST = 8  # Сколько запросов можно сделать подряд без ожидания
+RATE_LIMIT_JITTER = 0.5  # Случайная добавка к ожиданию (доля интервала между запросами)
+RATE_LIMIT_HOSTS = {}  # Лимиты для отдельных хостов: {хост: (запросов в секунду, burst)}
+
+# Эндпоинт метрик в формате Prometheus (скорость, статусы, задержки этапов, очереди)
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', '0') == '1'
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')  # Только локальный доступ по умолчанию
+METRICS_PORT = int(os.getenv('METRICS_PORT', '9108'))
+METRICS_RATE_WINDOW = 60  # Окно для расчета страниц в секунду (секунды)
+METRICS_LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 15, 30, 60)  # Корзины гистограмм (секунды)
+
+# Трассировка этапов разбора (Chrome trace events: chrome://tracing, ui.perfetto.dev)
+TRACE_ENABLED = os.getenv('TRACE_ENABLED', '0') == '1'
+TRACE_DIR = "traces"
+TRACE_MAX_EVENTS = 1000000  # Предел событий в файле трассировки
 
 # Настройки для парсера ссылок
 LINKS_OUTPUT_FILE = "links.json"
 TOTAL_LINKS = 500  # Целевое количество ссылок
 MAX_IDLE_SCROLLS = 5  # Максимум скроллов без новых ссылок
-SCROLL_DELAY = 1.5  # Задержка между скроллами
+LINK_STREAMING = True  # Парсить товары одновременно со сбором ссылок
+LINK_QUEUE_SIZE = 50  # Ссылок в очереди к воркерам; при заполнении сбор ссылок ждет
+SCROLL_WAIT_TIMEOUT = 3  # Ожидание новых карточек после скролла (сбрасывается при подгрузке)
+SCROLL_MAX_WAIT = 12  # Предел ожидания, если лента отвечает медленно
+SCROLL_BACKOFF = 2.0  # Во сколько раз увеличивать ожидание после скролла без подгрузки
 LOAD_TIMEOUT = 15
+
+# Ожидание готовности страниц товара (секунды, единый дедлайн на каждое ожидание)
+PAGE_READY_TIMEOUT = 15  # Карточка товара, "нет в наличии" или блокировка
+SELLER_SECTION_TIMEOUT = 10  # Секция продавца после скролла
+TOOLTIP_TIMEOUT = 4.5  # Тултип с юридическим названием компании
+
+# Бюджет на один URL: все ожидания и повторы страницы и продавца вместе
+URL_TIME_BUDGET = 90  # Секунд на URL, после чего результат получает статус budget_exhausted
+URL_MAX_ATTEMPTS = 8  # Попыток на URL (перезагрузки страницы и попытки получить продавца)
+
+# Отложенные повторы: неполные результаты, блокировки и ошибки основного прохода
+# повторяются после него на новых браузерах, а не перезагрузкой в том же браузере
+RETRY_DEFERRED = True
+RETRY_PASSES = 1  # Сколько повторных проходов после основного
+RETRY_COOLDOWN = 30  # Пауза перед повторным проходом (секунды)
+RETRY_WORKERS = 4  # Воркеров в повторном проходе
+MAIN_PASS_PAGE_ATTEMPTS = 1  # Попыток загрузки страницы в основном проходе при отложенных повторах
+
 TELEGRAM_CHAT_ID= os.getenv('TELEGRAM_CHAT_ID')  # ID чата для отправки сообщений
 
+# Очередь задач бота: каждая задача сама занимает до WORKER_COUNT браузеров,
+# поэтому одновременно выполняется ограниченное число задач, остальные ждут
+MAX_CONCURRENT_JOBS = 1  # Одновременно выполняемых задач парсинга
+JOB_QUEUE_LIMIT = 10  # Задач в очереди, сверх лимита новые отклоняются
+JOB_HISTORY_SIZE = 10  # Сколько завершенных задач показывать в /status
+JOB_PRIORITIES = {'resume': 0, 'products': 1, 'category': 2}  # Меньше - раньше; при равенстве FIFO
+
+# Базовый адрес Ozon (можно подменить локальным стендом для тестов)
+OZON_BASE_URL = os.getenv('OZON_BASE_URL', 'https://www.ozon.ru')
+
+# Движок парсинга товаров: "selenium" или "http" (без браузера, с откатом на selenium)
+PRODUCT_ENGINE = os.getenv('PRODUCT_ENGINE', 'selenium')
+HTTP_CONCURRENCY = 32  # Одновременных HTTP-запросов
+HTTP_TIMEOUT = 15  # Таймаут HTTP-запроса (секунды)
+HTTP_RETRIES = 1  # Повторов при сетевой ошибке
+HTTP_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+                  '(KHTML, like Gecko) Chrome/138.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/json;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'ru-RU,ru;q=0.9,en-US;q=0.8,en;q=0.7'
+}
+
+# Сбор ссылок категории: "selenium" (скролл ленты) или "http" (страницы ?page=N, с откатом на selenium)
+CATEGORY_ENGINE = os.getenv('CATEGORY_ENGINE', 'selenium')
+CATEGORY_HTTP_CONCURRENCY = 8  # Одновременно запрашиваемых страниц листинга
+CATEGORY_MAX_PAGES = 300  # Предел страниц листинга на категорию
+
+# Кэш результатов товаров на диске (SQLite, ключ - ID товара из URL)
+RESULT_CACHE_ENABLED = True
+RESULT_CACHE_FILE = "product_cache.sqlite3"
+RESULT_CACHE_TTL = 24 * 60 * 60  # Время жизни записи (секунды)
+RESULT_CACHE_MAX_ENTRIES = 50000  # Сверх лимита вытесняются самые старые записи
+RESULT_CACHE_STATUSES = ('success', 'out_of_stock')  # Какие результаты кэшировать
+RESULT_CACHE_SELLER_TTL = 7 * 24 * 60 * 60  # Юридическое название продавца меняется редко
+
+# Архив страниц для разработки и регрессионных прогонов без сети:
+# "record" - сохранять ответы Ozon (документы и XHR браузера, ответы HTTP-движков),
+# "replay" - отдавать их из архива через локальный сервер, без сети и ограничения частоты
+PAGE_ARCHIVE_MODE = os.getenv('PAGE_ARCHIVE_MODE', 'off')
+PAGE_ARCHIVE_FILE = os.getenv('PAGE_ARCHIVE_FILE', 'page_archive.sqlite3')
+PAGE_ARCHIVE_HOSTS = ('ozon.ru',)  # Записываются ответы этих доменов и их поддоменов
+PAGE_ARCHIVE_RESOURCE_TYPES = ('Document', 'XHR', 'Fetch')  # Типы ответов браузера для записи
+PAGE_ARCHIVE_COMPRESSION = 6  # Уровень сжатия zlib
+PAGE_ARCHIVE_BUFFER_SIZE = 200 * 1024 * 1024  # Буфер тел ответов DevTools при записи (байты)
+PAGE_ARCHIVE_REPLAY_PORT = int(os.getenv('PAGE_ARCHIVE_REPLAY_PORT', '0'))  # 0 - свободный порт
+PAGE_ARCHIVE_REPLAY_BLOCK = ['https://*', 'wss://*', '*ozon.ru*', '*ozone.ru*']  # Сеть при воспроизведении
+
+# Форматы выгрузки результатов: xlsx, csv, jsonl, parquet (нужен pyarrow)
+EXPORT_FORMATS = ['xlsx']
+EXPORT_PARQUET_BATCH_SIZE = 1000  # Строк в одном row group Parquet
+
+# Журналы задач для возобновления после сбоя
+JOURNAL_DIR = "journals"
+JOURNAL_FSYNC_INTERVAL = 1.0  # Как часто записи результатов сбрасываются на диск через fsync (секунды)
+NOTIFY_UNFINISHED_JOBS = True  # Сообщать в чат о незавершенных задачах при запуске бота
+
 # Папка для результатов
 RESULTS_DIR = "results"
 os.makedirs(RESULTS_DIR, exist_ok=True)
@@ -30,4 +179,14 @@ def get_timestamp():
 # Получение имени категории из URL
 def get_category_name(url):
     match = re.search(r'/category/([^/?]+)', url)
-    return match.group(1) if match else "unknown_category"
\ No newline at end of file
+    return match.group(1) if match else "unknown_category"
+
+# Получение ID товара из URL вида /product/nazvanie-tovara-123456789/
+def get_product_id(url):
+    match = re.search(r'/product/(?:[^/?#]*-)?(\d+)/?(?:[?#]|$)', url)
+    return match.group(1) if match else None
+
+# Получение ID продавца из URL вида /seller/nazvanie-magazina-123456/
+def get_seller_id(url):
+    match = re.search(r'/seller/(?:[^/?#]*-)?(\d+)/?(?:[?#]|$)', url or '')
+    return match.group(1) if match else None
\ No newline at end of file
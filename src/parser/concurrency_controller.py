@@ -0,0 +1,106 @@
+import logging
+import threading
+import time
+from collections import deque
+from src.config import (CONCURRENCY_MIN_WORKERS, CONCURRENCY_INITIAL_WORKERS, CONCURRENCY_WINDOW,
+                        CONCURRENCY_MAX_BLOCK_RATE, CONCURRENCY_MAX_ERROR_RATE,
+                        CONCURRENCY_MAX_P50_LATENCY, CONCURRENCY_LATENCY_FACTOR,
+                        CONCURRENCY_INCREASE_STEP, CONCURRENCY_DECREASE_FACTOR)
+
+class ConcurrencyController:
+    """AIMD-регулятор числа активных воркеров.
+
+    После каждых window обработанных страниц сравнивает долю блокировок,
+    долю ошибок и медианную задержку с порогами: пока все в норме, цель
+    растет на increase_step, при превышении - умножается на decrease_factor.
+    Воркеры с номером больше цели ждут в wait_for_slot.
+    """
+
+    def __init__(self, max_workers, min_workers=CONCURRENCY_MIN_WORKERS, initial=CONCURRENCY_INITIAL_WORKERS,
+                 window=CONCURRENCY_WINDOW):
+        self.logger = logging.getLogger('concurrency_controller')
+        self.max_workers = max(1, max_workers)
+        self.min_workers = max(1, min(min_workers, self.max_workers))
+        self.target = max(self.min_workers, min(initial, self.max_workers))
+        self.window = window
+        self.condition = threading.Condition()
+
+        self.samples = deque()  # (задержка, статус) с последней корректировки
+        self.baseline_latency = None  # Лучшая медианная задержка за задачу
+        self.changes = []  # (время, было, стало, причина)
+        self.last_change = 0.0
+
+    def is_active(self, worker_id):
+        """Входит ли воркер в текущую цель"""
+        return worker_id <= self.target
+
+    def wait_for_slot(self, worker_id, no_work_left, poll_interval=1.0):
+        """Ожидание, пока воркер снова войдет в цель.
+
+        Возвращает False, если работы не осталось (no_work_left() истинно)
+        """
+        with self.condition:
+            while worker_id > self.target:
+                if no_work_left():
+                    return False
+                self.condition.wait(poll_interval)
+            return True
+
+    def record(self, latency, status):
+        """Учет обработанной страницы и корректировка цели по заполнении окна"""
+        with self.condition:
+            # Страницы, начатые до последнего изменения цели, отражают старую нагрузку
+            if time.time() - latency < self.last_change:
+                return
+            self.samples.append((latency, status))
+            if len(self.samples) >= self.window:
+                self._adjust()
+
+    def _adjust(self):
+        count = len(self.samples)
+        latencies = sorted(latency for latency, _ in self.samples)
+        p50 = latencies[count // 2]
+        block_rate = sum(1 for _, status in self.samples if status == 'access_denied') / count
+        error_rate = sum(1 for _, status in self.samples if status in ('error', 'budget_exhausted')) / count
+        self.samples.clear()
+
+        if self.baseline_latency is None or p50 < self.baseline_latency:
+            self.baseline_latency = p50
+
+        if block_rate > CONCURRENCY_MAX_BLOCK_RATE:
+            self._decrease(f"блокировки {block_rate:.0%}")
+        elif error_rate > CONCURRENCY_MAX_ERROR_RATE:
+            self._decrease(f"ошибки и таймауты {error_rate:.0%}")
+        elif p50 > CONCURRENCY_MAX_P50_LATENCY:
+            self._decrease(f"задержка p50 {p50:.1f} с выше порога")
+        elif p50 > self.baseline_latency * CONCURRENCY_LATENCY_FACTOR:
+            self._decrease(f"задержка p50 {p50:.1f} с против лучшей {self.baseline_latency:.1f} с")
+        else:
+            self._set_target(self.target + CONCURRENCY_INCREASE_STEP,
+                             f"норма: p50 {p50:.1f} с, блокировки {block_rate:.0%}")
+
+    def _decrease(self, reason):
+        self._set_target(int(self.target * CONCURRENCY_DECREASE_FACTOR), reason)
+
+    def _set_target(self, target, reason):
+        target = max(self.min_workers, min(target, self.max_workers))
+        if target == self.target:
+            return
+        self.last_change = time.time()
+        self.changes.append((self.last_change, self.target, target, reason))
+        self.logger.info(f"Параллелизм: {self.target} -> {target} воркеров ({reason})")
+        self.target = target
+        self.condition.notify_all()
+
+    def get_statistics(self):
+        """Текущая цель, границы и последние изменения с причинами"""
+        with self.condition:
+            return {
+                'target': self.target,
+                'min_workers': self.min_workers,
+                'max_workers': self.max_workers,
+                'changes': [
+                    {'time': changed_at, 'from': old, 'to': new, 'reason': reason}
+                    for changed_at, old, new, reason in self.changes[-10:]
+                ]
+            }
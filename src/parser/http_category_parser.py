@@ -0,0 +1,201 @@
+import asyncio
+import json
+import logging
+import math
+import os
+import re
+import time
+from urllib.parse import urlsplit, urlencode, parse_qsl
+import aiohttp
+from src.config import (OZON_BASE_URL, HTTP_TIMEOUT, HTTP_RETRIES, HTTP_HEADERS, CATEGORY_HTTP_CONCURRENCY,
+                        CATEGORY_MAX_PAGES, TOTAL_LINKS, LINKS_OUTPUT_FILE, PAGE_ARCHIVE_MODE,
+                        get_category_name, get_product_id)
+from src.utils.rate_limiter import get_rate_limiter
+from src.utils.page_archive import get_page_archive, is_archived_host, replay_url
+from .http_product_parser import parse_widget_states, rewrite_to_base, _first_key
+
+# Виджеты листинга категории с карточками товаров в поле items
+LISTING_WIDGETS = ('searchResultsV2', 'searchResults', 'tileGridDesktop', 'tileGrid')
+
+PRODUCT_LINK_RE = re.compile(r'^(?:https?://[^/]+)?(/product/[^?#]+)')
+
+
+def extract_tiles(states):
+    """Карточки листинга из состояний виджетов: [{url, sku, image_url, title}] по порядку"""
+    tiles = []
+    for widget_name in LISTING_WIDGETS:
+        for item in (states.get(widget_name) or {}).get('items') or []:
+            tile = _parse_tile(item)
+            if tile:
+                tiles.append(tile)
+        if tiles:
+            break
+    return tiles
+
+
+def _parse_tile(item):
+    link = _first_key(item.get('action') or {}, ['link']) or _first_key(item, ['link', 'url'])
+    match = PRODUCT_LINK_RE.match(link or '')
+    if not match:
+        return None
+    url = "https://www.ozon.ru" + match.group(1)
+
+    # Название - текстовый атом с id "name" в mainState
+    title = None
+    for state in item.get('mainState') or []:
+        if isinstance(state, dict) and state.get('id') == 'name':
+            title = _first_key(state, ['text'])
+            break
+
+    image_url = _first_key(item.get('tileImage') or {}, ['link', 'src', 'image'])
+    return {
+        'url': url,
+        'sku': str(item.get('sku') or get_product_id(url) or ''),
+        'image_url': image_url,
+        'title': title
+    }
+
+
+def page_url(target_url, page, base_url=OZON_BASE_URL):
+    """URL страницы листинга с номером page на базовом адресе"""
+    parts = urlsplit(target_url)
+    query = [(key, value) for key, value in parse_qsl(parts.query) if key != 'page']
+    if page > 1:
+        query.append(('page', str(page)))
+    path = parts.path + (f"?{urlencode(query)}" if query else "")
+    return rewrite_to_base(path, base_url)
+
+
+class HttpCategoryParser:
+    """Сбор ссылок категории без браузера: страницы листинга ?page=N параллельно.
+
+    Интерфейс как у OzonLinkParser: run() возвращает (успех, {ссылка: изображение})
+    """
+
+    def __init__(self, target_url, on_links=None, base_url=OZON_BASE_URL, concurrency=CATEGORY_HTTP_CONCURRENCY,
+                 timeout=HTTP_TIMEOUT, max_links=TOTAL_LINKS, max_pages=CATEGORY_MAX_PAGES):
+        self.logger = logging.getLogger('http_category_parser')
+        self.target_url = target_url
+        self.on_links = on_links  # Получатель новых ссылок по ходу сбора
+        self.base_url = base_url
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.max_links = max_links
+        self.max_pages = max_pages
+        self.rate_limiter = get_rate_limiter()
+        self.archive = get_page_archive() if PAGE_ARCHIVE_MODE == 'record' else None
+        self.category_name = get_category_name(target_url)
+        self.links_with_images = {}
+        self.tiles = []
+        self.pages_fetched = 0
+        self.requests_count = 0
+        self.stopped = False
+
+    def run(self):
+        """Сбор ссылок и сохранение в LINKS_OUTPUT_FILE"""
+        start_time = time.time()
+        try:
+            asyncio.run(self.collect())
+        except Exception as e:
+            self.logger.error(f"Ошибка HTTP-сбора ссылок: {str(e)}")
+
+        duration = time.time() - start_time
+        self.logger.info(f"HTTP: собрано {len(self.links_with_images)} ссылок с {self.pages_fetched} "
+                         f"страниц за {duration:.2f} секунд")
+        if not self.links_with_images:
+            return False, {}
+        return self.save_links(), dict(self.links_with_images)
+
+    async def collect(self):
+        """Первая страница определяет размер страницы, остальные запрашиваются волнами"""
+        semaphore = asyncio.Semaphore(self.concurrency)
+        connector = aiohttp.TCPConnector(limit=self.concurrency, keepalive_timeout=30)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout, headers=HTTP_HEADERS) as session:
+            first_page = await self._fetch_page(session, semaphore, 1)
+            if not first_page:
+                self.logger.warning("Первая страница листинга не содержит карточек")
+                return
+            await self._add_tiles(first_page)
+
+            next_page = 2
+            page_size = len(first_page)
+            while not self.stopped and len(self.links_with_images) < self.max_links and next_page <= self.max_pages:
+                # Сколько страниц нужно до цели, но не больше числа одновременных запросов
+                needed = math.ceil((self.max_links - len(self.links_with_images)) / page_size)
+                pages = list(range(next_page, min(next_page + max(1, min(needed, self.concurrency)),
+                                                  self.max_pages + 1)))
+                next_page = pages[-1] + 1
+
+                results = await asyncio.gather(*[self._fetch_page(session, semaphore, page) for page in pages])
+                # Результаты волны добавляются по порядку страниц до первой пустой или
+                # повторяющей уже собранные карточки (конец листинга)
+                for tiles in results:
+                    if not tiles or not await self._add_tiles(tiles):
+                        self.stopped = True
+                        break
+
+    async def _fetch_page(self, session, semaphore, page):
+        """Карточки страницы листинга; пустой список - страницы нет или она не разобрана"""
+        url = replay_url(page_url(self.target_url, page, self.base_url))
+        for attempt in range(HTTP_RETRIES + 1):
+            try:
+                async with semaphore:
+                    await self.rate_limiter.acquire_async(url)
+                    self.requests_count += 1
+                    async with session.get(url) as response:
+                        if self.archive is not None and is_archived_host(url):
+                            self.archive.put(url, response.status, response.headers.get('Content-Type'),
+                                             await response.read())
+                        if response.status != 200:
+                            self.logger.debug(f"HTTP {response.status}: {url}")
+                            return []
+                        body = await response.text()
+                self.pages_fetched += 1
+                return extract_tiles(parse_widget_states(body))
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                self.logger.debug(f"Ошибка запроса страницы {page} (попытка {attempt + 1}): {str(e)}")
+        return []
+
+    async def _add_tiles(self, tiles):
+        """Новые карточки в порядке листинга с передачей получателю. Возвращает их число"""
+        new_links = []
+        for tile in tiles:
+            if len(self.links_with_images) >= self.max_links:
+                break
+            if tile['url'] in self.links_with_images:
+                continue
+            self.links_with_images[tile['url']] = tile['image_url']
+            self.tiles.append(tile)
+            new_links.append(tile['url'])
+
+        if not new_links:
+            return 0
+        self.logger.info(f"Собрано: {len(self.links_with_images)}/{self.max_links}")
+        # Получатель может ждать места в очереди: ждем в отдельном потоке, не блокируя запросы
+        if self.on_links is not None and await asyncio.to_thread(self.on_links, new_links) is False:
+            self.logger.warning("Получатель ссылок остановлен, сбор прекращен")
+            self.stopped = True
+        return len(new_links)
+
+    def save_links(self):
+        try:
+            with open(LINKS_OUTPUT_FILE, "w", encoding="utf-8") as f:
+                json.dump(self.links_with_images, f, ensure_ascii=False, indent=2)
+            self.logger.info(f"Сохранено {len(self.links_with_images)} ссылок с изображениями в файл: "
+                             f"{os.path.abspath(LINKS_OUTPUT_FILE)}")
+            return True
+        except Exception as e:
+            self.logger.error(f"Ошибка при сохранении ссылок: {str(e)}")
+            return False
+
+    def get_statistics(self):
+        return {
+            'total_collected': len(self.links_with_images),
+            'pages_fetched': self.pages_fetched,
+            'requests': self.requests_count,
+            'target_count': self.max_links,
+            'category': self.category_name,
+            'output_format': 'JSON'
+        }
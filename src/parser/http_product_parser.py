@@ -0,0 +1,228 @@
+import asyncio
+import html
+import json
+import logging
+import re
+import time
+from urllib.parse import urlsplit
+import aiohttp
+from src.config import (OZON_BASE_URL, PAGE_ARCHIVE_MODE, HTTP_CONCURRENCY, HTTP_TIMEOUT, HTTP_RETRIES,
+                        HTTP_HEADERS, get_seller_id)
+from src.utils.rate_limiter import get_rate_limiter
+from src.utils.page_archive import get_page_archive, is_archived_host, replay_url
+
+# Состояния виджетов в HTML страницы товара:
+# <div id="state-webProductHeading-3385933-default-1" data-state='{...}'>
+WIDGET_STATE_RE = re.compile(
+    r'<div[^>]*?\bid="state-([A-Za-z][A-Za-z0-9]*)-[^"]*"[^>]*?\bdata-state=\'([^\']*)\'',
+    re.S
+)
+
+# Строка похожа на юридическое название компании
+LEGAL_NAME_RE = re.compile(r'^(ООО|ИП|АО|ЗАО|ПАО|ОАО|НАО)\s|\b(LLC|Ltd|Inc)\b')
+
+
+def rewrite_to_base(url, base_url=OZON_BASE_URL):
+    """Перенос URL Ozon на другой базовый адрес (например, локальный стенд)"""
+    parts = urlsplit(url)
+    path = parts.path + (f"?{parts.query}" if parts.query else "")
+    return base_url.rstrip('/') + path
+
+
+def parse_widget_states(body):
+    """Состояния виджетов страницы: {имя виджета: dict}.
+
+    Понимает и HTML страницы (атрибуты data-state), и JSON API
+    с полем widgetStates.
+    """
+    states = {}
+    stripped = body.lstrip()
+    if stripped.startswith('{'):
+        try:
+            payload = json.loads(stripped)
+        except ValueError:
+            payload = {}
+        for key, value in (payload.get('widgetStates') or {}).items():
+            widget_name = key.split('-', 1)[0]
+            try:
+                states.setdefault(widget_name, json.loads(value) if isinstance(value, str) else value)
+            except ValueError:
+                continue
+        return states
+
+    for widget_name, raw_state in WIDGET_STATE_RE.findall(body):
+        try:
+            states.setdefault(widget_name, json.loads(html.unescape(raw_state)))
+        except ValueError:
+            continue
+    return states
+
+
+def _iter_strings(value):
+    """Все строки во вложенной структуре JSON"""
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _iter_strings(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from _iter_strings(item)
+
+
+def _first_key(value, keys):
+    """Первое непустое строковое значение по одному из ключей (поиск в глубину)"""
+    if isinstance(value, dict):
+        for key in keys:
+            if isinstance(value.get(key), str) and value[key].strip():
+                return value[key].strip()
+        items = value.values()
+    elif isinstance(value, list):
+        items = value
+    else:
+        return None
+    for item in items:
+        found = _first_key(item, keys)
+        if found:
+            return found
+    return None
+
+
+def extract_product(states):
+    """Данные товара из состояний виджетов. Поля, которых нет в JSON, равны None"""
+    product = {
+        'page_type': None,
+        'product_name': None,
+        'image_url': None,
+        'seller_link': None,
+        'seller_name': None,
+        'company_name': None
+    }
+
+    if 'webOutOfStock' in states:
+        product['page_type'] = 'out_of_stock'
+        product['product_name'] = _first_key(states['webOutOfStock'], ['skuName', 'title', 'name'])
+    elif 'webProductHeading' in states:
+        product['page_type'] = 'product'
+    if not product['product_name'] and 'webProductHeading' in states:
+        product['product_name'] = _first_key(states['webProductHeading'], ['title'])
+
+    gallery = states.get('webGallery')
+    if gallery:
+        image_url = gallery.get('coverImage') or _first_key(gallery.get('images', []), ['src'])
+        if image_url:
+            product['image_url'] = image_url.replace("wc50/", "wc1000/").replace("wc250/", "wc1000/").replace("wc500/", "wc1000/")
+
+    seller = states.get('webCurrentSeller')
+    if seller:
+        product['seller_link'] = _first_key(seller, ['link', 'sellerLink', 'url'])
+        product['seller_name'] = _first_key(seller, ['name', 'title'])
+        # Юридическое название встречается в JSON не всегда (обычно только в тултипе)
+        for text in _iter_strings(seller):
+            text = text.strip()
+            # Кавычки вокруг всей строки убираются, кавычки названия (ООО "Ромашка") остаются
+            if len(text) > 1 and text[0] == text[-1] == '"':
+                text = text[1:-1].strip()
+            if LEGAL_NAME_RE.search(text):
+                product['company_name'] = text
+                break
+
+    return product
+
+
+class HttpProductParser:
+    """Парсинг товаров без браузера по JSON-состояниям виджетов страницы"""
+
+    def __init__(self, base_url=OZON_BASE_URL, concurrency=HTTP_CONCURRENCY, timeout=HTTP_TIMEOUT,
+                 seller_cache=None):
+        self.logger = logging.getLogger('http_product_parser')
+        self.seller_cache = seller_cache  # Юридические названия уже встречавшихся продавцов
+        self.base_url = base_url
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.requests_count = 0
+        self.rate_limiter = get_rate_limiter()
+        self.archive = get_page_archive() if PAGE_ARCHIVE_MODE == 'record' else None
+
+    def run(self, urls):
+        """Синхронный запуск: {url: результат} для разобранных URL и список остальных"""
+        return asyncio.run(self.parse_urls(urls))
+
+    async def parse_urls(self, urls):
+        """Параллельная загрузка страниц через пул keep-alive соединений"""
+        start_time = time.time()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        connector = aiohttp.TCPConnector(limit=self.concurrency, keepalive_timeout=30)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout, headers=HTTP_HEADERS) as session:
+            tasks = [self._parse_one(session, semaphore, url) for url in urls]
+            parsed = await asyncio.gather(*tasks)
+
+        resolved = {}
+        unresolved = []
+        for url, result in zip(urls, parsed):
+            if result is None:
+                unresolved.append(url)
+            else:
+                resolved[url] = result
+
+        duration = time.time() - start_time
+        self.logger.info(f"HTTP: разобрано {len(resolved)} из {len(urls)} товаров за {duration:.2f} секунд")
+        return resolved, unresolved
+
+    async def _parse_one(self, session, semaphore, url):
+        """Результат в формате PageParser или None, если страницу нужно разобрать браузером"""
+        body = await self._fetch(session, semaphore, url)
+        if body is None:
+            return None
+
+        product = extract_product(parse_widget_states(body))
+        if not product['page_type'] or not product['product_name']:
+            return None
+        
+        if self.seller_cache is not None:
+            seller_id = get_seller_id(product['seller_link'])
+            if product['company_name']:
+                self.seller_cache.put_seller(seller_id, product['company_name'])
+            else:
+                product['company_name'] = self.seller_cache.get_seller(seller_id)
+
+        if product['page_type'] == 'out_of_stock':
+            return {
+                'product_name': product['product_name'],
+                'company_name': product['company_name'] or product['seller_name'] or 'Не найдено',
+                'image_url': product['image_url'] or 'Изображение не найдено',
+                'status': 'out_of_stock'
+            }
+
+        # Без юридического названия компании страницу дочитывает браузер через тултип
+        if not product['company_name']:
+            return None
+
+        return {
+            'product_name': product['product_name'],
+            'company_name': product['company_name'],
+            'image_url': product['image_url'] or 'Изображение не найдено',
+            'status': 'success'
+        }
+
+    async def _fetch(self, session, semaphore, url):
+        """Загрузка страницы с повторной попыткой при сетевой ошибке"""
+        target_url = replay_url(rewrite_to_base(url, self.base_url))
+        for attempt in range(HTTP_RETRIES + 1):
+            try:
+                async with semaphore:
+                    await self.rate_limiter.acquire_async(target_url)
+                    self.requests_count += 1
+                    async with session.get(target_url) as response:
+                        if self.archive is not None and is_archived_host(target_url):
+                            self.archive.put(target_url, response.status, response.headers.get('Content-Type'),
+                                             await response.read())
+                        if response.status != 200:
+                            self.logger.debug(f"HTTP {response.status}: {url}")
+                            return None
+                        return await response.text()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                self.logger.debug(f"Ошибка HTTP-запроса {url} (попытка {attempt + 1}): {str(e)}")
+        return None
@@ -1,29 +1,87 @@
 import logging
-import time
 import os
 import json
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from src.config import *
-from src.utils.driver_manager import DriverManager
+from src.utils.driver_manager import get_driver_pool, collect_network_stats
+from src.utils.rate_limiter import get_rate_limiter
+from src.utils.tracing import traced, get_tracer
+from src.utils.page_readiness import wait_for_js
+from src.utils.page_archive import replay_url, original_url, record_page
+
+# Карточки ленты с data-index больше последнего просмотренного или из списка
+# недозагруженных: [индекс, ссылка, изображение], по возрастанию индекса
+NEW_TILES_JS = """
+    const container = document.getElementById('contentScrollPaginator');
+    if (!container) return [];
+    const lastIndex = arguments[0];
+    const pending = new Set(arguments[1]);
+    const tiles = [];
+    for (const tile of container.querySelectorAll('div[data-index]')) {
+        const index = parseInt(tile.getAttribute('data-index'), 10);
+        if (isNaN(index) || (index <= lastIndex && !pending.has(index))) continue;
+        const link = tile.querySelector('a.tile-clickable-element');
+        const img = tile.querySelector('img');
+        tiles.push([index, link ? link.href : null, img && img.src ? img.src : null]);
+    }
+    return tiles.sort((a, b) => a[0] - b[0]);
+"""
+
+# Скролл ленты: к последней карточке или (после скролла без подгрузки) в самый низ.
+# Возвращает data-index последней карточки до скролла
+SCROLL_FEED_JS = """
+    const container = document.getElementById('contentScrollPaginator');
+    const tiles = container ? container.querySelectorAll('div[data-index]') : [];
+    if (!tiles.length) return null;
+    const last = tiles[tiles.length - 1];
+    if (arguments[0]) {
+        window.scrollTo({top: document.body.scrollHeight, behavior: 'instant'});
+    } else {
+        last.scrollIntoView({behavior: 'instant', block: 'end'});
+    }
+    return parseInt(last.getAttribute('data-index'), 10);
+"""
+
+# Предикат для wait_for_js: в ленте появилась карточка после args.lastIndex
+NEW_TILES_LOADED_JS = """
+    const container = document.getElementById('contentScrollPaginator');
+    const tiles = container ? container.querySelectorAll('div[data-index]') : [];
+    if (!tiles.length) return null;
+    const index = parseInt(tiles[tiles.length - 1].getAttribute('data-index'), 10);
+    return index > args.lastIndex ? {index: index} : null;
+"""
 
 class OzonLinkParser:
-    def __init__(self, target_url):
+    def __init__(self, target_url, on_links=None, base_url=OZON_BASE_URL):
         self.target_url = target_url
+        # Ссылки на товары Ozon или локального стенда (OZON_BASE_URL)
+        self.product_prefixes = ("https://www.ozon.ru/product/", f"{base_url.rstrip('/')}/product/")
+        # Получатель новых ссылок по ходу сбора (например, OzonProductParser.add_links).
+        # Может ждать места в очереди; False - сбор нужно прекратить
+        self.on_links = on_links
+        self.streamed_count = 0
+        self.stopped = False
         self.driver = None
-        self.driver_manager = DriverManager()
+        self.driver_manager = get_driver_pool()
+        self.rate_limiter = get_rate_limiter()
+        self.tracer = get_tracer()
         self.unique_links = set()
         self.ordered_links = []
         self.links_with_images = {}  # Словарь для хранения ссылок и URL изображений
         self.idle_scrolls = 0
+        self.last_tile_index = -1  # Последняя разобранная карточка ленты
+        self.pending_tiles = set()  # Карточки без ссылки или изображения, проверяются снова
+        self.scroll_wait = SCROLL_WAIT_TIMEOUT  # Текущее ожидание подгрузки после скролла
         self.logger = logging.getLogger('link_parser')
         self.category_name = get_category_name(target_url)
         self.logger.info(f"Категория: {self.category_name}")
 
+    @traced('links.init_driver')
     def init_driver(self):
         try:
-            self.driver = self.driver_manager.create_driver()
+            self.driver = self.driver_manager.acquire_driver(profile='category')
             self.driver.maximize_window()
             self.logger.info("Драйвер успешно инициализирован")
             return True
@@ -31,10 +89,12 @@ class OzonLinkParser:
             self.logger.error(f"Ошибка при инициализации драйвера: {str(e)}")
             return False
 
+    @traced('links.load_page')
     def load_page(self):
         try:
             self.logger.info(f"Открытие страницы: {self.target_url}")
-            self.driver.get(self.target_url)
+            self.rate_limiter.acquire(self.target_url)
+            self.driver.get(replay_url(self.target_url))
             WebDriverWait(self.driver, LOAD_TIMEOUT).until(
                 EC.presence_of_element_located((By.ID, "contentScrollPaginator"))
             )
@@ -44,70 +104,54 @@ class OzonLinkParser:
             self.logger.error(f"Ошибка при загрузке страницы: {str(e)}")
             return False
 
+    @traced('links.scroll')
     def scroll_page(self):
-        try:
-            last_seen_index = -1
+        """Скролл ленты и ожидание новых карточек по мутациям DOM.
 
-            while True:
-                container = self.driver.find_element(By.ID, "contentScrollPaginator")
-                items = container.find_elements(By.CSS_SELECTOR, "div[data-index]")
-                if not items:
-                    self.logger.warning("Нет товаров в контейнере")
-                    break
-
-                current_last_index = int(items[-1].get_attribute("data-index"))
-
-                if current_last_index == last_seen_index:
-                    self.logger.debug("Новые товары не загружаются — выходим из скролла")
-                    break
+        Возвращает True, как только лента подгрузила карточки. Без подгрузки
+        ожидание следующего скролла растет до SCROLL_MAX_WAIT
+        """
+        try:
+            # Каждый скролл подгружает следующую страницу ленты
+            self.rate_limiter.acquire(self.target_url)
+            last_index = self.driver.execute_script(SCROLL_FEED_JS, self.idle_scrolls > 0)
+            if last_index is None:
+                self.logger.warning("Нет товаров в контейнере")
+                return False
 
-                last_seen_index = current_last_index
+            if wait_for_js(self.driver, NEW_TILES_LOADED_JS, self.scroll_wait, {'lastIndex': last_index}):
+                self.scroll_wait = SCROLL_WAIT_TIMEOUT
+                return True
 
-                self.driver.execute_script("arguments[0].scrollIntoView({behavior: 'smooth', block: 'end'});", items[-1])
-                time.sleep(SCROLL_DELAY)
+            self.logger.debug(f"Новые товары не загрузились за {self.scroll_wait:.1f} с")
+            self.scroll_wait = min(self.scroll_wait * SCROLL_BACKOFF, SCROLL_MAX_WAIT)
+            return False
 
         except Exception as e:
             self.logger.warning(f"Ошибка при скролле: {str(e)}")
+            return False
 
+    @traced('links.extract')
     def extract_links(self):
+        """Новые карточки ленты одним вызовом скрипта: {ссылка: изображение} по порядку"""
         try:
-            # Находим контейнер с товарами
-            container = self.driver.find_element(By.ID, "contentScrollPaginator")
-            # Получаем все карточки товаров, отсортированные по data-index
-            elements = container.find_elements(By.CSS_SELECTOR, "div[data-index]")
-            
-            # Сортируем элементы по их data-index для сохранения порядка
-            elements.sort(key=lambda e: int(e.get_attribute("data-index")))
+            tiles = self.driver.execute_script(NEW_TILES_JS, self.last_tile_index, sorted(self.pending_tiles))
             
-            # Используем OrderedDict для сохранения порядка
             links_with_images = {}
-            ordered_elements = []
-
-            for element in elements:
-                try:
-                    # Получаем индекс элемента для логирования
-                    data_index = element.get_attribute("data-index")
-                    
-                    # Получаем ссылку на товар
-                    link_element = element.find_element(By.CSS_SELECTOR, "a.tile-clickable-element")
-                    href = link_element.get_attribute("href")
-                    
-                    # Получаем URL изображения
-                    img_element = element.find_element(By.CSS_SELECTOR, "img")
-                    img_url = img_element.get_attribute("src")
-                    
-                    if href and href.startswith("https://www.ozon.ru/product/") and img_url:
-                        self.logger.debug(f"Карточка #{data_index}: {href}")
-                        # Сохраняем элемент с его индексом для последующей сортировки
-                        ordered_elements.append((int(data_index), href, img_url))
-                except Exception as e:
-                    self.logger.debug(f"Ошибка при извлечении данных из элемента: {str(e)}")
-                    continue
-            
-            # Сортируем элементы по индексу и создаем словарь, сохраняя порядок
-            ordered_elements.sort(key=lambda x: x[0])
-            for _, href, img_url in ordered_elements:
-                links_with_images[href] = img_url
+            for data_index, href, img_url in tiles:
+                self.last_tile_index = max(self.last_tile_index, data_index)
+                # Ссылки страницы из архива возвращаются на адрес Ozon
+                href = original_url(href)
+                is_product = bool(href) and href.startswith(self.product_prefixes)
+                if is_product and img_url:
+                    self.logger.debug(f"Карточка #{data_index}: {href}")
+                    links_with_images[href] = img_url
+                    self.pending_tiles.discard(data_index)
+                elif not href or is_product:
+                    # Карточка еще не отрисована или изображение не подгружено
+                    self.pending_tiles.add(data_index)
+                else:
+                    self.pending_tiles.discard(data_index)
 
             return links_with_images
         except Exception as e:
@@ -116,7 +160,7 @@ class OzonLinkParser:
 
     def collect_links(self):
         current_links_with_images = self.extract_links()
-        new_links = set(current_links_with_images.keys()) - self.unique_links
+        new_links = [link for link in current_links_with_images if link not in self.unique_links]
 
         if new_links:
             self.logger.info(f"Найдено новых ссылок: {len(new_links)}")
@@ -125,11 +169,25 @@ class OzonLinkParser:
                 self.ordered_links.append(link)
                 self.links_with_images[link] = current_links_with_images[link]
             self.idle_scrolls = 0
+            self._stream_links(new_links)
             return True
         else:
             self.idle_scrolls += 1
             return False
 
+    def _stream_links(self, new_links):
+        """Передача новых ссылок получателю в пределах TOTAL_LINKS"""
+        if self.on_links is None:
+            return
+        batch = new_links[:max(0, TOTAL_LINKS - self.streamed_count)]
+        if not batch:
+            return
+        self.streamed_count += len(batch)
+        if self.on_links(batch) is False:
+            self.logger.warning("Получатель ссылок остановлен, сбор прекращен")
+            self.stopped = True
+
+    @traced('links.save')
     def save_links(self):
         try:
             # Создаем словарь только для первых TOTAL_LINKS ссылок
@@ -149,6 +207,15 @@ class OzonLinkParser:
             return False
 
     def run(self):
+        # Сбор ссылок пишется в трассировку задачи или, без нее, в собственный файл
+        self.tracer.begin_job(f"links_{self.category_name}_{get_timestamp()}")
+        try:
+            with self.tracer.context(worker='links', url=self.target_url):
+                return self._collect()
+        finally:
+            self.tracer.end_job()
+
+    def _collect(self):
         try:
             if not self.init_driver():
                 return False, []
@@ -157,12 +224,15 @@ class OzonLinkParser:
                 return False, []
 
             self.collect_links()
+            # Ответы ленты в архив (в режиме записи): документ и каждая подгрузка прокруткой
+            record_page(self.driver)
 
-            while len(self.ordered_links) < TOTAL_LINKS and self.idle_scrolls < MAX_IDLE_SCROLLS:
+            while (not self.stopped and len(self.ordered_links) < TOTAL_LINKS
+                   and self.idle_scrolls < MAX_IDLE_SCROLLS):
                 self.scroll_page()
                 if self.collect_links():
                     self.logger.info(f"Собрано: {len(self.ordered_links)}/{TOTAL_LINKS}")
-                time.sleep(0.5)
+                record_page(self.driver)
 
             if self.save_links():
                 self.logger.info(f"Собрано финально: {len(self.ordered_links)} ссылок с изображениями")
@@ -195,9 +265,12 @@ class OzonLinkParser:
     def cleanup(self):
         try:
             if self.driver:
-                self.driver.quit()
-                self.driver_manager.remove_driver(self.driver)
-            self.driver_manager.close_all_drivers()
+                network_stats = collect_network_stats(self.driver)
+                self.logger.info(f"Заблокировано запросов: {network_stats['blocked_requests']}, "
+                                 f"получено {network_stats['transferred_bytes'] / 1024 / 1024:.1f} МБ")
+                # Возвращаем браузер в общий пул вместо закрытия
+                self.driver_manager.release_driver(self.driver, pages=1)
+                self.driver = None
             self.logger.info("Ресурсы очищены")
         except Exception as e:
             self.logger.warning(f"Ошибка очистки: {str(e)}")
@@ -3,107 +3,476 @@ import threading
 import queue
 import time
 from selenium.webdriver.common.by import By
-from src.config import WORKER_COUNT, TABS_PER_WORKER, get_timestamp
-from src.utils.driver_manager import DriverManager
+from src.config import (WORKER_COUNT, TABS_PER_WORKER, TAB_LOAD_TIMEOUT, TAB_POLL_INTERVAL,
+                        PRODUCT_ENGINE, RESULT_CACHE_ENABLED, CONCURRENCY_ADAPTIVE, RETRY_DEFERRED,
+                        RETRY_PASSES, RETRY_COOLDOWN, RETRY_WORKERS, MAIN_PASS_PAGE_ATTEMPTS,
+                        LINK_QUEUE_SIZE, PAGE_ARCHIVE_MODE, get_timestamp, get_product_id)
+from src.utils.driver_manager import get_driver_pool, forget_tabs
+from src.utils.result_cache import get_result_cache
+from src.utils.job_journal import JobJournal
+from src.utils.rate_limiter import get_rate_limiter
+from src.utils.metrics import get_metrics
+from src.utils.tracing import get_tracer
+from src.utils.page_archive import replay_url
 from .page_parser import PageParser
-from src.utils.excel_exporter import ExcelExporter
+from .url_scheduler import UrlScheduler
+from .concurrency_controller import ConcurrencyController
+from .url_budget import UrlBudget
+from src.utils.exporters import create_exporter
+
+# Вкладка готова к разбору, когда появился заголовок товара, блок "нет в наличии"
+# или страница ограничения доступа
+TAB_READY_JS = """
+    if (location.href === 'about:blank' || document.readyState === 'loading') return false;
+    if (document.querySelector('div[data-widget="webProductHeading"], div[data-widget="webOutOfStock"]')) return true;
+    const title = document.title.toLowerCase();
+    return title.includes('доступ ограничен') || title.includes('access denied');
+"""
 
 class OzonProductParser:
-    def __init__(self, category_name):
-        self.results = []
+    def __init__(self, category_name, tabs_per_worker=None, engine=None, force_refresh=False, timestamp=None,
+                 export_formats=None):
         self.processed_count = 0
+        self.webdriver_commands = 0
+        self.blocked_requests = 0
+        self.transferred_bytes = 0
         self.stop_event = threading.Event()
         self.logger = logging.getLogger('product_parser')
         self.category_name = category_name
-        self.timestamp = get_timestamp()
+        self.timestamp = timestamp or get_timestamp()
         self.worker_count = WORKER_COUNT
         self.total_urls = 0
         self.results_lock = threading.Lock()
-        self.tabs_per_worker = TABS_PER_WORKER  # Количество вкладок на каждого воркера
+        self.tabs_per_worker = tabs_per_worker or TABS_PER_WORKER  # Количество вкладок на каждого воркера
+        if PAGE_ARCHIVE_MODE == 'record':
+            # DevTools отдает тела ответов только текущей вкладки: записи архива нужна одна вкладка
+            self.tabs_per_worker = 1
+        self.scheduler = None
+        self.controller = None  # Регулятор числа активных воркеров
+        self.engine = engine or PRODUCT_ENGINE  # "selenium" или "http"
+        self.http_resolved_count = 0
+        self.force_refresh = force_refresh  # Игнорировать кэш и перепарсить все товары
+        self.cache_hits = 0
+        self.budget_exhausted_count = 0  # URL, не уложившихся в бюджет времени и попыток
+        self.deferred = None  # {url: последний результат} для повторного прохода
+        self.retry_pass = 0  # Номер текущего повторного прохода (0 - основной)
+        self.deferred_count = 0
+        self.retry_recovered_count = 0
+        self.streamed_urls = set()  # URL, уже полученные от сбора ссылок
+        self.journal = None  # Журнал задачи для возобновления после сбоя
+        self.journaled_results = {}  # Результаты из журнала при возобновлении
+        self.export_failed = False
         
         # Инициализация компонентов
-        self.driver_manager = DriverManager()
-        self.page_parser = PageParser()
-        self.excel_exporter = ExcelExporter(category_name, self.timestamp)
+        self.driver_manager = get_driver_pool()
+        self.result_cache = get_result_cache() if RESULT_CACHE_ENABLED else None
+        self.page_parser = PageParser(seller_cache=self.result_cache)
+        self.rate_limiter = get_rate_limiter()  # Общий для всех задач процесса
+        self.metrics = get_metrics()
+        self.tracer = get_tracer()
+        self.export_formats = export_formats  # None - форматы из EXPORT_FORMATS
+        self.exporter = create_exporter(category_name, self.timestamp, export_formats)
         
-        # Имя файла Excel для логирования
-        self.excel_filename = self.excel_exporter.get_filename()
+        # Имя основного файла результатов для логирования
+        self.excel_filename = self.exporter.get_filename()
         
         self.logger.info(f"Инициализирован парсер для категории: {category_name}")
-        self.logger.info(f"Настройка: {self.worker_count} воркеров")
+        self.logger.info(f"Настройка: {self.worker_count} воркеров, {self.tabs_per_worker} вкладок на воркера")
+
+    @classmethod
+    def resume(cls, journal_path, **kwargs):
+        """Парсер для продолжения задачи из журнала. Возвращает (парсер, все URL задачи).
 
-    def worker(self, urls_for_worker, worker_id):
-        """Рабочий поток для обработки URL"""
+        URL с ошибками и исчерпанным бюджетом обрабатываются заново, остальные берутся из журнала.
+        """
+        journal = JobJournal(journal_path)
+        header, results, _ = journal.load()
+        kwargs.setdefault('export_formats', header.get('export_formats'))
+        parser = cls(header['category_name'], timestamp=header['timestamp'], **kwargs)
+        parser.journal = journal
+        parser.journaled_results = {
+            url: result for url, result in results.items()
+            if result.get('status') not in ('error', 'budget_exhausted')
+        }
+        parser.logger.info(f"Возобновление задачи: в журнале {len(parser.journaled_results)} "
+                           f"из {len(header['urls'])} товаров")
+        return parser, header['urls']
+
+    def worker(self, worker_id):
+        """Рабочий поток: берет URL из общей очереди, пока она не опустеет"""
+        driver = None
+        pages_done = 0
+        driver_broken = False
         try:
-            # Создаем один драйвер для воркера
-            driver = self.driver_manager.create_driver()
             self.logger.info(f"Воркер {worker_id} запущен")
             
-            # Поскольку у нас только одна вкладка, обрабатываем URL напрямую
-            for url_index, url in enumerate(urls_for_worker):
-                if self.stop_event.is_set():
-                    break
+            while not self.stop_event.is_set():
+                # Воркер вне цели регулятора ждет, вернув браузер в пул
+                if not self.controller.is_active(worker_id):
+                    self.driver_manager.release_driver(driver, pages=pages_done)
+                    driver, pages_done = None, 0
+                    self.logger.info(f"Воркер {worker_id} приостановлен регулятором параллелизма")
+                    if not self.controller.wait_for_slot(worker_id, self._no_work_left):
+                        break
+                    continue
                 
-                try:
-                    # Парсим страницу
-                    result = self.page_parser.parse_page(driver, url)
-                    
-                    # Сохраняем результат
-                    with self.results_lock:
-                        self.results.append({
-                            'url': url,
-                            'product_name': result.get('product_name', 'Не найдено'),
-                            'company_name': result.get('company_name', 'Не найдено'),
-                            'image_url': result.get('image_url', 'Не найдено'),
-                            'status': result.get('status', 'success')
-                        })
-                        self.processed_count += 1
-                        current_count = self.processed_count
-                    
-                    # Логируем результат
-                    self.logger.info(f"[{current_count}/{self.total_urls}] Воркер {worker_id}: {url}")
-                    self.logger.info(f"   Товар: {result.get('product_name', 'Не найдено')}")
-                    self.logger.info(f"   Компания: {result.get('company_name', 'Не найдено')}")
-                    
-                except Exception as e:
-                    self.logger.error(f"Ошибка в воркере {worker_id}: {str(e)}")
-                    # Сохраняем результат с ошибкой
-                    with self.results_lock:
-                        self.results.append({
-                            'url': url,
-                            'product_name': f"Ошибка: {str(e)}",
-                            'company_name': 'Не найдено',
-                            'image_url': 'Не найдено',
-                            'status': 'error'
-                        })
-                        self.processed_count += 1
+                # Берем браузер из общего пула; в повторном проходе - только что запущенный
+                if driver is None:
+                    with self.tracer.span('pool.acquire_driver', worker=worker_id):
+                        driver = self.driver_manager.acquire_driver(profile='product', fresh=bool(self.retry_pass))
+                
+                if self.tabs_per_worker > 1 and not self.retry_pass:
+                    pages, driver_alive = self._process_multi_tab(driver, worker_id)
+                else:
+                    pages, driver_alive = self._process_single_tab(driver, worker_id)
+                pages_done += pages
                 
-                # Небольшая пауза между обработкой URL
-                time.sleep(0.3)
+                if not driver_alive:
+                    # Браузер упал или заблокирован: его URL уже возвращены в очередь, берем новый
+                    self.logger.warning(f"Браузер воркера {worker_id} заменяется")
+                    self.driver_manager.release_driver(driver, pages=pages_done, broken=True)
+                    driver, pages_done = None, 0
+                    continue
+                
+                # Очередь пуста; иначе воркер остановлен регулятором и уйдет на ожидание
+                if self._no_work_left():
+                    break
+                
+                # При потоковом сборе ссылок очередь может временно опустеть
+                if not pages:
+                    self.scheduler.wait_for_urls(TAB_POLL_INTERVAL * 5)
                 
         except Exception as e:
             self.logger.error(f"Ошибка в воркере {worker_id}: {str(e)}")
+            driver_broken = True
         finally:
-            # Закрываем драйвер воркера
+            # URL, которые воркер не успел обработать, забирают другие воркеры
+            for url in self.scheduler.abandon_worker(worker_id):
+                self._record_result(worker_id, url, {
+                    'product_name': 'Ошибка: браузер не отвечает',
+                    'status': 'error'
+                })
+            
+            # Возвращаем браузер в пул для следующих задач
             try:
-                driver.quit()
-                self.driver_manager.remove_driver(driver)
+                self.driver_manager.release_driver(driver, pages=pages_done, broken=driver_broken)
             except Exception as e:
-                self.logger.warning(f"Ошибка при закрытии драйвера в воркере {worker_id}: {str(e)}")
+                self.logger.warning(f"Ошибка при возврате драйвера в воркере {worker_id}: {str(e)}")
             
             self.logger.info(f"Воркер {worker_id} завершил работу")
 
+    def _process_single_tab(self, driver, worker_id):
+        """Обработка URL по одному в единственной вкладке.
+
+        Возвращает (число страниц, жив ли браузер)
+        """
+        pages_done = 0
+        while not self.stop_event.is_set() and self.controller.is_active(worker_id):
+            url = self.scheduler.next_url(worker_id)
+            if url is None:
+                break
+            
+            result = self._parse_url(driver, worker_id, url)
+            pages_done += 1
+            
+            if not self._finish_url(driver, worker_id, url, result):
+                return pages_done, False
+        
+        return pages_done, True
+
+    def _process_multi_tab(self, driver, worker_id):
+        """Конвейерная обработка: несколько вкладок грузятся параллельно,
+        разбирается та, что загрузилась первой.
 
-    def distribute_urls(self, urls):
-        """Распределение URL между воркерами"""
-        urls_per_worker = [[] for _ in range(self.worker_count)]
+        Возвращает (число страниц, жив ли браузер)
+        """
+        pages_done = 0
+        control_handle = driver.current_window_handle
+        tab_handles = {}  # имя вкладки -> handle
+        loading = {}  # имя вкладки -> (url, время начала загрузки)
+        navigated_at = {}  # имя вкладки -> время перехода (после ограничителя частоты)
+        parsing_url = None  # URL, снятый с вкладки и еще не зафиксированный
         
-        # Распределяем URL между воркерами
-        for i, url in enumerate(urls):
-            worker_index = i % self.worker_count
-            urls_per_worker[worker_index].append(url)
+        try:
+            for tab_index in range(self.tabs_per_worker):
+                tab_name = f"ozon_tab_{worker_id}_{tab_index}"
+                url = self.scheduler.next_url(worker_id)
+                if url is None:
+                    break
+                loading[tab_name] = (url, time.time())
+                tab_handles[tab_name] = self._create_tab(driver, control_handle, tab_name)
+                navigated_at[tab_name] = self._load_in_tab(driver, control_handle, tab_name, url)
+            
+            while loading and not self.stop_event.is_set():
+                with self.tracer.span('tabs.wait_ready', worker=worker_id):
+                    tab_name = self._wait_for_ready_tab(driver, tab_handles, loading)
+                url, started_at = loading.pop(tab_name)
+                parsing_url = url
+                self.metrics.observe('ozon_stage_duration_seconds', time.time() - navigated_at.pop(tab_name),
+                                     {'stage': 'navigation'})
+                
+                driver.switch_to.window(tab_handles[tab_name])
+                result = self._parse_url(driver, worker_id, url, navigate=False, started_at=started_at)
+                pages_done += 1
+                
+                finished = self._finish_url(driver, worker_id, url, result)
+                parsing_url = None
+                if not finished:
+                    self._return_urls(worker_id, [pending_url for pending_url, _ in loading.values()],
+                                      'браузер не отвечает')
+                    return pages_done, False
+                
+                # Загружаем в освободившуюся вкладку следующий URL
+                if self.stop_event.is_set():
+                    break
+                if not self.controller.is_active(worker_id):
+                    continue  # Дорабатываем загруженные вкладки и уходим на паузу
+                next_url = self.scheduler.next_url(worker_id)
+                if next_url is not None:
+                    loading[tab_name] = (next_url, time.time())
+                    navigated_at[tab_name] = self._load_in_tab(driver, control_handle, tab_name, next_url)
+            
+            return pages_done, True
             
-        return urls_per_worker
+        except Exception as e:
+            # Ошибка вкладки (закрытое окно, упавший скрипт) не останавливает воркера:
+            # URL пачки возвращаются в очередь, вкладки создаются заново
+            self.logger.error(f"Ошибка вкладок в воркере {worker_id}: {str(e)}")
+            urls = [pending_url for pending_url, _ in loading.values()]
+            if parsing_url is not None:
+                urls.append(parsing_url)
+            self._close_tabs(driver, control_handle, tab_handles)
+            driver_alive = self.driver_manager.is_alive(driver)
+            self._return_urls(worker_id, urls, str(e) if driver_alive else 'браузер не отвечает')
+            return pages_done, driver_alive
+        finally:
+            self._close_tabs(driver, control_handle, tab_handles)
+
+    def _return_urls(self, worker_id, urls, reason):
+        """Возврат URL в очередь; исчерпавшие повторы получают результат с ошибкой"""
+        for url in urls:
+            if not self.scheduler.requeue(worker_id, url):
+                self._record_result(worker_id, url, {
+                    'product_name': f"Ошибка: {reason}",
+                    'company_name': 'Не найдено',
+                    'image_url': 'Не найдено',
+                    'status': 'error'
+                })
+
+    def _create_tab(self, driver, control_handle, tab_name):
+        """Открытие пустой именованной вкладки с профилем блокировки ресурсов"""
+        driver.switch_to.window(control_handle)
+        known_handles = set(driver.window_handles)
+        driver.execute_script("window.open('about:blank', arguments[0]);", tab_name)
+        handle = [h for h in driver.window_handles if h not in known_handles][0]
+        
+        # Блокировка DevTools действует на вкладку, поэтому применяется к каждой новой
+        driver.switch_to.window(handle)
+        self.driver_manager.apply_block_profile(driver, 'product', force=True)
+        return handle
+
+    def _load_in_tab(self, driver, control_handle, tab_name, url):
+        """Запуск загрузки URL в именованной вкладке без ожидания загрузки.
+
+        window.open из служебной вкладки не блокирует WebDriver, поэтому
+        остальные вкладки продолжают грузиться, пока разбирается текущая.
+        Возвращает время начала перехода.
+        """
+        with self.metrics.stage('rate_limit'):
+            self.rate_limiter.acquire(url)
+        navigated_at = time.time()
+        driver.switch_to.window(control_handle)
+        driver.execute_script("window.open(arguments[0], arguments[1]);", replay_url(url), tab_name)
+        return navigated_at
+
+    def _wait_for_ready_tab(self, driver, tab_handles, loading):
+        """Ожидание вкладки, в которой появился основной контент товара"""
+        while True:
+            for tab_name, (url, started_at) in loading.items():
+                driver.switch_to.window(tab_handles[tab_name])
+                if driver.execute_script(TAB_READY_JS):
+                    return tab_name
+                # Долго грузящуюся вкладку отдаем парсеру: он сам дождется или перезагрузит
+                if time.time() - started_at > TAB_LOAD_TIMEOUT:
+                    return tab_name
+            time.sleep(TAB_POLL_INTERVAL)
+
+    def _close_tabs(self, driver, control_handle, tab_handles):
+        """Закрытие рабочих вкладок и возврат в служебную (если она закрыта - в любую оставшуюся)"""
+        try:
+            for handle in tab_handles.values():
+                if handle in driver.window_handles:
+                    driver.switch_to.window(handle)
+                    driver.close()
+            forget_tabs(driver, tab_handles.values())
+            remaining = driver.window_handles
+            driver.switch_to.window(control_handle if control_handle in remaining else remaining[0])
+        except Exception as e:
+            self.logger.debug(f"Ошибка при закрытии вкладок: {str(e)}")
+
+    def _parse_url(self, driver, worker_id, url, navigate=True, started_at=None):
+        """Парсинг одного URL с перехватом ошибок.
+
+        started_at - начало загрузки страницы, если она грузилась заранее во вкладке
+        """
+        started_at = started_at or time.time()
+        # Бюджет отсчитывается от начала разбора: ожидание в очереди вкладок не в счет
+        budget = UrlBudget()
+        try:
+            # Основной проход не перезагружает страницу: повторы идут отложенно на новых браузерах
+            max_attempts = MAIN_PASS_PAGE_ATTEMPTS if self.deferred is not None and not self.retry_pass else 5
+            with self.metrics.page_in_flight(), self.tracer.context(worker=worker_id, url=url):
+                result = self.page_parser.parse_page(driver, url, navigate=navigate, budget=budget,
+                                                     max_attempts=max_attempts)
+        except Exception as e:
+            self.logger.error(f"Ошибка в воркере {worker_id}: {str(e)}")
+            result = {
+                'product_name': f"Ошибка: {str(e)}",
+                'company_name': 'Не найдено',
+                'image_url': 'Не найдено',
+                'status': 'error'
+            }
+        result['latency'] = time.time() - started_at
+        return result
+
+    def _finish_url(self, driver, worker_id, url, result):
+        """Фиксация результата. Возвращает False, если браузер нужно заменить:
+        он упал (URL вернулся в очередь) или заблокирован в повторном проходе
+        """
+        self.controller.record(result.get('latency', 0), result.get('status'))
+        self.metrics.record_page(result.get('status'))
+        
+        if result.get('status') == 'error' and not self.driver_manager.is_alive(driver):
+            if not self.scheduler.requeue(worker_id, url):
+                self._record_result(worker_id, url, result)
+            return False
+        
+        needs_retry = self.page_parser.should_retry(result)
+        if needs_retry and self.deferred is not None:
+            self._defer_url(url, result)
+        else:
+            if self.retry_pass and not needs_retry:
+                with self.results_lock:
+                    self.retry_recovered_count += 1
+            self._record_result(worker_id, url, result)
+        self.scheduler.complete(worker_id, url)
+        
+        # Повторный проход не продолжает на заблокированной сессии
+        return not (self.retry_pass and result.get('status') == 'access_denied')
+
+    def _defer_url(self, url, result):
+        """Откладывание URL на повторный проход"""
+        with self.results_lock:
+            if url not in self.deferred and not self.retry_pass:
+                self.deferred_count += 1
+            self.deferred[url] = result
+        self.logger.info(f"URL отложен на повторный проход ({result.get('status')}): {url}")
+
+    def _no_work_left(self):
+        """Приостановленным воркерам больше нечего ждать"""
+        return self.stop_event.is_set() or self.scheduler.is_exhausted()
+
+    def _restore_from_journal(self, urls):
+        """Результаты из журнала прерванной задачи. Возвращает URL, которые нужно парсить"""
+        unresolved = []
+        with self.results_lock:
+            for url in urls:
+                result = self.journaled_results.get(url)
+                if result is None:
+                    unresolved.append(url)
+                    continue
+                self._export_row({'url': url, **result})
+                self.processed_count += 1
+        
+        self.logger.info(f"Из журнала: {len(urls) - len(unresolved)} товаров, к парсингу: {len(unresolved)}")
+        return unresolved
+
+    def _resolve_from_cache(self, urls):
+        """Товары из кэша результатов. Возвращает URL, которые нужно парсить"""
+        unresolved = []
+        for url in urls:
+            try:
+                result = self.result_cache.get(get_product_id(url))
+            except Exception as e:
+                self.logger.warning(f"Ошибка чтения кэша товаров: {str(e)}")
+                result = None
+            if result is None:
+                unresolved.append(url)
+                continue
+            with self.results_lock:
+                self.cache_hits += 1
+            self._record_result('CACHE', url, result)
+        
+        self.logger.info(f"Из кэша: {len(urls) - len(unresolved)} товаров, к парсингу: {len(unresolved)}")
+        return unresolved
+
+    def _resolve_via_http(self, urls):
+        """Разбор товаров HTTP-движком. Возвращает URL, которые нужно разобрать браузером"""
+        from .http_product_parser import HttpProductParser
+        
+        try:
+            resolved, unresolved = HttpProductParser(seller_cache=self.result_cache).run(urls)
+        except Exception as e:
+            self.logger.error(f"Ошибка HTTP-движка, все товары будут разобраны браузером: {str(e)}")
+            return urls
+        
+        for url, result in resolved.items():
+            self._record_result('HTTP', url, result)
+        self.http_resolved_count += len(resolved)
+        self.logger.info(f"HTTP-движок: разобрано {len(resolved)}, в браузер: {len(unresolved)}")
+        return unresolved
+
+    def _record_result(self, worker_id, url, result):
+        """Сохранение результата обработки URL"""
+        row = {
+            'url': url,
+            'product_name': result.get('product_name', 'Не найдено'),
+            'company_name': result.get('company_name', 'Не найдено'),
+            'image_url': result.get('image_url', 'Не найдено'),
+            'status': result.get('status', 'success')
+        }
+        with self.results_lock:
+            self.processed_count += 1
+            self.webdriver_commands += result.get('webdriver_commands', 0)
+            self.blocked_requests += result.get('blocked_requests', 0)
+            self.transferred_bytes += result.get('transferred_bytes', 0)
+            if row['status'] == 'budget_exhausted':
+                self.budget_exhausted_count += 1
+            current_count = self.processed_count
+        self.metrics.inc('ozon_results_total', {'status': row['status']})
+        
+        # Строка сразу пишется в выгрузку, результаты не копятся в памяти
+        self._export_row(row)
+        
+        # Результат сразу попадает в журнал задачи
+        if self.journal is not None:
+            try:
+                self.journal.append_result(url, {key: value for key, value in row.items() if key != 'url'})
+            except Exception as e:
+                self.logger.warning(f"Ошибка записи в журнал задачи: {str(e)}")
+        
+        # Свежие полные результаты сохраняем в кэш для следующих задач: неполные строки
+        # последнего прохода и исчерпавшие бюджет должны перепарситься в следующий раз
+        cacheable = (row['status'] != 'budget_exhausted'
+                     and not self.page_parser.should_retry({**result, **row}))
+        if self.result_cache is not None and worker_id != 'CACHE' and cacheable:
+            try:
+                self.result_cache.put(get_product_id(url), result)
+            except Exception as e:
+                self.logger.warning(f"Ошибка записи в кэш товаров: {str(e)}")
+        
+        # Логируем результат
+        self.logger.info(f"[{current_count}/{self.total_urls}] Воркер {worker_id}: {url}")
+        self.logger.info(f"   Товар: {result.get('product_name', 'Не найдено')}")
+        self.logger.info(f"   Компания: {result.get('company_name', 'Не найдено')}")
+
+    def _export_row(self, row):
+        """Потоковая запись строки во все форматы выгрузки"""
+        try:
+            self.exporter.append_result(row)
+        except Exception as e:
+            self.export_failed = True
+            self.logger.error(f"Ошибка записи строки результата: {str(e)}")
 
     def run(self, urls):
         """Запуск парсинга"""
@@ -114,26 +483,173 @@ class OzonProductParser:
         
         start_time = time.time()
         self.logger.info(f"Начало обработки {self.total_urls} товаров")
+        if not self._start_job(urls):
+            return False
+        
+        urls = self._resolve_known(urls)
+        
+        # Основной проход; неудачные URL откладываются на повторные проходы
+        self.deferred = {} if RETRY_DEFERRED and RETRY_PASSES > 0 else None
+        self._run_pass(urls, self.worker_count, CONCURRENCY_ADAPTIVE)
+        self._run_retry_passes()
+        return self._finish_job(start_time)
+
+    def run_streaming(self, collect_links):
+        """Парсинг товаров одновременно со сбором ссылок.
+
+        collect_links(), например OzonLinkParser.run, передает каждую новую пачку
+        ссылок в add_links; воркеры начинают работу с первыми ссылками
+        """
+        start_time = time.time()
+        self.logger.info("Начало обработки товаров по мере сбора ссылок")
+        if not self._start_job([]):
+            return False
+        
+        self.deferred = {} if RETRY_DEFERRED and RETRY_PASSES > 0 else None
+        self._run_pass([], self.worker_count, CONCURRENCY_ADAPTIVE, collect_links=collect_links)
+        if not self.total_urls:
+            self.logger.error("Ошибка при парсинге ссылок или ссылки не найдены")
+        self._run_retry_passes()
+        return self._finish_job(start_time) and self.total_urls > 0
+
+    def add_links(self, urls):
+        """Прием пачки ссылок при потоковом сборе. False - задача остановлена, сбор пора прекратить"""
+        urls = [url for url in dict.fromkeys(urls) if url not in self.streamed_urls]
+        if not urls:
+            return not self.stop_event.is_set()
+        self.streamed_urls.update(urls)
+        with self.results_lock:
+            self.total_urls += len(urls)
+        
+        if self.journal is not None:
+            try:
+                self.journal.append_urls(urls)
+            except Exception as e:
+                self.logger.warning(f"Ошибка записи в журнал задачи: {str(e)}")
+        
+        # Ожидание места в очереди притормаживает сбор ссылок, если воркеры не успевают
+        for url in self._resolve_known(urls):
+            if not self.scheduler.add_url(url, self.stop_event):
+                return False
+        return not self.stop_event.is_set()
+
+    def _start_job(self, urls):
+        """Журнал и файлы выгрузки задачи. False - выгрузку открыть не удалось"""
+        # Журнал новой задачи (при возобновлении журнал уже открыт)
+        if self.journal is None:
+            try:
+                self.journal = JobJournal.create(self.category_name, self.timestamp, urls, self.export_formats)
+            except Exception as e:
+                self.logger.warning(f"Не удалось создать журнал задачи: {str(e)}")
+        
+        # Файлы выгрузки открываются сразу: строки пишутся по мере готовности
+        if not self.exporter.open_stream():
+            return False
+        self.excel_filename = self.exporter.get_filename()
+        self.metrics.register_source(self._metrics_source_name(), self.metric_values)
+        self.tracer.begin_job(f"{self.category_name}_{self.timestamp}")
+        return True
+
+    def _resolve_known(self, urls):
+        """Товары из журнала, кэша и HTTP-движка. Возвращает URL для браузера"""
+        # Продолжение прерванной задачи: готовые строки берутся из журнала
+        if self.journaled_results:
+            urls = self._restore_from_journal(urls)
+        
+        # Товары из кэша не парсятся повторно (кроме принудительного обновления)
+        if self.result_cache is not None and not self.force_refresh and urls:
+            urls = self._resolve_from_cache(urls)
+        
+        # Быстрый путь без браузера: в браузер уходят только неразобранные страницы
+        if self.engine == 'http' and urls:
+            urls = self._resolve_via_http(urls)
+        return urls
+
+    def _finish_job(self, start_time):
+        """Сохранение выгрузки, итоговая статистика и закрытие журнала"""
+        self.metrics.unregister_source(self._metrics_source_name())
+        self.tracer.end_job()
+        
+        # Ограничение размера кэша после пополнения новыми товарами
+        if self.result_cache is not None:
+            try:
+                self.result_cache.prune()
+            except Exception as e:
+                self.logger.warning(f"Ошибка очистки кэша товаров: {str(e)}")
+        
+        # Сохранение результатов
+        success = self.exporter.close_stream() and not self.export_failed
+        duration = time.time() - start_time
         
-        # Распределяем URL между воркерами
-        urls_per_worker = self.distribute_urls(urls)
+        if success:
+            self.logger.info(f"Обработка завершена успешно за {duration:.2f} секунд")
+            self.logger.info(f"Обработано товаров: {self.processed_count}")
+            self.logger.info(f"Из кэша: {self.cache_hits} товаров")
+            self.logger.info(f"Бюджет URL исчерпан: {self.budget_exhausted_count} товаров")
+            seller_stats = self.page_parser.seller_info_parser.get_statistics()
+            self.logger.info(f"Продавцов из кэша: {seller_stats['seller_cache_hits']}, "
+                             f"открытий тултипа: {seller_stats['tooltip_lookups']}")
+            self.logger.info(f"Среднее число команд WebDriver на товар: {self._average_webdriver_commands():.1f}")
+            self.logger.info(f"Заблокировано запросов: {self.blocked_requests}, "
+                             f"получено {self.transferred_bytes / 1024 / 1024:.1f} МБ")
+            for host, stats in self.rate_limiter.get_statistics().items():
+                self.logger.info(f"Ограничение частоты {host}: {stats['requests']} запросов, "
+                                 f"ожидали {stats['delayed']}, в среднем {stats['avg_wait']:.2f} с, "
+                                 f"максимум {stats['max_wait']:.2f} с")
+            self.logger.info(f"Файлы сохранены: {', '.join(self.get_output_files())}")
+        else:
+            self.logger.error(f"Ошибка при сохранении результатов")
+        
+        # Остановленную или несохраненную задачу можно продолжить по журналу
+        if self.journal is not None:
+            if success and not self.stop_event.is_set():
+                self.journal.finish(self.excel_filename)
+            else:
+                self.journal.close()
+                self.logger.warning(f"Задачу можно возобновить из журнала: {self.journal.path}")
+            
+        return success
+
+    def _run_pass(self, urls, max_workers, adaptive, collect_links=None):
+        """Проход воркеров по списку URL до опустошения очереди.
+
+        collect_links - источник ссылок, работающий параллельно с воркерами (см. run_streaming)
+        """
+        # Общая очередь URL: свободные воркеры забирают работу у занятых
+        if collect_links is None:
+            worker_count = min(max_workers, len(urls))
+            self.scheduler = UrlScheduler(worker_count)
+        else:
+            worker_count = max_workers
+            self.scheduler = UrlScheduler(worker_count, streaming=True, capacity=LINK_QUEUE_SIZE)
+        self.scheduler.add_urls(urls)
+        
+        # Потолок - число воркеров; без адаптации активны все сразу
+        if adaptive:
+            self.controller = ConcurrencyController(worker_count)
+        else:
+            self.controller = ConcurrencyController(worker_count, min_workers=worker_count, initial=worker_count)
         
         # Запуск воркеров
         workers = []
-        for i in range(self.worker_count):
-            worker_urls = urls_per_worker[i]
-            if worker_urls:
-                worker_thread = threading.Thread(
-                    target=self.worker,
-                    args=(worker_urls, i+1),
-                    daemon=True
-                )
-                worker_thread.start()
-                workers.append(worker_thread)
-                time.sleep(1)  # Пауза между запуском воркеров
+        for i in range(worker_count):
+            worker_thread = threading.Thread(
+                target=self.worker,
+                args=(i+1,),
+                daemon=True
+            )
+            worker_thread.start()
+            workers.append(worker_thread)
         
         # Ожидание завершения воркеров
         try:
+            if collect_links is not None:
+                try:
+                    collect_links()
+                except Exception as e:
+                    self.logger.error(f"Ошибка при сборе ссылок: {str(e)}")
+                finally:
+                    self.scheduler.close_input()
             for worker in workers:
                 worker.join()
         except KeyboardInterrupt:
@@ -143,36 +659,81 @@ class OzonProductParser:
             for worker in workers:
                 worker.join(timeout=5)
         
-        # Сохранение результатов
-        success = self.excel_exporter.save_results(self.results)
-        duration = time.time() - start_time
-        
-        if success:
-            self.logger.info(f"Обработка завершена успешно за {duration:.2f} секунд")
-            self.logger.info(f"Обработано товаров: {len(self.results)}")
-            self.logger.info(f"Файл сохранен: {self.excel_filename}")
-        else:
-            self.logger.error(f"Ошибка при сохранении результатов")
+        if not self.stop_event.is_set():
+            pending = self.scheduler.drain()
+            if pending:
+                self.logger.error(f"Не обработано URL: {len(pending)} (все воркеры остановились)")
+            for url in pending:
+                self._record_result(0, url, {
+                    'product_name': 'Ошибка: нет доступных воркеров',
+                    'status': 'error'
+                })
+        self.logger.info(f"Статистика очереди: {self.scheduler.get_statistics()}")
+        self.logger.info(f"Итоговый параллелизм: {self.controller.target} из {self.controller.max_workers} воркеров")
+
+    def _run_retry_passes(self):
+        """Повторные проходы по отложенным URL после паузы на новых браузерах"""
+        for retry_pass in range(1, RETRY_PASSES + 1):
+            if not self.deferred or self.stop_event.is_set():
+                break
+            urls = list(self.deferred)
+            self.logger.info(f"Отложено {len(urls)} URL, повторный проход {retry_pass} "
+                             f"через {RETRY_COOLDOWN} секунд")
+            if self.stop_event.wait(RETRY_COOLDOWN):
+                break
             
-        return success
+            # В последнем проходе результаты фиксируются как есть
+            self.retry_pass = retry_pass
+            self.deferred = {} if retry_pass < RETRY_PASSES else None
+            self._run_pass(urls, RETRY_WORKERS, adaptive=False)
+        
+        # Отложенные URL остановленной задачи не попадают в журнал и при возобновлении парсятся заново
+        self.deferred = None
+        self.logger.info(f"Повторные проходы: отложено {self.deferred_count} URL, "
+                         f"восстановлено {self.retry_recovered_count}")
 
     def get_results_summary(self):
         """Получение сводки результатов"""
         return {
-            'total': len(self.results),
+            'total': self.exporter.rows_written,
             'processed': self.processed_count,
-            'excel_file': self.excel_filename
+            'avg_webdriver_commands': self._average_webdriver_commands(),
+            'http_resolved': self.http_resolved_count,
+            'cache_hits': self.cache_hits,
+            'budget_exhausted': self.budget_exhausted_count,
+            'deferred': self.deferred_count,
+            'retry_recovered': self.retry_recovered_count,
+            **self.page_parser.seller_info_parser.get_statistics(),
+            'blocked_requests': self.blocked_requests,
+            'transferred_bytes': self.transferred_bytes,
+            'rate_limiter': self.rate_limiter.get_statistics(),
+            'excel_file': self.excel_filename,
+            'output_files': self.get_output_files(),
+            'concurrency': self.controller.get_statistics() if self.controller else None
         }
 
+    def metric_values(self):
+        """Очереди задачи для эндпоинта метрик"""
+        scheduler = self.scheduler
+        return {
+            'ozon_queue_depth': {
+                (('queue', 'urls'),): scheduler.pending_count() if scheduler else 0,
+                (('queue', 'deferred'),): len(self.deferred or {})
+            }
+        }
+
+    def _metrics_source_name(self):
+        return f"parser_{id(self)}"
+
+    def get_output_files(self):
+        """Файлы результатов во всех выбранных форматах"""
+        return self.exporter.get_filenames()
+
+    def _average_webdriver_commands(self):
+        """Среднее число команд WebDriver на обработанный товар"""
+        return self.webdriver_commands / self.processed_count if self.processed_count else 0.0
+
     def stop_parsing(self):
         """Остановка парсинга"""
         self.stop_event.set()
-        self.logger.info("Запрошена остановка парсинга")
-
-    def __del__(self):
-        """Деструктор - закрытие всех ресурсов"""
-        try:
-            if hasattr(self, 'driver_manager'):
-                self.driver_manager.cleanup()
-        except Exception as e:
-            pass
\ No newline at end of file
+        self.logger.info("Запрошена остановка парсинга")
\ No newline at end of file
@@ -1,45 +1,198 @@
-import time
 import logging
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException
+from src.config import PAGE_READY_TIMEOUT
+from src.utils.page_readiness import wait_for_js, wait_for_any
+from src.utils.driver_manager import collect_network_stats
+from src.utils.rate_limiter import get_rate_limiter
+from src.utils.metrics import get_metrics
+from src.utils.tracing import traced, get_tracer
+from src.utils.page_archive import replay_url, record_page
 from .seller_info_parser import SellerInfoParser
+from .url_budget import UrlBudget
+
+# Состояние страницы товара: ограничение доступа, нет в наличии или карточка товара.
+# Возвращает null, пока ни одно из состояний не наступило
+PAGE_STATE_JS = """
+    const title = document.title.toLowerCase();
+    const href = location.href.toLowerCase();
+    if (title.includes('доступ ограничен') || title.includes('access denied') ||
+        href.includes('blocked') || href.includes('denied')) return 'access_denied';
+    if (document.querySelector('div[data-widget="webOutOfStock"]')) return 'out_of_stock';
+    if (document.querySelector('div[data-widget="webProductHeading"]')) return 'product';
+    const body = document.body;
+    if (body && body.childElementCount < 50 &&
+        /Доступ ограничен|Access denied/.test(body.innerText)) return 'access_denied';
+    return null;
+"""
+
+# Извлечение всех данных товара за один вызов WebDriver с готовой страницы:
+# возвращает ее состояние вместе с названием, изображением и продавцом.
+# Пустые поля добираются запасными Python-селекторами
+PRODUCT_BUNDLE_JS = """
+    const textOf = (el) => (el && el.innerText ? el.innerText.trim() : '');
+    const firstText = (selectors) => {
+        for (const selector of selectors) {
+            const text = textOf(document.querySelector(selector));
+            if (text.length > 3) return text;
+        }
+        return null;
+    };
+
+    const title = document.title.toLowerCase();
+    const href = location.href.toLowerCase();
+    const body = document.body;
+    let pageType = null;
+    if (title.includes('доступ ограничен') || title.includes('access denied') ||
+        href.includes('blocked') || href.includes('denied')) {
+        pageType = 'access_denied';
+    } else if (document.querySelector('div[data-widget="webOutOfStock"]')) {
+        pageType = 'out_of_stock';
+    } else if (document.querySelector('div[data-widget="webProductHeading"]')) {
+        pageType = 'product';
+    } else if (body && body.childElementCount < 50 &&
+               /Доступ ограничен|Access denied/.test(body.innerText)) {
+        pageType = 'access_denied';
+    }
+    if (!pageType) return null;
+
+    const bundle = {
+        page_type: pageType,
+        access_denied: pageType === 'access_denied',
+        out_of_stock: pageType === 'out_of_stock',
+        product_name: null,
+        image_url: null,
+        seller_link: null,
+        seller_name: null
+    };
+    if (bundle.access_denied) return bundle;
+
+    if (bundle.out_of_stock) {
+        bundle.product_name = firstText([
+            'div[data-widget="webOutOfStock"] p[class*="yl6_27"]',
+            'div[data-widget="webOutOfStock"] p',
+            'div[data-widget="webOutOfStock"] h1'
+        ]);
+    } else {
+        bundle.product_name = firstText([
+            'div[data-widget="webProductHeading"] h1',
+            'div[data-widget="webProductHeading"] [class*="m9p_27"]',
+            'h1[data-widget="webProductHeading"]',
+            '.m9p_27',
+            '.tsHeadline'
+        ]);
+    }
+
+    const isOzonImage = (src) => src && (src.includes('ozon.ru') || src.includes('ir.ozone.ru'));
+    for (const img of document.querySelectorAll('div[data-widget="webGallery"] img')) {
+        const src = img.getAttribute('src');
+        if (isOzonImage(src)) {
+            bundle.image_url = src.replace('wc50/', 'wc1000/').replace('wc250/', 'wc1000/').replace('wc500/', 'wc1000/');
+            break;
+        }
+    }
+
+    const sellerLink = document.querySelector('div[data-widget="webCurrentSeller"] a[href*="/seller/"]') ||
+                       document.querySelector('a[title][href*="/seller/"]');
+    if (sellerLink) {
+        bundle.seller_link = sellerLink.href;
+        bundle.seller_name = (sellerLink.getAttribute('title') || textOf(sellerLink)) || null;
+    }
+    return bundle;
+"""
+
+# Первый непустой текст названия товара
+PRODUCT_NAME_JS = """
+    for (const selector of args.selectors) {
+        const el = document.querySelector(selector);
+        const text = el && el.innerText ? el.innerText.trim() : '';
+        if (text.length > 3) return text;
+    }
+    return null;
+"""
 
 class PageParser:
-    def __init__(self):
+    def __init__(self, seller_cache=None):
         self.logger = logging.getLogger('page_parser')
-        self.seller_info_parser = SellerInfoParser()
+        self.seller_info_parser = SellerInfoParser(seller_cache)
+        self.rate_limiter = get_rate_limiter()
+        self.metrics = get_metrics()
+        self.tracer = get_tracer()
+
+    @traced('page.parse')
+    def parse_page(self, driver, url, navigate=True, budget=None, max_attempts=5):
+        """Парсинг страницы товара с повторными попытками.
 
-    def parse_page(self, driver, url):
-        """Парсинг страницы товара с повторными попытками"""
-        max_attempts = 5
+        navigate=False - страница уже открыта в текущей вкладке (многовкладочный режим)
+        budget - бюджет времени и попыток на URL (по умолчанию новый UrlBudget)
+        max_attempts - сколько раз загружать страницу (1 - без перезагрузок)
+        """
+        budget = budget or UrlBudget()
+        commands_before = getattr(driver, 'command_count', 0)
+        result = self._parse_page_with_retries(driver, url, navigate, budget, max_attempts)
+        
+        # Число обращений к chromedriver на товар: каждое - отдельный HTTP-запрос
+        result['webdriver_commands'] = getattr(driver, 'command_count', 0) - commands_before
+        self.logger.info(f"Команд WebDriver на товар: {result['webdriver_commands']}")
+        
+        # Эффект блокировки ресурсов DevTools
+        result.update(collect_network_stats(driver))
+        self.logger.info(f"Заблокировано запросов: {result['blocked_requests']}, "
+                         f"получено {result['transferred_bytes'] / 1024:.0f} КБ")
+        
+        # Ответы страницы в архив (в режиме записи), пока браузер на ней
+        record_page(driver)
+        return result
+
+    def _parse_page_with_retries(self, driver, url, navigate, budget, max_attempts):
+        """Попытки парсинга с перезагрузкой страницы между ними в пределах бюджета URL"""
+        result = None
         
         for attempt in range(max_attempts):
+            if not budget.take_attempt():
+                break
             self.logger.info(f"Попытка парсинга {attempt + 1} из {max_attempts}")
             
-            result = self._parse_page_attempt(driver, url, attempt)
+            result = self._parse_page_attempt(driver, url, attempt, navigate, budget)
             
             # Проверяем, нужно ли повторить попытку
-            if self._should_retry_parsing(result):
+            if self.should_retry(result):
                 self.logger.warning(f"Попытка {attempt + 1} неуспешна. Данные не найдены: "
                                   f"товар='{result['product_name']}', компания='{result['company_name']}'")
                 
-                if attempt < max_attempts - 1:  # Не перезагружаем на последней попытке
+                # Не перезагружаем на последней попытке и без остатка бюджета
+                if attempt < max_attempts - 1 and not budget.expired():
                     self.logger.info("Перезагружаем страницу для повторной попытки...")
-                    self._reload_page(driver, url)
-                    time.sleep(3)  # Даем время на загрузку
+                    self._reload_page(driver, url, budget)
                     continue
+                break
             else:
                 self.logger.info("Парсинг успешно завершен")
                 return result
         
+        if result is None:
+            result = {
+                'product_name': 'Не найдено',
+                'company_name': 'Не найдено',
+                'image_url': 'Не найдено',
+                'status': 'success'
+            }
+        
+        # Неполные данные при исчерпанном бюджете - отдельный статус. Блокировки и
+        # ошибки сохраняют свой статус: по ним регулируется нагрузка и перезапуск браузера
+        if budget.expired() and result['status'] == 'success':
+            result['status'] = 'budget_exhausted'
+            self.logger.error(f"Бюджет URL исчерпан: {budget.attempts} попыток, "
+                              f"осталось {budget.remaining():.1f} с")
+            return result
+        
         # Если все попытки неуспешны, возвращаем последний результат
         self.logger.error(f"Не удалось получить все данные после {max_attempts} попыток")
         return result
 
-    def _parse_page_attempt(self, driver, url, attempt_num):
+    @traced('page.attempt')
+    def _parse_page_attempt(self, driver, url, attempt_num, navigate=True, budget=None):
         """Одна попытка парсинга страницы"""
+        budget = budget or UrlBudget()
         result = {
             'product_name': 'Не найдено',
             'company_name': 'Не найдено',
@@ -50,15 +203,28 @@ class PageParser:
         try:
             self.logger.info(f"Начинаем парсинг страницы: {url}")
             
-            # Переходим на страницу только в первой попытке
-            if attempt_num == 0:
-                driver.get(url)
-            
-            # Ждем начальной загрузки страницы
-            time.sleep(2)
+            # Переходим на страницу только в первой попытке. Навигация - загрузка
+            # и ожидание известного состояния; без перехода (страница открыта во
+            # вкладке или перезагружена) замеряется только ожидание готовности
+            navigating = attempt_num == 0 and navigate
+            if navigating:
+                with self.metrics.stage('rate_limit'), self.tracer.span('page.rate_limit'):
+                    self.rate_limiter.acquire(url)
+            with self.metrics.stage('navigation' if navigating else 'page_ready'):
+                if navigating:
+                    with self.tracer.span('page.driver_get'):
+                        driver.get(replay_url(url))
+                page_state = self._wait_for_page_state(driver, budget.timeout(PAGE_READY_TIMEOUT))
+            
+            # Данные товара извлекаются одним скриптом с готовой страницы
+            bundle = None
+            if page_state is not None:
+                with self.metrics.stage('bundle'):
+                    bundle = self._extract_bundle(driver)
+                page_state = bundle['page_type'] if bundle else page_state
             
             # Проверка на ограничение доступа
-            if self._check_access_denied(driver):
+            if page_state == 'access_denied' or (page_state is None and self._check_access_denied(driver)):
                 result['status'] = 'access_denied'
                 result['product_name'] = 'Доступ ограничен'
                 result['company_name'] = 'Доступ ограничен'
@@ -66,25 +232,35 @@ class PageParser:
                 return result
             
             # Проверка наличия товара
-            if self._check_out_of_stock(driver):
+            if page_state == 'out_of_stock' or (page_state is None and self._check_out_of_stock(driver)):
                 result['status'] = 'out_of_stock'
-                result['product_name'] = self._get_out_of_stock_product_name(driver)
-                result['company_name'] = self._get_out_of_stock_company_name(driver)
-                result['image_url'] = self._get_product_image_url(driver)
+                result['product_name'] = (bundle or {}).get('product_name') or self._get_out_of_stock_product_name(driver)
+                result['company_name'] = self._get_out_of_stock_company_name(
+                    driver, (bundle or {}).get('seller_link'), budget)
+                result['image_url'] = (bundle or {}).get('image_url') or self._get_product_image_url(driver, budget)
                 return result
             
             # Парсинг названия товара
-            product_name = self._get_product_name(driver)
+            # Запасные селекторы замеряются, только когда скрипт не нашел поле
+            product_name = (bundle or {}).get('product_name')
+            if not product_name:
+                with self.metrics.stage('product_name'):
+                    product_name = self._get_product_name(driver, budget)
             result['product_name'] = product_name
             self.logger.info(f"Получено название товара: {product_name}")
             
             # Получение информации о компании
-            company_info = self.seller_info_parser.get_company_name(driver)
+            with self.metrics.stage('seller'):
+                company_info = self.seller_info_parser.get_company_name(
+                    driver, (bundle or {}).get('seller_link'), budget)
             result['company_name'] = company_info
             self.logger.info(f"Получена информация о компании: {company_info}")
             
             # Получение URL изображения товара
-            image_url = self._get_product_image_url(driver)
+            image_url = (bundle or {}).get('image_url')
+            if not image_url:
+                with self.metrics.stage('image'):
+                    image_url = self._get_product_image_url(driver, budget)
             result['image_url'] = image_url
             self.logger.info(f"Получен URL изображения: {image_url}")
             
@@ -96,7 +272,7 @@ class PageParser:
             
         return result
 
-    def _should_retry_parsing(self, result):
+    def should_retry(self, result):
         """Проверяет, нужно ли повторить парсинг"""
 
         # Всегда пробуем повторно, если доступ ограничен или произошла ошибка
@@ -118,35 +294,41 @@ class PageParser:
         return product_not_found or company_not_found
 
 
-    def _reload_page(self, driver, url):
+    @traced('page.extract_bundle')
+    def _extract_bundle(self, driver):
+        """Состояние страницы и данные товара одним вызовом. None - если состояние не определено"""
+        return driver.execute_script(f"return (function () {{ {PRODUCT_BUNDLE_JS} }})();")
+
+    @traced('page.wait_for_state')
+    def _wait_for_page_state(self, driver, timeout=PAGE_READY_TIMEOUT):
+        """Ожидание состояния страницы: 'product', 'out_of_stock', 'access_denied' или None"""
+        page_state = wait_for_js(driver, PAGE_STATE_JS, timeout)
+        if page_state is None:
+            self.logger.warning("Страница не пришла в известное состояние за отведенное время")
+        return page_state
+
+    @traced('page.reload')
+    def _reload_page(self, driver, url, budget):
         """Перезагрузка страницы с улучшенной логикой"""
         try:
             self.logger.info("Перезагружаем страницу...")
+            self.rate_limiter.acquire(url)
             driver.refresh()
-            time.sleep(2)
-            
-            # Проверяем, что страница загрузилась корректно
-            WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((By.TAG_NAME, 'body'))
-            )
             
-            # Дополнительная проверка загрузки основного контента
-            try:
-                WebDriverWait(driver, 5).until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, 'div[data-widget="webProductHeading"], div[data-widget="webOutOfStock"]'))
-                )
-            except TimeoutException:
+            # Ждем основного контента сразу после перезагрузки, без фиксированных пауз
+            if self._wait_for_page_state(driver, budget.timeout(PAGE_READY_TIMEOUT)) is None:
                 self.logger.warning("Основной контент не загрузился после перезагрузки")
             
         except Exception as e:
             self.logger.error(f"Ошибка при перезагрузке страницы: {str(e)}")
             # Если перезагрузка не удалась, пробуем загрузить URL заново
             try:
-                driver.get(url)
-                time.sleep(3)
+                self.rate_limiter.acquire(url)
+                driver.get(replay_url(url))
             except Exception as e2:
                 self.logger.error(f"Ошибка при загрузке URL: {str(e2)}")
 
+    @traced('page.check_access_denied')
     def _check_access_denied(self, driver):
         """Проверка на ограничение доступа"""
         try:
@@ -160,23 +342,17 @@ class PageParser:
             if "blocked" in current_url or "denied" in current_url:
                 return True
             
-            # Проверяем наличие элементов с сообщением об ограничении доступа
-            access_denied_selectors = [
-                '//div[contains(text(), "Доступ ограничен")]',
-                '//div[contains(text(), "Access denied")]',
-                '//h1[contains(text(), "Доступ ограничен")]',
+            # Проверяем наличие элементов с сообщением об ограничении доступа (без ожидания:
+            # страница уже прошла ожидание готовности)
+            access_denied_xpath = (
+                '//div[contains(text(), "Доступ ограничен")] | '
+                '//div[contains(text(), "Access denied")] | '
+                '//h1[contains(text(), "Доступ ограничен")] | '
                 '//div[contains(@class, "error") and contains(text(), "403")]'
-            ]
-            
-            for selector in access_denied_selectors:
-                try:
-                    element = WebDriverWait(driver, 2).until(
-                        EC.presence_of_element_located((By.XPATH, selector))
-                    )
-                    if element and element.is_displayed():
-                        return True
-                except TimeoutException:
-                    continue
+            )
+            for element in driver.find_elements(By.XPATH, access_denied_xpath):
+                if element.is_displayed():
+                    return True
             
             return False
             
@@ -184,17 +360,15 @@ class PageParser:
             self.logger.debug(f"Ошибка при проверке доступа: {str(e)}")
             return False
 
+    @traced('page.check_out_of_stock')
     def _check_out_of_stock(self, driver):
         """Проверка наличия товара"""
-        try:
-            WebDriverWait(driver, 5).until(
-                EC.visibility_of_element_located((By.XPATH, '//div[@data-widget="webOutOfStock"]'))
-            )
+        if wait_for_any(driver, ['div[data-widget="webOutOfStock"]'], 0, visible=True):
             self.logger.info("Товар отсутствует в продаже")
             return True
-        except TimeoutException:
-            return False
+        return False
 
+    @traced('page.out_of_stock_product_name')
     def _get_out_of_stock_product_name(self, driver):
         """Получение названия отсутствующего товара"""
         selectors = [
@@ -214,39 +388,29 @@ class PageParser:
         
         return "Название не найдено"
 
-    def _get_out_of_stock_company_name(self, driver):
+    def _get_out_of_stock_company_name(self, driver, seller_link=None, budget=None):
         """Получение названия компании для отсутствующего товара"""
         try:
             # Для товаров отсутствующих в продаже тоже пробуем получить информацию о компании
-            return self.seller_info_parser.get_company_name(driver)
+            return self.seller_info_parser.get_company_name(driver, seller_link, budget)
         except:
             return "Компания не найдена"
 
-    def _get_product_name(self, driver):
+    @traced('page.product_name')
+    def _get_product_name(self, driver, budget=None):
         """Получение названия товара с улучшенной логикой"""
+        timeout = budget.timeout(PAGE_READY_TIMEOUT) if budget else PAGE_READY_TIMEOUT
         try:
-            # Сначала ждем загрузки основного контента
-            WebDriverWait(driver, 15).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, 'div[data-widget="webProductHeading"]'))
-            )
-            
-            # Основные селекторы для названия товара
-            selectors = [
-                '//div[@data-widget="webProductHeading"]//h1',
-                '//div[@data-widget="webProductHeading"]//*[contains(@class, "m9p_27")]',
-                '//h1[@data-widget="webProductHeading"]'
-            ]
-            
-            for selector in selectors:
-                try:
-                    element = WebDriverWait(driver, 5).until(
-                        EC.visibility_of_element_located((By.XPATH, selector))
-                    )
-                    text = element.text.strip()
-                    if text and len(text) > 3:
-                        return text
-                except TimeoutException:
-                    continue
+            # Ждем появления непустого названия по любому из селекторов (один общий дедлайн)
+            product_name = wait_for_js(driver, PRODUCT_NAME_JS, timeout, {
+                'selectors': [
+                    'div[data-widget="webProductHeading"] h1',
+                    'div[data-widget="webProductHeading"] [class*="m9p_27"]',
+                    'h1[data-widget="webProductHeading"]'
+                ]
+            })
+            if product_name:
+                return product_name
             
             # Альтернативные способы получения названия
             alternative_selectors = [
@@ -300,13 +464,14 @@ class PageParser:
             self.logger.error(f"Ошибка при получении названия товара: {str(e)}")
             return "Название не найдено"
             
-    def _get_product_image_url(self, driver):
+    @traced('page.image_url')
+    def _get_product_image_url(self, driver, budget=None):
         """Получение URL изображения товара"""
+        timeout = budget.timeout(PAGE_READY_TIMEOUT) if budget else PAGE_READY_TIMEOUT
         try:
-            # Ждем загрузки основного контента
-            WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, 'div[data-widget="webGallery"]'))
-            )
+            # Ждем появления галереи
+            if not wait_for_any(driver, ['div[data-widget="webGallery"]'], timeout):
+                self.logger.debug("Галерея товара не появилась")
             
             # Селекторы для изображения товара
             selectors = [
@@ -1,41 +1,84 @@
-import time
 import logging
+import threading
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.action_chains import ActionChains
-from selenium.common.exceptions import TimeoutException
+from src.config import OZON_BASE_URL, PAGE_READY_TIMEOUT, SELLER_SECTION_TIMEOUT, TOOLTIP_TIMEOUT, get_seller_id
+from src.utils.rate_limiter import get_rate_limiter
+from src.utils.tracing import traced
+from .url_budget import UrlBudget
+from src.utils.page_readiness import wait_for_js, wait_for_any
+
+# Текст видимого тултипа, похожего на информацию о компании
+# (организационно-правовая форма, ИНН/ОГРН или режим работы)
+COMPANY_TOOLTIP_JS = """
+    const keywords = ['ООО', 'ИП', 'АО', 'ЗАО', 'ПАО', 'ОАО', 'LTD', 'LLC', 'INC'];
+    for (const portal of document.querySelectorAll('.vue-portal-target')) {
+        if (portal.getClientRects().length === 0) continue;
+        const text = (portal.innerText || '').trim();
+        if (text.length < 5) continue;
+        const upper = text.toUpperCase();
+        const digits = text.replace(/\\D/g, '').length;
+        if (keywords.some(k => upper.includes(k)) || digits >= 10 ||
+            text.toLowerCase().includes('режим работы')) return text;
+    }
+    return null;
+"""
 
 class SellerInfoParser:
-    def __init__(self):
+    def __init__(self, seller_cache=None):
         self.logger = logging.getLogger('seller_info_parser')
+        
+        # Кэш продавец -> юридическое название: тултип открывается только для новых продавцов
+        self.seller_cache = seller_cache
+        self.stats_lock = threading.Lock()
+        self.cache_hits = 0
+        self.tooltip_lookups = 0
+        self.rate_limiter = get_rate_limiter()
+
+    @traced('seller.get_company_name')
+    def get_company_name(self, driver, seller_link=None, budget=None):
+        """Получение названия компании с улучшенной логикой загрузки.
 
-    def get_company_name(self, driver):
-        """Получение названия компании с улучшенной логикой загрузки"""
+        seller_link - ссылка на продавца, если уже известна (проверяется кэш до скролла)
+        budget - бюджет URL: попытки и ожидания списываются из него
+        """
+        company_name = self._get_cached_company(seller_link)
+        if company_name:
+            return company_name
+        
+        budget = budget or UrlBudget()
         max_attempts = 5
         
         for attempt in range(max_attempts):
+            if not budget.take_attempt():
+                self.logger.warning("Бюджет URL исчерпан, поиск компании прекращен")
+                break
             self.logger.info(f"Попытка {attempt + 1} из {max_attempts} получить название компании")
             
             try:
                 # Шаг 1: Дождаться загрузки основного контента страницы
-                if not self._wait_for_page_content(driver):
+                if not self._wait_for_page_content(driver, budget):
                     self.logger.warning("Не удалось дождаться загрузки основного контента")
                     if attempt < max_attempts - 1:
-                        time.sleep(2)
                         continue
                 
                 # Шаг 2: Скролл к элементу paginator для загрузки секции продавца
-                self._scroll_to_paginator(driver)
+                self._scroll_to_paginator(driver, budget)
                 
                 # Шаг 3: Дождаться загрузки секции продавца
-                seller_section = self._wait_for_seller_section(driver)
+                seller_section = self._wait_for_seller_section(driver, budget)
                 if not seller_section:
                     self.logger.warning("Секция продавца не найдена")
                     if attempt < max_attempts - 1:
-                        time.sleep(2)
                         continue
                 
+                # Продавец мог встречаться раньше: тогда тултип не нужен
+                if seller_link is None and seller_section:
+                    seller_link = self._get_seller_link(seller_section)
+                    company_name = self._get_cached_company(seller_link)
+                    if company_name:
+                        return company_name
+                
                 # Шаг 4: Найти кнопку тултипа
                 tooltip_button = self._find_tooltip_button(seller_section)
                 if not tooltip_button:
@@ -45,101 +88,124 @@ class SellerInfoParser:
                     if seller_name:
                         return seller_name
                     if attempt < max_attempts - 1:
-                        time.sleep(2)
                         continue
                 
                 # Шаг 5: Получить данные из тултипа
-                company_name = self._get_company_from_tooltip(driver, tooltip_button)
+                with self.stats_lock:
+                    self.tooltip_lookups += 1
+                company_name = self._get_company_from_tooltip(driver, tooltip_button, budget)
                 if company_name and company_name != "Не найдено":
                     self.logger.info(f"✓ Успешно получено название компании: {company_name}")
+                    self._store_company(seller_link, company_name)
                     return company_name
                 
                 # Если получили "Не найдено", продолжаем попытки
                 if attempt < max_attempts - 1:
                     self.logger.warning("Название компании не найдено, повторяем попытку...")
-                    time.sleep(2)
                     continue
                 
                 return "Не найдено"                
             except Exception as e:
                 self.logger.error(f"Ошибка в попытке {attempt + 1}: {str(e)}")
-                if attempt < max_attempts - 1:
-                    time.sleep(2)  # Пауза между попытками
                 
         self.logger.error("Не удалось получить информацию о компании")
         return "Не найдено"
 
-    def _wait_for_page_content(self, driver):
-        """Ожидание загрузки основного контента страницы"""
+    def _get_cached_company(self, seller_link):
+        """Юридическое название продавца из кэша или None"""
+        if self.seller_cache is None:
+            return None
+        try:
+            company_name = self.seller_cache.get_seller(get_seller_id(seller_link))
+        except Exception as e:
+            self.logger.warning(f"Ошибка чтения кэша продавцов: {str(e)}")
+            return None
+        if company_name:
+            with self.stats_lock:
+                self.cache_hits += 1
+            self.logger.info(f"✓ Название компании из кэша продавцов: {company_name}")
+        return company_name
+
+    def _store_company(self, seller_link, company_name):
+        """Сохранение названия из тултипа в кэш продавцов"""
+        if self.seller_cache is None:
+            return
+        try:
+            self.seller_cache.put_seller(get_seller_id(seller_link), company_name)
+        except Exception as e:
+            self.logger.warning(f"Ошибка записи в кэш продавцов: {str(e)}")
+
+    def _get_seller_link(self, seller_section):
+        """Ссылка на продавца из секции продавца"""
         try:
-            # Ждем загрузки главного контейнера товара
-            WebDriverWait(driver, 15).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, 'div[data-widget="webPdpGrid"]'))
-            )
+            return seller_section.find_element(By.CSS_SELECTOR, 'a[href*="/seller/"]').get_attribute('href')
+        except Exception:
+            return None
+
+    def get_statistics(self):
+        """Попадания в кэш продавцов и число обращений к тултипу"""
+        with self.stats_lock:
+            return {'seller_cache_hits': self.cache_hits, 'tooltip_lookups': self.tooltip_lookups}
+
+    @traced('seller.wait_for_page_content')
+    def _wait_for_page_content(self, driver, budget):
+        """Ожидание загрузки основного контента страницы"""
+        # Ждем загрузки главного контейнера товара
+        if wait_for_any(driver, ['div[data-widget="webPdpGrid"]'], budget.timeout(PAGE_READY_TIMEOUT)):
             self.logger.info("Основной контент страницы загружен")
             return True
-        except TimeoutException:
-            self.logger.error("Таймаут при ожидании загрузки основного контента")
-            return False
+        self.logger.error("Таймаут при ожидании загрузки основного контента")
+        return False
 
-    def _scroll_to_paginator(self, driver):
+    @traced('seller.scroll_to_paginator')
+    def _scroll_to_paginator(self, driver, budget):
         """Скролл к элементу paginator для загрузки секции продавца"""
         try:
-            # Ищем элемент paginator
-            paginator_element = WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, 'div[data-widget="paginator"]'))
-            )
+            # Скролл запускает подгрузку виджетов с сервера - это тоже запрос к хосту
+            self.rate_limiter.acquire(OZON_BASE_URL)
             
-            # Скроллим к элементу paginator, оставляя 20% сверху
-            driver.execute_script("""
-                const paginator = arguments[0];
-                const rect = paginator.getBoundingClientRect();
-                const viewportHeight = window.innerHeight;
-                const scrollTop = window.pageYOffset + rect.top - (viewportHeight * 0.2);
-                
-                window.scrollTo({
-                    top: Math.max(0, scrollTop),
-                    behavior: 'smooth'
-                });
-            """, paginator_element)
-            
-            time.sleep(2)  # Даем время на загрузку контента
-            self.logger.info("Выполнен скролл к элементу paginator")
-            
-        except TimeoutException:
-            self.logger.warning("Элемент paginator не найден, пробуем альтернативный скролл")
-            # Альтернативный скролл вниз страницы
-            driver.execute_script("""
-                window.scrollTo({
-                    top: document.body.scrollHeight * 0.7,
-                    behavior: 'smooth'
-                });
-            """)
-            time.sleep(2)
+            # Ищем элемент paginator
+            if wait_for_any(driver, ['div[data-widget="paginator"]'], budget.timeout(SELLER_SECTION_TIMEOUT)):
+                # Скроллим к элементу paginator, оставляя 20% сверху. Мгновенный скролл:
+                # загрузку секции продавца дальше ждем по событию, а не паузой
+                driver.execute_script("""
+                    const paginator = document.querySelector('div[data-widget="paginator"]');
+                    const rect = paginator.getBoundingClientRect();
+                    const viewportHeight = window.innerHeight;
+                    const scrollTop = window.pageYOffset + rect.top - (viewportHeight * 0.2);
+                    
+                    window.scrollTo({
+                        top: Math.max(0, scrollTop),
+                        behavior: 'instant'
+                    });
+                """)
+                self.logger.info("Выполнен скролл к элементу paginator")
+            else:
+                self.logger.warning("Элемент paginator не найден, пробуем альтернативный скролл")
+                # Альтернативный скролл вниз страницы
+                driver.execute_script("""
+                    window.scrollTo({
+                        top: document.body.scrollHeight * 0.7,
+                        behavior: 'instant'
+                    });
+                """)
             
         except Exception as e:
             self.logger.warning(f"Ошибка при скролле к paginator: {str(e)}")
 
-    def _wait_for_seller_section(self, driver):
+    @traced('seller.wait_for_section')
+    def _wait_for_seller_section(self, driver, budget):
         """Ожидание загрузки секции продавца"""
-        try:
-            # Ждем появления секции продавца
-            seller_section = WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, 'div[data-widget="webCurrentSeller"]'))
-            )
-            
-            # Дополнительно ждем, пока секция станет видимой
-            WebDriverWait(driver, 5).until(
-                EC.visibility_of(seller_section)
-            )
-            
-            self.logger.info("Секция продавца загружена")
-            return seller_section
-            
-        except TimeoutException:
+        selector = 'div[data-widget="webCurrentSeller"]'
+        # Ждем появления видимой секции продавца
+        if not wait_for_any(driver, [selector], budget.timeout(SELLER_SECTION_TIMEOUT), visible=True):
             self.logger.error("Таймаут при ожидании загрузки секции продавца")
             return None
+        
+        self.logger.info("Секция продавца загружена")
+        return driver.find_element(By.CSS_SELECTOR, selector)
 
+    @traced('seller.find_tooltip_button')
     def _find_tooltip_button(self, seller_section):
         """Улучшенный поиск кнопки тултипа"""
         try:
@@ -182,27 +248,26 @@ class SellerInfoParser:
             self.logger.error(f"Ошибка при поиске кнопки тултипа: {str(e)}")
             return None
 
-    def _get_company_from_tooltip(self, driver, tooltip_button):
+    @traced('seller.tooltip')
+    def _get_company_from_tooltip(self, driver, tooltip_button, budget):
         """Получение названия компании из тултипа с дополнительными попытками"""
         max_tooltip_attempts = 3
         
         for attempt in range(max_tooltip_attempts):
+            if budget.remaining() <= 0:
+                break
             try:
                 self.logger.info(f"Попытка {attempt + 1} получить данные из тултипа")
                 
                 # Скроллим к кнопке
                 driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", tooltip_button)
-                time.sleep(1)
                 
-                # Кликаем на кнопку
+                # Кликаем на кнопку и ждем появления тултипа
                 ActionChains(driver).move_to_element(tooltip_button).click().perform()
-                time.sleep(1.5)
+                tooltip_text = self._wait_for_tooltip(driver, budget)
                 
-                # Ждем появления тултипа
-                tooltip = self._wait_for_tooltip(driver)
-                
-                if tooltip:
-                    company_name = self._parse_tooltip_content(tooltip.text)
+                if tooltip_text:
+                    company_name = self._parse_tooltip_content(tooltip_text)
                     if company_name:
                         # Закрываем тултип (кликаем в другое место)
                         driver.execute_script("document.body.click();")
@@ -210,66 +275,33 @@ class SellerInfoParser:
                 
                 # Если не получилось, пробуем еще раз другим способом
                 driver.execute_script("arguments[0].click();", tooltip_button)
-                time.sleep(1.5)
                 
-                tooltip = self._wait_for_tooltip(driver)
-                if tooltip:
-                    company_name = self._parse_tooltip_content(tooltip.text)
+                tooltip_text = self._wait_for_tooltip(driver, budget)
+                if tooltip_text:
+                    company_name = self._parse_tooltip_content(tooltip_text)
                     if company_name:
                         driver.execute_script("document.body.click();")
                         return company_name
                 
                 # Закрываем тултип перед следующей попыткой
                 driver.execute_script("document.body.click();")
-                time.sleep(1)
                 
             except Exception as e:
                 self.logger.error(f"Ошибка в попытке {attempt + 1} получения данных из тултипа: {str(e)}")
-                if attempt < max_tooltip_attempts - 1:
-                    time.sleep(1)
         
         return None
 
-    def _wait_for_tooltip(self, driver):
-        """Ожидание появления тултипа"""
-        try:
-            # Ждем появления тултипа в элементе vue-portal-target
-            for _ in range(15):  # Ждем до 4.5 секунд
-                portals = driver.find_elements(By.CSS_SELECTOR, '.vue-portal-target')
-                for portal in portals:
-                    if portal.is_displayed() and portal.text.strip():
-                        # Проверяем, что содержимое похоже на информацию о компании
-                        if self._is_company_tooltip(portal.text):
-                            self.logger.info("Найден тултип с информацией о компании")
-                            return portal
-                time.sleep(0.3)
-            
-            self.logger.warning("Тултип не найден")
-            return None
-            
-        except Exception as e:
-            self.logger.error(f"Ошибка при ожидании тултипа: {str(e)}")
-            return None
-
-    def _is_company_tooltip(self, text):
-        """Проверка, содержит ли тултип информацию о компании"""
-        if not text or len(text.strip()) < 5:
-            return False
+    @traced('seller.wait_for_tooltip')
+    def _wait_for_tooltip(self, driver, budget):
+        """Ожидание появления тултипа. Возвращает его текст"""
+        # Тултип появляется в элементе vue-portal-target
+        tooltip_text = wait_for_js(driver, COMPANY_TOOLTIP_JS, budget.timeout(TOOLTIP_TIMEOUT))
+        if tooltip_text:
+            self.logger.info("Найден тултип с информацией о компании")
+            return tooltip_text
         
-        # Ключевые слова для компаний
-        company_keywords = ['ООО', 'ИП', 'АО', 'ЗАО', 'ПАО', 'ОАО', 'Ltd', 'LLC', 'Inc']
-        
-        # Проверяем наличие ключевых слов
-        has_keywords = any(keyword in text.upper() for keyword in company_keywords)
-        
-        # Проверяем наличие длинных чисел (ИНН/ОГРН)
-        numbers = ''.join(filter(str.isdigit, text))
-        has_long_number = len(numbers) >= 10
-        
-        # Проверяем наличие фразы "Режим работы"
-        has_work_schedule = 'режим работы' in text.lower()
-        
-        return has_keywords or has_long_number or has_work_schedule
+        self.logger.warning("Тултип не найден")
+        return None
 
     def _parse_tooltip_content(self, text):
         """Парсинг содержимого тултипа для извлечения названия компании"""
@@ -0,0 +1,34 @@
+import time
+from src.config import URL_TIME_BUDGET, URL_MAX_ATTEMPTS
+
+
+class UrlBudget:
+    """Общий бюджет на один URL: дедлайн и число попыток.
+
+    Передается во все ожидания и повторы парсинга страницы и продавца, чтобы
+    вложенные циклы повторов вместе не держали воркер дольше time_budget секунд.
+    """
+
+    def __init__(self, time_budget=URL_TIME_BUDGET, max_attempts=URL_MAX_ATTEMPTS, started_at=None):
+        self.deadline = (started_at or time.time()) + time_budget
+        self.max_attempts = max_attempts
+        self.attempts = 0
+
+    def remaining(self):
+        """Оставшееся время в секундах"""
+        return max(0.0, self.deadline - time.time())
+
+    def timeout(self, limit):
+        """Таймаут ожидания: limit, но не дольше оставшегося времени"""
+        return min(limit, self.remaining())
+
+    def expired(self):
+        """Исчерпан ли бюджет по времени или по попыткам"""
+        return self.remaining() <= 0 or self.attempts >= self.max_attempts
+
+    def take_attempt(self):
+        """Списание попытки. False - бюджет исчерпан, повторять нельзя"""
+        if self.expired():
+            return False
+        self.attempts += 1
+        return True
@@ -0,0 +1,179 @@
+import logging
+import threading
+from collections import deque
+from src.config import URL_MAX_REQUEUES
+
+class UrlScheduler:
+    """Общая очередь URL с локальными очередями воркеров и кражей работы.
+
+    streaming=True - URL поступают по ходу работы через add_url до close_input;
+    capacity ограничивает число ожидающих URL (поставщик ждет, пока воркеры разберут очередь)
+    """
+
+    def __init__(self, worker_count, max_requeues=URL_MAX_REQUEUES, streaming=False, capacity=None):
+        self.logger = logging.getLogger('url_scheduler')
+        self.worker_count = worker_count
+        self.max_requeues = max_requeues
+        self.lock = threading.Lock()
+        self.condition = threading.Condition(self.lock)
+        self.input_closed = not streaming
+        self.capacity = capacity
+        self.next_worker = 0
+
+        # Локальные очереди воркеров и URL, которые сейчас в работе
+        self.local_queues = {worker_id: deque() for worker_id in range(1, worker_count + 1)}
+        self.in_flight = {worker_id: set() for worker_id in range(1, worker_count + 1)}
+        self.requeue_counts = {}
+        self.abandoned = set()  # Завершившиеся воркеры: их очереди никто не разбирает
+        self.stolen_count = 0
+        self.requeued_count = 0
+
+    def add_urls(self, urls):
+        """Начальное распределение URL по локальным очередям воркеров"""
+        with self.lock:
+            for i, url in enumerate(urls):
+                worker_id = i % self.worker_count + 1
+                self.local_queues[worker_id].append(url)
+            self.condition.notify_all()
+
+    def add_url(self, url, stop_event=None, poll_interval=1.0):
+        """Добавление URL в потоковом режиме. Ждет, пока в очереди меньше capacity URL.
+
+        Возвращает False, если ожидание прервано stop_event или все воркеры
+        завершились и разбирать очередь некому
+        """
+        with self.condition:
+            while True:
+                if self._all_abandoned_locked():
+                    self.logger.error("Все воркеры завершились, новые URL не принимаются")
+                    return False
+                if self.capacity is None or self._pending_locked() < self.capacity:
+                    break
+                if stop_event is not None and stop_event.is_set():
+                    return False
+                self.condition.wait(poll_interval)
+            # По кругу: каждый работающий воркер получает свою долю новых URL
+            for _ in range(self.worker_count):
+                self.next_worker = self.next_worker % self.worker_count + 1
+                if self.next_worker not in self.abandoned:
+                    break
+            self.local_queues[self.next_worker].append(url)
+            self.condition.notify_all()
+            return True
+
+    def close_input(self):
+        """Новых URL больше не будет"""
+        with self.condition:
+            self.input_closed = True
+            self.condition.notify_all()
+
+    def wait_for_urls(self, timeout):
+        """Ожидание новых URL или закрытия входа. Возвращает True, если есть URL"""
+        with self.condition:
+            if not self._pending_locked() and not self.input_closed:
+                self.condition.wait(timeout)
+            return self._pending_locked() > 0
+
+    def is_exhausted(self):
+        """URL больше не будет: вход закрыт и очередь пуста"""
+        with self.lock:
+            return self.input_closed and not self._pending_locked()
+
+    def next_url(self, worker_id):
+        """Следующий URL для воркера: из своей очереди или украденный у самого загруженного"""
+        with self.lock:
+            own_queue = self.local_queues[worker_id]
+            if own_queue:
+                url = own_queue.popleft()
+            else:
+                victim_id = max(self.local_queues, key=lambda w: len(self.local_queues[w]))
+                victim_queue = self.local_queues[victim_id]
+                if not victim_queue:
+                    return None
+                # Забираем с хвоста, чтобы не конкурировать с владельцем очереди
+                url = victim_queue.pop()
+                self.stolen_count += 1
+                self.logger.debug(f"Воркер {worker_id} забрал URL у воркера {victim_id}")
+
+            self.in_flight[worker_id].add(url)
+            # Освободилось место для поставщика URL
+            self.condition.notify_all()
+            return url
+
+    def complete(self, worker_id, url):
+        """Отметка URL как обработанного"""
+        with self.lock:
+            self.in_flight[worker_id].discard(url)
+
+    def requeue(self, worker_id, url):
+        """Возврат URL в общую очередь (например, при падении браузера)"""
+        with self.lock:
+            self.in_flight[worker_id].discard(url)
+            return self._requeue_locked(url)
+
+    def abandon_worker(self, worker_id):
+        """Возврат всех URL упавшего воркера в очередь. Возвращает URL, исчерпавшие повторы"""
+        with self.lock:
+            # Очередь завершившегося воркера больше не получает URL
+            self.abandoned.add(worker_id)
+            urls = list(self.in_flight[worker_id])
+            self.in_flight[worker_id].clear()
+            self.local_queues[worker_id], orphaned = deque(), self.local_queues[worker_id]
+
+            # Неначатые URL отдаем другим воркерам без увеличения счетчика повторов
+            for url in orphaned:
+                self._least_loaded_queue().append(url)
+
+            dropped = [url for url in urls if not self._requeue_locked(url)]
+            # Поставщик URL, ждущий места в очереди, проверяет, остались ли воркеры
+            self.condition.notify_all()
+
+        if urls or orphaned:
+            self.logger.warning(f"Воркер {worker_id} остановлен, возвращено в очередь URL: "
+                                f"{len(urls) - len(dropped) + len(orphaned)}")
+        return dropped
+
+    def _requeue_locked(self, url):
+        count = self.requeue_counts.get(url, 0)
+        if count >= self.max_requeues:
+            self.logger.error(f"URL исчерпал лимит повторов: {url}")
+            return False
+        self.requeue_counts[url] = count + 1
+        self.requeued_count += 1
+        self._least_loaded_queue().append(url)
+        return True
+
+    def _all_abandoned_locked(self):
+        return len(self.abandoned) >= self.worker_count
+
+    def _least_loaded_queue(self):
+        # Если завершились все воркеры, URL остаются в очереди до drain
+        candidates = [w for w in self.local_queues if w not in self.abandoned] or list(self.local_queues)
+        worker_id = min(candidates, key=lambda w: len(self.local_queues[w]))
+        return self.local_queues[worker_id]
+
+    def drain(self):
+        """Извлечение всех необработанных URL"""
+        with self.lock:
+            urls = []
+            for local_queue in self.local_queues.values():
+                urls.extend(local_queue)
+                local_queue.clear()
+            return urls
+
+    def pending_count(self):
+        """Количество URL, ожидающих обработки"""
+        with self.lock:
+            return self._pending_locked()
+
+    def _pending_locked(self):
+        return sum(len(q) for q in self.local_queues.values())
+
+    def get_statistics(self):
+        with self.lock:
+            return {
+                'pending': sum(len(q) for q in self.local_queues.values()),
+                'in_flight': sum(len(s) for s in self.in_flight.values()),
+                'stolen': self.stolen_count,
+                'requeued': self.requeued_count
+            }
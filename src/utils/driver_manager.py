@@ -1,26 +1,49 @@
 from selenium import webdriver
 from selenium_stealth import stealth
+import json
 import logging
+import threading
+import time
+from src.config import (DRIVER_POOL_SIZE, DRIVER_MAX_PAGES, DRIVER_START_CONCURRENCY,
+                        BLOCK_PROFILES, RESOURCE_TYPE_PATTERNS, BLOCKING_STATS, PAGE_ARCHIVE_MODE,
+                        PAGE_ARCHIVE_BUFFER_SIZE, PAGE_ARCHIVE_REPLAY_BLOCK)
+from src.utils.metrics import get_metrics
 
 class DriverManager:
-    def __init__(self):
+    def __init__(self, max_size=DRIVER_POOL_SIZE, max_pages=DRIVER_MAX_PAGES,
+                 start_concurrency=DRIVER_START_CONCURRENCY):
         self.drivers = []
         self.logger = logging.getLogger('driver_manager')
-        
+
+        # Пул браузеров: свободные драйверы и счетчики обработанных страниц
+        self.max_size = max_size
+        self.max_pages = max_pages
+        self.idle_drivers = []
+        self.pages_served = {}
+        self.starting_count = 0
+        self.closed = False
+        self.lock = threading.Condition()
+        self.start_semaphore = threading.BoundedSemaphore(max(1, start_concurrency))
+
     def create_driver(self,headless=True):
         """Создание нового экземпляра браузера с selenium-stealth"""
         options = webdriver.ChromeOptions()
-                
+
         # Основные опции для производительности и обхода детектирования
         options.add_argument('--disable-gpu')
         options.add_argument('--no-sandbox')
         options.add_argument('--disable-dev-shm-usage')
         options.add_argument('--disable-blink-features=AutomationControlled')
         options.add_argument('--blink-settings=imagesEnabled=false')
-        
+
+        # Фоновые вкладки не должны замедляться: воркер грузит несколько страниц сразу
+        options.add_argument('--disable-background-timer-throttling')
+        options.add_argument('--disable-backgrounding-occluded-windows')
+        options.add_argument('--disable-renderer-backgrounding')
+
         if headless:
             options.add_argument('--headless')
-        
+
         # Отключение изображений и настройка JavaScript
         prefs = {
             'profile.default_content_setting_values': {
@@ -29,10 +52,17 @@ class DriverManager:
             }
         }
         options.add_experimental_option('prefs', prefs)
-        
-        # Создание драйвера с системным chromedriver
-        driver = webdriver.Chrome(options=options)
-        
+
+        # Журнал сетевых событий для подсчета заблокированных запросов и записи архива страниц
+        if BLOCKING_STATS or PAGE_ARCHIVE_MODE == 'record':
+            options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+            options.add_experimental_option('perfLoggingPrefs', {'enableNetwork': True, 'enablePage': False})
+
+        # Создание драйвера с системным chromedriver.
+        # Семафор ограничивает число одновременно стартующих Chrome
+        with self.start_semaphore:
+            driver = webdriver.Chrome(options=options)
+
         # Применение stealth настроек
         stealth(
             driver,
@@ -44,28 +74,354 @@ class DriverManager:
             fix_hairline=True,
             webdriver=False
         )
-        
-        self.drivers.append(driver)
-        self.logger.info(f"Создан новый браузер с selenium-stealth. Всего активных: {len(self.drivers)}")
+
+        self._instrument_driver(driver)
+
+        with self.lock:
+            self.drivers.append(driver)
+            self.pages_served[driver] = 0
+            active_count = len(self.drivers)
+        self.logger.info(f"Создан новый браузер с selenium-stealth. Всего активных: {active_count}")
+        return driver
+
+    def _instrument_driver(self, driver):
+        """Подсчет команд WebDriver: каждая команда - HTTP-запрос к chromedriver"""
+        execute = driver.execute
+        driver.command_count = 0
+
+        def counted_execute(driver_command, params=None):
+            driver.command_count += 1
+            return execute(driver_command, params)
+
+        driver.execute = counted_execute
+
+    def acquire_driver(self, timeout=None, profile=None, fresh=False):
+        """Получение браузера из пула (свободного или нового).
+
+        profile - профиль блокировки ресурсов из BLOCK_PROFILES
+        fresh - только что запущенный браузер с чистой сессией (свободный браузер
+        пула закрывается, если лимит исчерпан)
+        """
+        driver = self._acquire_driver(timeout, fresh)
+        if profile is not None:
+            try:
+                self.apply_block_profile(driver, profile)
+            except Exception as e:
+                self.logger.warning(f"Не удалось применить профиль блокировки {profile}: {str(e)}")
         return driver
 
+    def apply_block_profile(self, driver, profile, force=False):
+        """Блокировка ресурсов профиля через DevTools Network domain.
+
+        Блокировка действует на текущую вкладку: для новых вкладок нужен force=True
+        """
+        if not force and getattr(driver, 'block_profile', None) == profile:
+            return
+
+        settings = BLOCK_PROFILES[profile]
+        patterns = list(settings.get('url_patterns', []))
+        for resource_type in settings.get('resource_types', []):
+            patterns.extend(RESOURCE_TYPE_PATTERNS.get(resource_type, []))
+
+        network_params = {}
+        if PAGE_ARCHIVE_MODE == 'record':
+            # Тела ответов забираются из буфера DevTools после загрузки страницы
+            network_params = {'maxTotalBufferSize': PAGE_ARCHIVE_BUFFER_SIZE,
+                              'maxResourceBufferSize': PAGE_ARCHIVE_BUFFER_SIZE // 4}
+        elif PAGE_ARCHIVE_MODE == 'replay':
+            # Страницы отдает локальный сервер архива, живой сайт и внешние ресурсы недоступны
+            patterns.extend(PAGE_ARCHIVE_REPLAY_BLOCK)
+
+        driver.execute_cdp_cmd('Network.enable', network_params)
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': patterns})
+        driver.block_profile = profile
+        self.logger.debug(f"Применен профиль блокировки {profile}: {len(patterns)} шаблонов")
+
+    def _acquire_driver(self, timeout, fresh=False):
+        """Выдача свободного браузера или запуск нового в пределах лимита"""
+        deadline = time.time() + timeout if timeout is not None else None
+
+        while True:
+            driver = None
+            with self.lock:
+                if self.closed:
+                    raise RuntimeError("Пул браузеров закрыт")
+
+                has_free_slot = len(self.drivers) + self.starting_count < self.max_size
+                if fresh and has_free_slot:
+                    self.starting_count += 1
+                elif self.idle_drivers:
+                    driver = self.idle_drivers.pop()
+                elif has_free_slot:
+                    self.starting_count += 1
+                else:
+                    remaining = deadline - time.time() if deadline is not None else None
+                    if remaining is not None and remaining <= 0:
+                        raise TimeoutError("Нет свободных браузеров в пуле")
+                    self.lock.wait(remaining)
+                    continue
+
+            if driver is not None:
+                # Свободный браузер уступает место новому
+                if fresh:
+                    self._discard_driver(driver)
+                    continue
+                # Проверяем, что браузер пережил предыдущую аренду
+                if self.is_alive(driver):
+                    self.logger.debug("Браузер выдан из пула")
+                    return driver
+                self.logger.warning("Браузер из пула не отвечает, заменяем")
+                self._discard_driver(driver)
+                continue
+
+            try:
+                return self.create_driver()
+            finally:
+                with self.lock:
+                    self.starting_count -= 1
+                    self.lock.notify()
+
+    def release_driver(self, driver, pages=0, broken=False):
+        """Возврат браузера в пул после работы"""
+        if driver is None:
+            return
+
+        with self.lock:
+            if driver not in self.pages_served:
+                return
+            self.pages_served[driver] += pages
+            worn_out = self.pages_served[driver] >= self.max_pages
+            closed = self.closed
+
+        if broken or worn_out or closed or not self._reset_driver(driver):
+            if worn_out:
+                self.logger.info(f"Браузер обработал {self.max_pages} страниц, перезапускаем")
+            self._discard_driver(driver)
+            return
+
+        with self.lock:
+            self.idle_drivers.append(driver)
+            self.lock.notify()
+
+    def warm_up(self, count):
+        """Параллельный прогрев браузеров в пуле"""
+        with self.lock:
+            count = min(count, self.max_size - len(self.drivers) - self.starting_count)
+            if count <= 0:
+                return
+            self.starting_count += count
+
+        self.logger.info(f"Прогрев пула: запускаем {count} браузеров")
+
+        def start_one():
+            try:
+                driver = self.create_driver()
+                with self.lock:
+                    closed = self.closed
+                    if not closed:
+                        self.idle_drivers.append(driver)
+                if closed:
+                    self._discard_driver(driver)
+            except Exception as e:
+                self.logger.warning(f"Ошибка при прогреве браузера: {str(e)}")
+            finally:
+                with self.lock:
+                    self.starting_count -= 1
+                    self.lock.notify_all()
+
+        threads = [threading.Thread(target=start_one, daemon=True) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def is_alive(self, driver):
+        """Проверка, что браузер отвечает на команды"""
+        try:
+            driver.execute_script("return 1;")
+            return True
+        except Exception:
+            return False
+
+    def _reset_driver(self, driver):
+        """Сброс состояния браузера перед возвратом в пул"""
+        try:
+            handles = driver.window_handles
+            for handle in handles[1:]:
+                driver.switch_to.window(handle)
+                driver.close()
+            forget_tabs(driver, handles[1:])
+            driver.switch_to.window(handles[0])
+            driver.get("about:blank")
+            return True
+        except Exception as e:
+            self.logger.warning(f"Не удалось сбросить браузер: {str(e)}")
+            return False
+
+    def _discard_driver(self, driver):
+        """Закрытие браузера и удаление его из пула"""
+        try:
+            driver.quit()
+        except Exception as e:
+            self.logger.warning(f"Ошибка при закрытии драйвера: {str(e)}")
+        self.remove_driver(driver)
+
     def close_all_drivers(self):
         """Закрытие всех браузеров"""
-        for driver in self.drivers:
+        with self.lock:
+            drivers = list(self.drivers)
+            self.drivers.clear()
+            self.idle_drivers.clear()
+            self.pages_served.clear()
+            self.lock.notify_all()
+        for driver in drivers:
             try:
                 driver.quit()
             except Exception as e:
                 self.logger.warning(f"Ошибка при закрытии драйвера: {str(e)}")
-        self.drivers.clear()
         self.logger.info("Все браузеры закрыты")
 
     def remove_driver(self, driver):
         """Удаление драйвера из списка"""
-        if driver in self.drivers:
-            self.drivers.remove(driver)
-            self.logger.debug(f"Драйвер удален из списка. Осталось активных: {len(self.drivers)}")
+        with self.lock:
+            if driver in self.drivers:
+                self.drivers.remove(driver)
+            if driver in self.idle_drivers:
+                self.idle_drivers.remove(driver)
+            self.pages_served.pop(driver, None)
+            remaining = len(self.drivers)
+            self.lock.notify()
+        self.logger.debug(f"Драйвер удален из списка. Осталось активных: {remaining}")
+
+    def get_statistics(self):
+        """Состояние пула браузеров"""
+        with self.lock:
+            return {
+                'total': len(self.drivers),
+                'idle': len(self.idle_drivers),
+                'starting': self.starting_count,
+                'max_size': self.max_size
+            }
+
+    def metric_values(self):
+        """Состояние пула для эндпоинта метрик"""
+        stats = self.get_statistics()
+        busy = stats['total'] - stats['idle']
+        return {
+            'ozon_drivers_active': {(): busy},
+            'ozon_drivers_total': {
+                (('state', 'busy'),): busy,
+                (('state', 'idle'),): stats['idle'],
+                (('state', 'starting'),): stats['starting']
+            }
+        }
 
     def cleanup(self):
         """Очистка ресурсов"""
+        with self.lock:
+            self.closed = True
         self.close_all_drivers()
-        self.logger.info("Очистка DriverManager завершена")
\ No newline at end of file
+        self.logger.info("Очистка DriverManager завершена")
+
+
+def _tab_key(handle):
+    """Вкладка в журнале performance: id цели DevTools (handle WebDriver без префикса CDwindow-)"""
+    return handle.split('CDwindow-')[-1].upper() if handle else None
+
+
+def _network_consumers():
+    consumers = []
+    if BLOCKING_STATS:
+        consumers.append('stats')
+    if PAGE_ARCHIVE_MODE == 'record':
+        consumers.append('archive')
+    return consumers
+
+
+def take_network_events(driver, consumer):
+    """События журнала performance текущей вкладки для потребителя ("stats" или "archive").
+
+    Журнал общий для всех вкладок браузера и очищается при чтении, поэтому
+    события раскладываются по вкладкам (поле webview) и отдаются каждому
+    потребителю один раз. События без вкладки относятся к текущей
+    """
+    consumers = _network_consumers()
+    if consumer not in consumers:
+        return []
+    backlog = getattr(driver, 'network_events', None)
+    if backlog is None:
+        backlog = driver.network_events = {}
+    try:
+        entries = driver.get_log('performance')
+    except Exception:
+        entries = []
+
+    for entry in entries:
+        try:
+            payload = json.loads(entry['message'])
+            message = payload['message']
+        except (KeyError, ValueError):
+            continue
+        tab = _tab_key(payload.get('webview'))
+        for name in consumers:
+            backlog.setdefault((name, tab), []).append(message)
+
+    try:
+        current = _tab_key(driver.current_window_handle)
+    except Exception:
+        current = None
+    messages = backlog.pop((consumer, current), [])
+    if current is not None:
+        messages.extend(backlog.pop((consumer, None), []))
+    return messages
+
+
+def forget_tabs(driver, handles):
+    """Отбрасывает неразобранные события закрытых вкладок"""
+    backlog = getattr(driver, 'network_events', None)
+    if not backlog:
+        return
+    tabs = {_tab_key(handle) for handle in handles}
+    for key in [key for key in backlog if key[1] in tabs]:
+        del backlog[key]
+
+
+def collect_network_stats(driver):
+    """Заблокированные запросы и полученный трафик текущей вкладки с прошлого вызова.
+
+    Размер заблокированных ответов браузеру неизвестен (они не загружались),
+    поэтому для них считается только количество.
+    """
+    stats = {'blocked_requests': 0, 'transferred_bytes': 0}
+    for message in take_network_events(driver, 'stats'):
+        method = message.get('method')
+        params = message.get('params', {})
+        if method == 'Network.loadingFailed' and params.get('blockedReason'):
+            stats['blocked_requests'] += 1
+        elif method == 'Network.loadingFinished':
+            stats['transferred_bytes'] += int(params.get('encodedDataLength', 0))
+    return stats
+
+
+# Общий пул браузеров процесса: переживает отдельные задачи бота
+_shared_pool = None
+_shared_pool_lock = threading.Lock()
+
+
+def get_driver_pool():
+    """Получение общего пула браузеров"""
+    global _shared_pool
+    with _shared_pool_lock:
+        if _shared_pool is None or _shared_pool.closed:
+            _shared_pool = DriverManager()
+            get_metrics().register_source('driver_pool', _shared_pool.metric_values)
+        return _shared_pool
+
+
+def shutdown_driver_pool():
+    """Закрытие общего пула браузеров"""
+    global _shared_pool
+    with _shared_pool_lock:
+        pool, _shared_pool = _shared_pool, None
+    if pool is not None:
+        pool.cleanup()
@@ -1,113 +1,116 @@
-import os
-import logging
 import openpyxl
-from openpyxl.styles import Font, Alignment, Border, Side, PatternFill
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, Alignment, Border, Side, PatternFill, NamedStyle
 from openpyxl.utils import get_column_letter
 from src.config import RESULTS_DIR
+from .exporters import ResultExporter
 
-class ExcelExporter:
-    def __init__(self, category_name, timestamp):
-        self.logger = logging.getLogger('excel_exporter')
-        self.category_name = category_name
-        self.timestamp = timestamp
+HEADERS = ['Название товара', 'Название компании', 'Ссылка на товар', 'Ссылка на изображение']
+COLUMN_WIDTHS = [60, 40, 75, 75]
+ROW_HEIGHT = 25
+
+# Цвет строки по статусу результата
+STATUS_COLORS = {
+    'success': 'C6EFCE',
+    'out_of_stock': 'FFEB9C',
+    'error': 'FFC7CE',
+    'not_found': 'E6E6E6',
+    'seller_not_found': 'FCE4D6',
+    'budget_exhausted': 'F4B084'
+}
+
+
+class ExcelExporter(ResultExporter):
+    """Потоковая запись результатов в Excel (openpyxl write-only).
+
+    Строки пишутся во временный файл по мере готовности, поэтому память
+    не растет с числом строк. Стили общие (именованные), а не на каждую ячейку.
+    """
+
+    extension = 'xlsx'
+
+    def __init__(self, category_name, timestamp, output_dir=RESULTS_DIR):
+        super().__init__(category_name, timestamp, output_dir)
         self.workbook = None
         self.worksheet = None
-
-        self.excel_filename = os.path.join(
-            RESULTS_DIR, 
-            f"{self.category_name}_{self.timestamp}.xlsx"
-        )
+        self.excel_filename = self.filename
         self.logger.info(f"Файл результатов: {self.excel_filename}")
 
     def init_workbook(self):
-        self.workbook = openpyxl.Workbook()
-        self.worksheet = self.workbook.active
-        self.worksheet.title = "Результаты парсинга Ozon"
+        self.workbook = openpyxl.Workbook(write_only=True)
+        self.worksheet = self.workbook.create_sheet("Результаты парсинга Ozon")
+        self._register_styles()
+
+        ws = self.worksheet
+        # Ширина колонок, высота строк и закрепление шапки задаются до записи строк
+        for col_num, width in enumerate(COLUMN_WIDTHS, 1):
+            ws.column_dimensions[get_column_letter(col_num)].width = width
+        ws.sheet_format.defaultRowHeight = ROW_HEIGHT
+        ws.sheet_format.customHeight = True
+        ws.freeze_panes = "A2"
+
+    def _register_styles(self):
+        """Именованные стили шапки и строк для каждого статуса"""
+        thin_border = Border(
+            left=Side(style='thin'),
+            right=Side(style='thin'),
+            top=Side(style='thin'),
+            bottom=Side(style='thin')
+        )
 
-    def save_results(self, results):
+        self.workbook.add_named_style(NamedStyle(
+            name='ozon_header',
+            font=Font(name='Arial', size=12, bold=True, color='FFFFFF'),
+            fill=PatternFill(start_color='4472C4', end_color='4472C4', fill_type='solid'),
+            alignment=Alignment(horizontal='center', vertical='center', wrap_text=True),
+            border=thin_border
+        ))
+
+        data_font = Font(name='Arial', size=11)
+        data_alignment = Alignment(horizontal='left', vertical='center', wrap_text=True)
+        self.workbook.add_named_style(NamedStyle(
+            name='ozon_data', font=data_font, alignment=data_alignment, border=thin_border
+        ))
+        for status, color in STATUS_COLORS.items():
+            self.workbook.add_named_style(NamedStyle(
+                name=f'ozon_{status}',
+                font=data_font,
+                fill=PatternFill(start_color=color, end_color=color, fill_type='solid'),
+                alignment=data_alignment,
+                border=thin_border
+            ))
+
+    def open_stream(self):
+        """Создание книги и запись шапки. Далее строки добавляются через append_result"""
+        try:
+            with self.lock:
+                self.init_workbook()
+                self.rows_written = 0
+                self.worksheet.append([self._styled_cell(header, 'ozon_header') for header in HEADERS])
+            return True
+        except Exception as e:
+            self.logger.error(f"Ошибка при создании Excel: {str(e)}")
+            return False
+
+    def append_result(self, result):
+        """Запись одной строки результата (потокобезопасно)"""
+        row = self._row(result)
+        row_data = [row['product_name'], row['company_name'], row['url'], row['image_url']]
+        style = f"ozon_{row['status']}" if row['status'] in STATUS_COLORS else 'ozon_data'
+
+        with self.lock:
+            self.worksheet.append([self._styled_cell(value, style) for value in row_data])
+            self.rows_written += 1
+
+    def close_stream(self):
+        """Фильтр по заполненному диапазону и сохранение файла"""
         try:
-            self.init_workbook()
-            ws = self.worksheet
-
-            headers = ['Название товара', 'Название компании', 'Ссылка на товар', 'Ссылка на изображение']
-
-            header_font = Font(name='Arial', size=12, bold=True, color='FFFFFF')
-            header_fill = PatternFill(start_color='4472C4', end_color='4472C4', fill_type='solid')
-            header_alignment = Alignment(horizontal='center', vertical='center', wrap_text=True)
-
-            data_font = Font(name='Arial', size=11)
-            data_alignment = Alignment(horizontal='left', vertical='center', wrap_text=True)
-
-            thin_border = Border(
-                left=Side(style='thin'),
-                right=Side(style='thin'),
-                top=Side(style='thin'),
-                bottom=Side(style='thin')
-            )
-
-            status_colors = {
-                'success': PatternFill(start_color='C6EFCE', end_color='C6EFCE', fill_type='solid'),
-                'out_of_stock': PatternFill(start_color='FFEB9C', end_color='FFEB9C', fill_type='solid'),
-                'error': PatternFill(start_color='FFC7CE', end_color='FFC7CE', fill_type='solid'),
-                'not_found': PatternFill(start_color='E6E6E6', end_color='E6E6E6', fill_type='solid'),
-                'seller_not_found': PatternFill(start_color='FCE4D6', end_color='FCE4D6', fill_type='solid')
-            }
-
-            for col_num, header in enumerate(headers, 1):
-                cell = ws.cell(row=1, column=col_num, value=header)
-                cell.font = header_font
-                cell.fill = header_fill
-                cell.alignment = header_alignment
-                cell.border = thin_border
-
-            for row_num, result in enumerate(results, 2):
-                if isinstance(result, dict):
-                    url = result.get('url', '')
-                    product = result.get('product_name', '')
-                    company = result.get('company_name', '')
-                    image_url = result.get('image_url', '')
-                    status = result.get('status', 'success')
-                else:
-                    if len(result) >= 3:
-                        url, product, company = result[0], result[1], result[2]
-                        image_url = result[3] if len(result) >= 4 else "Не найдено"
-                        status = result[5] if len(result) >= 6 else "success"
-                    else:
-                        url = str(result[0]) if len(result) > 0 else ""
-                        product = str(result[1]) if len(result) > 1 else "Не найдено"
-                        company = str(result[2]) if len(result) > 2 else "Не найдено"
-                        image_url = "Не найдено"
-                        status = "success"
-
-                clean_product = self._clean_text_value(product)
-                clean_company = self._clean_text_value(company)
-
-                row_data = [clean_product, clean_company, url, image_url]
-
-                row_fill = status_colors.get(status, None)
-
-                for col_num, value in enumerate(row_data, 1):
-                    cell = ws.cell(row=row_num, column=col_num, value=value)
-                    cell.font = data_font
-                    cell.alignment = data_alignment
-                    cell.border = thin_border
-
-                    if row_fill:
-                        cell.fill = row_fill
-
-            column_widths = [60, 40, 75, 75]
-            for col_num, width in enumerate(column_widths, 1):
-                col_letter = get_column_letter(col_num)
-                ws.column_dimensions[col_letter].width = width
-
-            for row in range(1, len(results) + 2):
-                ws.row_dimensions[row].height = 25
-
-            if results:
-                ws.auto_filter.ref = f"A1:D{len(results) + 1}"
-            ws.freeze_panes = "A2"
-
-            self.workbook.save(self.excel_filename)
+            with self.lock:
+                if self.rows_written:
+                    self.worksheet.auto_filter.ref = f"A1:D{self.rows_written + 1}"
+                self.workbook.save(self.excel_filename)
+                self.workbook = None
+                self.worksheet = None
             self.logger.info(f"Результаты сохранены в {self.excel_filename}")
             return True
 
@@ -115,10 +118,19 @@ class ExcelExporter:
             self.logger.error(f"Ошибка при сохранении Excel: {str(e)}")
             return False
 
-    def _clean_text_value(self, value):
-        if not value:
-            return ""
-        return str(value).replace('\n', ' ').replace('\r', ' ').strip()
+    def save_results(self, results):
+        """Запись всех результатов разом"""
+        if not self.open_stream():
+            return False
+        try:
+            for result in results:
+                self.append_result(result)
+        except Exception as e:
+            self.logger.error(f"Ошибка при записи строк Excel: {str(e)}")
+            return False
+        return self.close_stream()
 
-    def get_filename(self):
-        return self.excel_filename
+    def _styled_cell(self, value, style):
+        cell = WriteOnlyCell(self.worksheet, value=value)
+        cell.style = style
+        return cell
@@ -0,0 +1,240 @@
+import csv
+import json
+import os
+import logging
+import threading
+from abc import ABC, abstractmethod
+from src.config import RESULTS_DIR, EXPORT_FORMATS, EXPORT_PARQUET_BATCH_SIZE
+
+# Колонки табличных форматов (CSV, Parquet)
+RESULT_COLUMNS = ['url', 'product_name', 'company_name', 'image_url', 'status']
+
+
+class ResultExporter(ABC):
+    """Потоковая выгрузка результатов: open_stream, append_result на каждую строку, close_stream"""
+
+    extension = None
+
+    def __init__(self, category_name, timestamp, output_dir=RESULTS_DIR):
+        self.logger = logging.getLogger('exporter')
+        self.category_name = category_name
+        self.timestamp = timestamp
+        self.rows_written = 0
+        self.lock = threading.Lock()
+        self.filename = os.path.join(output_dir, f"{category_name}_{timestamp}.{self.extension}")
+
+    @abstractmethod
+    def open_stream(self):
+        """Открытие файла выгрузки"""
+
+    @abstractmethod
+    def append_result(self, result):
+        """Запись одной строки результата"""
+
+    @abstractmethod
+    def close_stream(self):
+        """Завершение и закрытие файла выгрузки"""
+
+    def get_filename(self):
+        return self.filename
+
+    def get_filenames(self):
+        return [self.filename]
+
+    def _row(self, result):
+        """Строка результата: словарь с колонками RESULT_COLUMNS"""
+        if isinstance(result, dict):
+            row = {
+                'url': result.get('url', ''),
+                'product_name': result.get('product_name', ''),
+                'company_name': result.get('company_name', ''),
+                'image_url': result.get('image_url', ''),
+                'status': result.get('status', 'success')
+            }
+        else:
+            # Кортеж (url, товар, компания[, изображение[, ..., статус]])
+            row = {
+                'url': result[0] if len(result) > 0 else '',
+                'product_name': result[1] if len(result) > 1 else "Не найдено",
+                'company_name': result[2] if len(result) > 2 else "Не найдено",
+                'image_url': result[3] if len(result) > 3 else "Не найдено",
+                'status': result[5] if len(result) > 5 else "success"
+            }
+        row['product_name'] = self._clean_text_value(row['product_name'])
+        row['company_name'] = self._clean_text_value(row['company_name'])
+        return row
+
+    def _clean_text_value(self, value):
+        if not value:
+            return ""
+        return str(value).replace('\n', ' ').replace('\r', ' ').strip()
+
+
+class CsvExporter(ResultExporter):
+    """CSV в UTF-8 с BOM (корректно открывается в Excel)"""
+
+    extension = 'csv'
+
+    def open_stream(self):
+        try:
+            self.file = open(self.filename, 'w', encoding='utf-8-sig', newline='')
+            self.writer = csv.DictWriter(self.file, fieldnames=RESULT_COLUMNS)
+            self.writer.writeheader()
+            return True
+        except Exception as e:
+            self.logger.error(f"Ошибка при создании CSV: {str(e)}")
+            return False
+
+    def append_result(self, result):
+        row = self._row(result)
+        with self.lock:
+            self.writer.writerow(row)
+            self.rows_written += 1
+
+    def close_stream(self):
+        try:
+            with self.lock:
+                self.file.close()
+            self.logger.info(f"Результаты сохранены в {self.filename}")
+            return True
+        except Exception as e:
+            self.logger.error(f"Ошибка при сохранении CSV: {str(e)}")
+            return False
+
+
+class JsonlExporter(ResultExporter):
+    """JSON Lines: один объект результата на строку"""
+
+    extension = 'jsonl'
+
+    def open_stream(self):
+        try:
+            self.file = open(self.filename, 'w', encoding='utf-8')
+            return True
+        except Exception as e:
+            self.logger.error(f"Ошибка при создании JSONL: {str(e)}")
+            return False
+
+    def append_result(self, result):
+        line = json.dumps(self._row(result), ensure_ascii=False) + '\n'
+        with self.lock:
+            self.file.write(line)
+            self.rows_written += 1
+
+    def close_stream(self):
+        try:
+            with self.lock:
+                self.file.close()
+            self.logger.info(f"Результаты сохранены в {self.filename}")
+            return True
+        except Exception as e:
+            self.logger.error(f"Ошибка при сохранении JSONL: {str(e)}")
+            return False
+
+
+class ParquetExporter(ResultExporter):
+    """Parquet (pyarrow): строки копятся пачками и пишутся row group'ами"""
+
+    extension = 'parquet'
+
+    def __init__(self, category_name, timestamp, output_dir=RESULTS_DIR, batch_size=EXPORT_PARQUET_BATCH_SIZE):
+        super().__init__(category_name, timestamp, output_dir)
+        self.batch_size = batch_size
+        self.batch = []
+        self.writer = None
+
+    def open_stream(self):
+        try:
+            # pyarrow нужен только для этого формата
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            self.logger.error("Для выгрузки в Parquet установите pyarrow")
+            return False
+        try:
+            self.pa = pa
+            self.schema = pa.schema([(column, pa.string()) for column in RESULT_COLUMNS])
+            self.writer = pq.ParquetWriter(self.filename, self.schema, compression='zstd')
+            return True
+        except Exception as e:
+            self.logger.error(f"Ошибка при создании Parquet: {str(e)}")
+            return False
+
+    def append_result(self, result):
+        row = self._row(result)
+        with self.lock:
+            self.batch.append(row)
+            self.rows_written += 1
+            if len(self.batch) >= self.batch_size:
+                self._write_batch()
+
+    def close_stream(self):
+        try:
+            with self.lock:
+                self._write_batch()
+                self.writer.close()
+            self.logger.info(f"Результаты сохранены в {self.filename}")
+            return True
+        except Exception as e:
+            self.logger.error(f"Ошибка при сохранении Parquet: {str(e)}")
+            return False
+
+    def _write_batch(self):
+        if not self.batch:
+            return
+        self.writer.write_table(self.pa.Table.from_pylist(self.batch, schema=self.schema))
+        self.batch = []
+
+
+class MultiExporter(ResultExporter):
+    """Одновременная выгрузка в несколько форматов"""
+
+    def __init__(self, exporters):
+        self.logger = logging.getLogger('exporter')
+        self.exporters = exporters
+        self.rows_written = 0
+        self.lock = threading.Lock()
+
+    def open_stream(self):
+        # Формат, который не удалось открыть, пропускается, остальные продолжают работу
+        opened = [exporter for exporter in self.exporters if exporter.open_stream()]
+        if len(opened) < len(self.exporters):
+            self.logger.warning(f"Форматы выгрузки отключены: "
+                                f"{[e.extension for e in self.exporters if e not in opened]}")
+        self.exporters = opened
+        return bool(opened)
+
+    def append_result(self, result):
+        for exporter in self.exporters:
+            exporter.append_result(result)
+        with self.lock:
+            self.rows_written += 1
+
+    def close_stream(self):
+        results = [exporter.close_stream() for exporter in self.exporters]
+        return bool(results) and all(results)
+
+    def get_filename(self):
+        return self.exporters[0].get_filename()
+
+    def get_filenames(self):
+        return [exporter.get_filename() for exporter in self.exporters]
+
+
+def get_exporter_classes():
+    """Доступные форматы выгрузки: {расширение: класс}"""
+    from .excel_exporter import ExcelExporter
+    return {
+        'xlsx': ExcelExporter,
+        'csv': CsvExporter,
+        'jsonl': JsonlExporter,
+        'parquet': ParquetExporter
+    }
+
+
+def create_exporter(category_name, timestamp, formats=None):
+    """Выгрузка результатов задачи в выбранные форматы (по умолчанию EXPORT_FORMATS)"""
+    exporter_classes = get_exporter_classes()
+    formats = [f for f in (formats or EXPORT_FORMATS) if f in exporter_classes] or ['xlsx']
+    exporters = [exporter_classes[f](category_name, timestamp) for f in dict.fromkeys(formats)]
+    return exporters[0] if len(exporters) == 1 else MultiExporter(exporters)
@@ -0,0 +1,171 @@
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from src.config import JOURNAL_DIR, JOURNAL_FSYNC_INTERVAL
+
+# Журналы задач, которые сейчас в очереди или выполняются в этом процессе
+_active_paths = set()
+_active_lock = threading.Lock()
+
+
+class JobJournal:
+    """Журнал задачи парсинга товаров: JSON Lines, только дозапись.
+
+    Первая запись - заголовок задачи (категория, метка времени, все URL),
+    далее по одной записи на обработанный URL и запись о завершении.
+    URL, поступающие по ходу задачи (сбор ссылок параллельно с парсингом),
+    дописываются записями 'urls' и при чтении добавляются к заголовку.
+    Заголовок и запись о завершении сразу сбрасываются на диск (fsync),
+    остальные записи - не реже раза в fsync_interval секунд, поэтому при
+    сбое питания теряются только последние результаты.
+    """
+
+    def __init__(self, path, fsync_interval=JOURNAL_FSYNC_INTERVAL):
+        self.logger = logging.getLogger('job_journal')
+        self.path = path
+        self.fsync_interval = fsync_interval
+        self.lock = threading.Lock()
+        self.file = None
+        self.synced_at = 0.0  # Время последнего fsync
+        self.unsynced = False  # Есть записи, не сброшенные на диск
+
+    @classmethod
+    def create(cls, category_name, timestamp, urls, export_formats=None, journal_dir=JOURNAL_DIR):
+        """Новый журнал задачи с заголовком"""
+        os.makedirs(journal_dir, exist_ok=True)
+        journal = cls(os.path.join(journal_dir, f"{category_name}_{timestamp}.jsonl"))
+        journal._append({
+            'type': 'job',
+            'category_name': category_name,
+            'timestamp': timestamp,
+            'urls': list(urls),
+            'export_formats': export_formats,
+            'created_at': time.time()
+        }, sync=True)
+        journal.logger.info(f"Журнал задачи: {journal.path}")
+        return journal
+
+    def load(self):
+        """Чтение журнала: (заголовок, {url: результат}, завершена ли задача).
+
+        Недописанная последняя строка (падение во время записи) пропускается.
+        Файл читается в байтах: обрыв внутри многобайтного символа UTF-8
+        не должен делать весь журнал нечитаемым.
+        """
+        header = None
+        results = {}
+        finished = False
+        with open(self.path, 'rb') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line.decode('utf-8'))
+                except ValueError:
+                    if line.endswith(b'\n'):
+                        self.logger.warning(f"Пропущена поврежденная запись журнала {self.path}")
+                    else:
+                        self.logger.info(f"Пропущена недописанная последняя запись журнала {self.path}")
+                    continue
+                if record.get('type') == 'job':
+                    header = record
+                elif record.get('type') == 'urls' and header is not None:
+                    header['urls'].extend(record['urls'])
+                elif record.get('type') == 'result':
+                    results[record['url']] = record['result']
+                elif record.get('type') == 'done':
+                    finished = True
+        if header is None:
+            raise ValueError(f"В журнале нет заголовка задачи: {self.path}")
+        return header, results, finished
+
+    def append_urls(self, urls):
+        """Запись URL, добавленных в задачу после ее создания"""
+        self._append({'type': 'urls', 'urls': list(urls)})
+
+    def append_result(self, url, result):
+        """Запись результата обработки URL"""
+        self._append({'type': 'result', 'url': url, 'result': result})
+
+    def finish(self, output_file=None):
+        """Отметка о завершении задачи. Завершенные задачи не возобновляются"""
+        self._append({'type': 'done', 'output_file': output_file, 'finished_at': time.time()}, sync=True)
+        self.close()
+
+    def close(self):
+        """Закрытие файла журнала (несброшенные записи сбрасываются на диск)"""
+        with self.lock:
+            if self.file is not None:
+                if self.unsynced:
+                    self._fsync()
+                self.file.close()
+                self.file = None
+        with _active_lock:
+            _active_paths.discard(os.path.abspath(self.path))
+
+    def _append(self, record, sync=False):
+        """Дозапись строки; sync=True - сразу fsync, иначе не реже fsync_interval"""
+        line = json.dumps(record, ensure_ascii=False) + '\n'
+        with self.lock:
+            if self.file is None:
+                with _active_lock:
+                    _active_paths.add(os.path.abspath(self.path))
+                self.file = open(self.path, 'a', encoding='utf-8')
+                # Недописанная строка после падения не должна склеиться с новой записью
+                if self.file.tell() > 0 and not self._ends_with_newline():
+                    self.file.write('\n')
+            self.file.write(line)
+            self.file.flush()
+            self.unsynced = True
+            if sync or time.time() - self.synced_at >= self.fsync_interval:
+                self._fsync()
+
+    def _fsync(self):
+        os.fsync(self.file.fileno())
+        self.synced_at = time.time()
+        self.unsynced = False
+
+    def _ends_with_newline(self):
+        with open(self.path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b'\n'
+
+
+def reserve_journal(path):
+    """Закрепляет журнал за поставленной в очередь задачей.
+
+    Returns:
+        bool: False если журнал уже в очереди или выполняется
+    """
+    with _active_lock:
+        key = os.path.abspath(path)
+        if key in _active_paths:
+            return False
+        _active_paths.add(key)
+        return True
+
+
+def release_journal(path):
+    """Снимает закрепление журнала (задача завершилась или не попала в очередь)"""
+    with _active_lock:
+        _active_paths.discard(os.path.abspath(path))
+
+
+def find_unfinished_journals(journal_dir=JOURNAL_DIR):
+    """Журналы незавершенных задач, от новых к старым (кроме выполняющихся сейчас)"""
+    unfinished = []
+    for path in glob.glob(os.path.join(journal_dir, '*.jsonl')):
+        with _active_lock:
+            if os.path.abspath(path) in _active_paths:
+                continue
+        try:
+            _, _, finished = JobJournal(path).load()
+        except (OSError, ValueError):
+            continue
+        if not finished:
+            unfinished.append(path)
+    unfinished.sort(key=os.path.getmtime, reverse=True)
+    return unfinished
@@ -0,0 +1,234 @@
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from src.config import METRICS_ENABLED, METRICS_HOST, METRICS_PORT, METRICS_RATE_WINDOW, METRICS_LATENCY_BUCKETS
+
+# Описание метрик для HELP/TYPE: {имя: (тип, описание)}
+METRIC_DEFINITIONS = {
+    'ozon_pages_total': ('counter', 'Pages parsed by browser workers, by page outcome'),
+    'ozon_pages_per_second': ('gauge', f'Pages parsed per second over the last {METRICS_RATE_WINDOW} seconds'),
+    'ozon_pages_in_flight': ('gauge', 'Pages being parsed right now'),
+    'ozon_results_total': ('counter', 'Final product results written to exports, by status'),
+    'ozon_stage_duration_seconds': ('histogram', 'Duration of page parsing stages'),
+    'ozon_drivers_active': ('gauge', 'Browsers leased to workers'),
+    'ozon_drivers_total': ('gauge', 'Browsers in the pool, by state'),
+    'ozon_queue_depth': ('gauge', 'Items waiting in queues'),
+    'ozon_jobs_running': ('gauge', 'Bot jobs being executed'),
+}
+
+
+class Histogram:
+    """Гистограмма с накопительными корзинами в формате Prometheus"""
+
+    def __init__(self, buckets=METRICS_LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * len(self.buckets)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+        self.total += 1
+        self.sum += value
+
+
+class MetricsRegistry:
+    """Счетчики, гистограммы и источники значений на момент запроса метрик.
+
+    Источник - функция без аргументов, возвращающая {метрика: {метки: значение}};
+    одинаковые метрики и метки разных источников (например, двух задач) суммируются
+    """
+
+    def __init__(self, rate_window=METRICS_RATE_WINDOW):
+        self.logger = logging.getLogger('metrics')
+        self.rate_window = rate_window
+        self.counters = {}  # {(имя, метки): значение}
+        self.gauges = {}
+        self.histograms = {}
+        self.sources = {}
+        self.page_times = deque()  # Время завершения страниц для ozon_pages_per_second
+        self.lock = threading.Lock()
+
+    def inc(self, name, labels=None, value=1):
+        """Увеличение счетчика"""
+        key = (name, _label_key(labels))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def add_gauge(self, name, value, labels=None):
+        """Изменение показателя на value (например, +1 при начале страницы и -1 в конце)"""
+        key = (name, _label_key(labels))
+        with self.lock:
+            self.gauges[key] = self.gauges.get(key, 0) + value
+
+    def observe(self, name, value, labels=None):
+        """Значение в гистограмму"""
+        key = (name, _label_key(labels))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+
+    @contextmanager
+    def stage(self, stage):
+        """Замер длительности этапа разбора в ozon_stage_duration_seconds"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe('ozon_stage_duration_seconds', time.perf_counter() - started, {'stage': stage})
+
+    @contextmanager
+    def page_in_flight(self):
+        """Страница в обработке: ozon_pages_in_flight на время блока"""
+        self.add_gauge('ozon_pages_in_flight', 1)
+        try:
+            yield
+        finally:
+            self.add_gauge('ozon_pages_in_flight', -1)
+
+    def record_page(self, status):
+        """Завершенная страница: счетчик по исходу и скорость обработки"""
+        self.inc('ozon_pages_total', {'status': status or 'unknown'})
+        now = time.monotonic()
+        with self.lock:
+            self.page_times.append(now)
+            self._trim_page_times(now)
+
+    def register_source(self, name, source):
+        """Источник значений, опрашиваемый при каждом запросе метрик"""
+        with self.lock:
+            self.sources[name] = source
+
+    def unregister_source(self, name):
+        with self.lock:
+            self.sources.pop(name, None)
+
+    def render(self):
+        """Все метрики в текстовом формате Prometheus"""
+        with self.lock:
+            self._trim_page_times(time.monotonic())
+            samples = {('ozon_pages_per_second', ()): len(self.page_times) / self.rate_window}
+            samples.update(self.counters)
+            samples.update(self.gauges)
+            histograms = {key: (histogram.buckets, list(histogram.counts), histogram.total, histogram.sum)
+                          for key, histogram in self.histograms.items()}
+            sources = list(self.sources.items())
+
+        for source_name, source in sources:
+            try:
+                for name, values in source().items():
+                    for labels, value in values.items():
+                        key = (name, _label_key(labels))
+                        samples[key] = samples.get(key, 0) + value
+            except Exception as e:
+                self.logger.debug(f"Ошибка источника метрик {source_name}: {str(e)}")
+
+        lines = []
+        for name, (metric_type, description) in METRIC_DEFINITIONS.items():
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            if metric_type == 'histogram':
+                for (metric, labels), (buckets, counts, total, total_sum) in sorted(histograms.items()):
+                    if metric != name:
+                        continue
+                    for bound, count in zip(buckets, counts):
+                        lines.append(f"{name}_bucket{_format_labels(labels + (('le', _format_value(bound)),))} "
+                                     f"{count}")
+                    lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {total}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(total_sum)}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {total}")
+            else:
+                for (metric, labels), value in sorted(samples.items()):
+                    if metric == name:
+                        lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+    def _trim_page_times(self, now):
+        while self.page_times and now - self.page_times[0] > self.rate_window:
+            self.page_times.popleft()
+
+
+def _label_key(labels):
+    """Метки в виде отсортированного кортежа пар (ключ словаря метрик)"""
+    if not labels:
+        return ()
+    if isinstance(labels, dict):
+        labels = labels.items()
+    return tuple(sorted((str(key), str(value)) for key, value in labels))
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in labels)
+    return '{' + ','.join(f'{key}="{value}"' for (key, _), value in zip(labels, escaped)) + '}'
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/', '/metrics'):
+            self.send_error(404)
+            return
+        body = get_metrics().render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+# Общий реестр метрик процесса и HTTP-сервер для него
+_registry = None
+_registry_lock = threading.Lock()
+_server = None
+
+
+def get_metrics():
+    """Получение общего реестра метрик"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = MetricsRegistry()
+        return _registry
+
+
+def start_metrics_server(host=METRICS_HOST, port=METRICS_PORT):
+    """Запуск эндпоинта /metrics в фоновом потоке (если METRICS_ENABLED). Возвращает адрес или None"""
+    global _server
+    if not METRICS_ENABLED:
+        return None
+    with _registry_lock:
+        if _server is None:
+            try:
+                _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            except OSError as e:
+                logging.getLogger('metrics').error(f"Не удалось запустить эндпоинт метрик на {host}:{port}: {str(e)}")
+                return None
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, name='metrics', daemon=True).start()
+            logging.getLogger('metrics').info(f"Метрики доступны на http://{host}:{port}/metrics")
+        return f"http://{_server.server_address[0]}:{_server.server_address[1]}/metrics"
+
+
+def stop_metrics_server():
+    """Остановка эндпоинта метрик"""
+    global _server
+    with _registry_lock:
+        server, _server = _server, None
+    if server is not None:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,301 @@
+"""
+Архив страниц Ozon для разработки парсеров и регрессионных прогонов без сети.
+
+В режиме записи (PAGE_ARCHIVE_MODE=record) ответы Ozon, полученные браузерами
+(документы и XHR из журнала DevTools) и HTTP-движками, сохраняются в SQLite
+со сжатием zlib. Ключ - путь и query URL.
+
+В режиме воспроизведения (PAGE_ARCHIVE_MODE=replay) ответы отдает локальный
+сервер архива: браузеры открывают страницы на нем, остальная сеть
+блокируется, ограничение частоты запросов не применяется.
+
+Запуск из командной строки:
+    python -m src.utils.page_archive stats
+    python -m src.utils.page_archive list --limit 50
+    python -m src.utils.page_archive serve --port 8080 --latency 0.2
+"""
+import argparse
+import base64
+import logging
+import sqlite3
+import threading
+import time
+import zlib
+from urllib.parse import urlsplit
+
+from src.config import (PAGE_ARCHIVE_MODE, PAGE_ARCHIVE_FILE, PAGE_ARCHIVE_HOSTS, PAGE_ARCHIVE_RESOURCE_TYPES,
+                        PAGE_ARCHIVE_REPLAY_PORT, PAGE_ARCHIVE_COMPRESSION)
+from src.utils.driver_manager import take_network_events
+from src.utils.standin_server import StandinServer
+
+# Адрес Ozon, на который возвращаются ссылки со страниц воспроизведения
+OZON_ORIGIN = 'https://www.ozon.ru'
+
+
+def archive_key(url):
+    """Ключ архива: путь и query URL без хоста и фрагмента"""
+    parts = urlsplit(url)
+    return (parts.path or '/') + (f"?{parts.query}" if parts.query else '')
+
+
+def is_archived_host(url, hosts=PAGE_ARCHIVE_HOSTS):
+    """Ответ домена из PAGE_ARCHIVE_HOSTS или его поддомена"""
+    host = urlsplit(url).hostname or ''
+    return any(host == domain or host.endswith('.' + domain) for domain in hosts)
+
+
+class PageArchive:
+    """Записанные ответы Ozon на диске (SQLite, тело сжато zlib).
+
+    Повторная запись того же URL заменяет ответ. При поиске без точного
+    совпадения query используется последний ответ с тем же путем.
+    """
+
+    def __init__(self, path=PAGE_ARCHIVE_FILE, compression=PAGE_ARCHIVE_COMPRESSION):
+        self.logger = logging.getLogger('page_archive')
+        self.path = path
+        self.compression = compression
+        self.lock = threading.Lock()
+
+        # Одно соединение на процесс: запросы из воркеров и сервера сериализуются блокировкой
+        self.connection = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        with self.lock, self.connection:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    path TEXT NOT NULL,
+                    url TEXT NOT NULL,
+                    status INTEGER NOT NULL,
+                    content_type TEXT NOT NULL,
+                    body BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    recorded_at REAL NOT NULL
+                )
+            """)
+            self.connection.execute("CREATE INDEX IF NOT EXISTS responses_path ON responses (path, recorded_at)")
+
+    def put(self, url, status, content_type, body):
+        """
+        Сохранение ответа
+
+        Args:
+            url: Полный URL запроса
+            status: HTTP-статус
+            content_type: Заголовок Content-Type
+            body: Тело ответа (bytes или str)
+        """
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        key = archive_key(url)
+        compressed = zlib.compress(body, self.compression)
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO responses (key, path, url, status, content_type, body, size, recorded_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, key.split('?', 1)[0], url, int(status), content_type or 'text/html; charset=utf-8',
+                 compressed, len(body), time.time())
+            )
+        self.logger.debug(f"Записан ответ {status} {url}: {len(body) / 1024:.0f} КБ")
+
+    def get(self, url_or_path):
+        """(статус, тело, content-type) для URL или пути запроса, либо None"""
+        key = archive_key(url_or_path)
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT status, body, content_type FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                row = self.connection.execute(
+                    "SELECT status, body, content_type FROM responses WHERE path = ? "
+                    "ORDER BY recorded_at DESC LIMIT 1", (key.split('?', 1)[0],)
+                ).fetchone()
+        if row is None:
+            return None
+        return row[0], zlib.decompress(row[1]), row[2]
+
+    def record_browser_responses(self, driver, messages):
+        """
+        Запись ответов Ozon, полученных браузером, по событиям журнала DevTools
+
+        Тела ответов запрашиваются через Network.getResponseBody, поэтому вызывать
+        нужно до ухода со страницы. DevTools отдает тела только для текущей вкладки.
+
+        Args:
+            driver: WebDriver с открытой страницей
+            messages: События журнала performance (словари с method и params)
+
+        Returns:
+            int: Число записанных ответов
+        """
+        responses = {}
+        first_urls = {}  # Исходный URL запроса до редиректов
+        finished = []
+        for message in messages:
+            method = message.get('method')
+            params = message.get('params', {})
+            request_id = params.get('requestId')
+            if method == 'Network.requestWillBeSent':
+                first_urls.setdefault(request_id, params.get('request', {}).get('url'))
+            elif method == 'Network.responseReceived' and params.get('type') in PAGE_ARCHIVE_RESOURCE_TYPES:
+                if is_archived_host(params.get('response', {}).get('url', '')):
+                    responses[request_id] = params['response']
+            elif method == 'Network.loadingFinished' and request_id in responses:
+                finished.append(request_id)
+
+        recorded = 0
+        for request_id in finished:
+            response = responses[request_id]
+            try:
+                content = driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': request_id})
+            except Exception as e:
+                # Тело вытеснено из буфера или запрос другой вкладки
+                self.logger.debug(f"Нет тела ответа {response.get('url')}: {str(e)}")
+                continue
+
+            if content.get('base64Encoded'):
+                body = base64.b64decode(content.get('body', ''))
+                content_type = response.get('mimeType') or 'application/octet-stream'
+            else:
+                # Текст DevTools отдает уже декодированным, сохраняется в UTF-8
+                body = content.get('body', '').encode('utf-8')
+                content_type = f"{response.get('mimeType') or 'text/html'}; charset=utf-8"
+
+            urls = {response['url'], first_urls.get(request_id) or response['url']}
+            for url in urls:
+                if is_archived_host(url):
+                    self.put(url, response.get('status', 200), content_type, body)
+            recorded += 1
+
+        if recorded:
+            self.logger.info(f"В архив записано ответов: {recorded}")
+        return recorded
+
+    def list_responses(self, limit=None):
+        """Записанные ответы от новых к старым: [(url, статус, размер, время записи)]"""
+        with self.lock:
+            return self.connection.execute(
+                "SELECT url, status, size, recorded_at FROM responses ORDER BY recorded_at DESC LIMIT ?",
+                (limit if limit is not None else -1,)
+            ).fetchall()
+
+    def get_statistics(self):
+        """Размер архива"""
+        with self.lock:
+            count, size, compressed = self.connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(LENGTH(body)), 0) FROM responses"
+            ).fetchone()
+        return {'entries': count, 'size': size, 'compressed_size': compressed}
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+
+class ArchiveServer(StandinServer):
+    """Локальный стенд, отдающий ответы из архива страниц"""
+
+    def __init__(self, archive, host='127.0.0.1', port=0, latency=0.0, jitter=0.0):
+        super().__init__(None, host, port, latency, jitter)
+        self.archive = archive
+
+    def find_record(self, path):
+        return self.archive.get(path)
+
+    def record_count(self):
+        return self.archive.get_statistics()['entries']
+
+
+def record_page(driver):
+    """Запись в архив ответов Ozon, полученных текущей вкладкой с прошлого вызова.
+
+    Вызывается после разбора страницы, пока браузер на ней: тела ответов
+    DevTools отдает только для открытой страницы. Вне режима записи ничего не делает.
+
+    Returns:
+        int: Число записанных ответов
+    """
+    if PAGE_ARCHIVE_MODE != 'record':
+        return 0
+    return get_page_archive().record_browser_responses(driver, take_network_events(driver, 'archive'))
+
+
+def replay_url(url):
+    """URL для загрузки: при воспроизведении - тот же путь на сервере архива"""
+    if PAGE_ARCHIVE_MODE != 'replay':
+        return url
+    return get_replay_server().base_url + archive_key(url)
+
+
+def original_url(url):
+    """Адрес Ozon для ссылки со страницы, открытой с сервера архива"""
+    if PAGE_ARCHIVE_MODE != 'replay' or not url:
+        return url
+    if not url.startswith(get_replay_server().base_url + '/'):
+        return url
+    return OZON_ORIGIN + archive_key(url)
+
+
+# Общий архив процесса и сервер воспроизведения
+_archive = None
+_archive_lock = threading.Lock()
+_replay_server = None
+_replay_server_lock = threading.Lock()
+
+
+def get_page_archive():
+    """Получение общего архива страниц"""
+    global _archive
+    with _archive_lock:
+        if _archive is None:
+            _archive = PageArchive()
+        return _archive
+
+
+def get_replay_server():
+    """Сервер воспроизведения архива (запускается при первом обращении)"""
+    global _replay_server
+    with _replay_server_lock:
+        if _replay_server is None:
+            _replay_server = ArchiveServer(get_page_archive(), port=PAGE_ARCHIVE_REPLAY_PORT)
+            _replay_server.start()
+        return _replay_server
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Архив страниц Ozon")
+    arg_parser.add_argument('--file', default=PAGE_ARCHIVE_FILE, help="Файл архива")
+    commands = arg_parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('stats', help="Размер архива")
+    list_parser = commands.add_parser('list', help="Записанные ответы")
+    list_parser.add_argument('--limit', type=int, default=50)
+    serve_parser = commands.add_parser('serve', help="Стенд Ozon из архива")
+    serve_parser.add_argument('--host', default='127.0.0.1')
+    serve_parser.add_argument('--port', type=int, default=8080)
+    serve_parser.add_argument('--latency', type=float, default=0.0, help="Задержка ответа (секунды)")
+    serve_parser.add_argument('--jitter', type=float, default=0.0, help="Случайная добавка к задержке (секунды)")
+    args = arg_parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    archive = PageArchive(args.file)
+    if args.command == 'stats':
+        stats = archive.get_statistics()
+        ratio = stats['compressed_size'] / stats['size'] if stats['size'] else 0.0
+        print(f"Ответов: {stats['entries']}, {stats['size'] / 1024 / 1024:.1f} МБ, "
+              f"сжато {stats['compressed_size'] / 1024 / 1024:.1f} МБ ({ratio:.0%})")
+    elif args.command == 'list':
+        for url, status, size, recorded_at in archive.list_responses(args.limit):
+            recorded = time.strftime('%d.%m.%Y %H:%M:%S', time.localtime(recorded_at))
+            print(f"{recorded}  {status}  {size / 1024:>8.0f} КБ  {url}")
+    else:
+        server = ArchiveServer(archive, args.host, args.port, args.latency, args.jitter)
+        print(f"Стенд из архива: {server.base_url} ({server.record_count()} ответов)")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            server.server_close()
+    archive.close()
+
+
+if __name__ == '__main__':
+    main()
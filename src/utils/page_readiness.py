@@ -0,0 +1,103 @@
+import logging
+import time
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+logger = logging.getLogger('page_readiness')
+
+# Асинхронный скрипт ожидания: предикат проверяется сразу, затем на каждую
+# мутацию DOM (MutationObserver) и редким опросом для изменений без мутаций
+# (раскладка, стили). Возвращает первое истинное значение предиката или null
+# по истечении единого дедлайна.
+_WAIT_SCRIPT_TEMPLATE = """
+const args = arguments[0];
+const timeoutMs = arguments[1];
+const done = arguments[arguments.length - 1];
+const check = () => {
+    try {
+        return (function (args) { __PREDICATE__ })(args);
+    } catch (e) {
+        return null;
+    }
+};
+
+const initial = check();
+if (initial) {
+    done(initial);
+    return;
+}
+
+let finished = false;
+let observer = null;
+let poller = null;
+let timer = null;
+const finish = (value) => {
+    if (finished) return;
+    finished = true;
+    if (observer) observer.disconnect();
+    clearInterval(poller);
+    clearTimeout(timer);
+    done(value || null);
+};
+
+observer = new MutationObserver(() => {
+    const value = check();
+    if (value) finish(value);
+});
+observer.observe(document, {childList: true, subtree: true, attributes: true, characterData: true});
+poller = setInterval(() => {
+    const value = check();
+    if (value) finish(value);
+}, 250);
+timer = setTimeout(() => finish(check()), timeoutMs);
+"""
+
+# Первый селектор, по которому найден (и при необходимости видим) элемент
+SELECTORS_PREDICATE = """
+    for (const selector of args.selectors) {
+        const el = document.querySelector(selector);
+        if (el && (!args.visible || el.getClientRects().length > 0)) return selector;
+    }
+    return null;
+"""
+
+# Запас к таймауту скрипта WebDriver сверх собственного дедлайна скрипта
+_SCRIPT_TIMEOUT_MARGIN = 5
+
+
+def wait_for_js(driver, predicate_js, timeout, args=None):
+    """Ожидание истинного значения JS-предиката (тело функции от args).
+
+    Возвращает значение предиката или None, если дедлайн истек.
+    """
+    script = _WAIT_SCRIPT_TEMPLATE.replace('__PREDICATE__', predicate_js)
+    deadline = time.time() + max(0, timeout)
+
+    while True:
+        remaining = deadline - time.time()
+        _ensure_script_timeout(driver, remaining)
+        try:
+            return driver.execute_async_script(script, args or {}, int(max(0, remaining) * 1000))
+        except TimeoutException:
+            return None
+        except WebDriverException as e:
+            # Скрипт прерван навигацией страницы: ждем дальше в новом документе
+            if deadline - time.time() <= 0 or 'unload' not in str(e).lower():
+                logger.debug(f"Ошибка ожидания готовности страницы: {str(e)}")
+                return None
+
+
+def wait_for_any(driver, selectors, timeout, visible=False):
+    """Ожидание появления любого из CSS-селекторов. Возвращает найденный селектор или None"""
+    return wait_for_js(driver, SELECTORS_PREDICATE, timeout, {
+        'selectors': list(selectors),
+        'visible': visible
+    })
+
+
+def _ensure_script_timeout(driver, timeout):
+    """Таймаут асинхронных скриптов должен превышать дедлайн ожидания"""
+    required = int(timeout) + _SCRIPT_TIMEOUT_MARGIN
+    current = getattr(driver, '_readiness_script_timeout', 0)
+    if current < required:
+        driver.set_script_timeout(max(required, 30))
+        driver._readiness_script_timeout = max(required, 30)
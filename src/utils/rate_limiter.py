@@ -0,0 +1,118 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+from src.config import (RATE_LIMIT_ENABLED, RATE_LIMIT_PER_SECOND, RATE_LIMIT_BURST, RATE_LIMIT_JITTER, RATE_LIMIT_HOSTS,
+                        PAGE_ARCHIVE_MODE)
+
+
+class TokenBucket:
+    """Корзина токенов: rate запросов в секунду в среднем, до burst подряд"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self):
+        """Резервирование токена. Возвращает, сколько секунд ждать до его появления"""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            # Токен может уйти в минус: следующие запросы встают в очередь за ним
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+class RateLimiter:
+    """Ограничение частоты запросов к хостам для всех браузеров и задач процесса"""
+
+    def __init__(self, rate=RATE_LIMIT_PER_SECOND, burst=RATE_LIMIT_BURST, jitter=RATE_LIMIT_JITTER,
+                 host_limits=RATE_LIMIT_HOSTS, enabled=RATE_LIMIT_ENABLED and PAGE_ARCHIVE_MODE != 'replay'):
+        self.logger = logging.getLogger('rate_limiter')
+        # При воспроизведении архива страницы отдает локальный сервер: ограничивать нечего
+        self.enabled = enabled
+        self.rate = rate
+        self.burst = burst
+        self.jitter = jitter
+        self.host_limits = host_limits  # {хост: (запросов в секунду, burst)}
+        self.buckets = {}
+        self.stats = {}
+        self.lock = threading.Lock()
+
+    def reserve(self, url_or_host):
+        """Место в очереди хоста. Возвращает время ожидания в секундах"""
+        host = self._host(url_or_host)
+        with self.lock:
+            bucket = self.buckets.get(host)
+            if bucket is None:
+                rate, burst = self.host_limits.get(host, (self.rate, self.burst))
+                bucket = self.buckets[host] = TokenBucket(rate, burst)
+                self.stats[host] = {'requests': 0, 'delayed': 0, 'total_wait': 0.0, 'max_wait': 0.0}
+
+        wait = bucket.reserve()
+        # Случайная добавка разводит воркеров, проснувшихся одновременно
+        if wait > 0 and self.jitter:
+            wait += random.uniform(0, self.jitter / bucket.rate)
+
+        with self.lock:
+            stats = self.stats[host]
+            stats['requests'] += 1
+            if wait > 0:
+                stats['delayed'] += 1
+                stats['total_wait'] += wait
+                stats['max_wait'] = max(stats['max_wait'], wait)
+        return wait
+
+    def acquire(self, url_or_host):
+        """Ожидание разрешения на запрос к хосту. Возвращает время ожидания"""
+        if not self.enabled:
+            return 0.0
+        wait = self.reserve(url_or_host)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, url_or_host):
+        """acquire для asyncio-кода"""
+        if not self.enabled:
+            return 0.0
+        wait = self.reserve(url_or_host)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def get_statistics(self):
+        """Статистика ожиданий по хостам"""
+        with self.lock:
+            return {
+                host: {
+                    **stats,
+                    'avg_wait': stats['total_wait'] / stats['requests'] if stats['requests'] else 0.0
+                }
+                for host, stats in self.stats.items()
+            }
+
+    def _host(self, url_or_host):
+        if '://' not in url_or_host:
+            return url_or_host
+        return urlsplit(url_or_host).hostname or url_or_host
+
+
+# Общий ограничитель процесса: одна очередь на хост для всех задач
+_shared_limiter = None
+_shared_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter():
+    """Получение общего ограничителя частоты запросов"""
+    global _shared_limiter
+    with _shared_limiter_lock:
+        if _shared_limiter is None:
+            _shared_limiter = RateLimiter()
+        return _shared_limiter
@@ -0,0 +1,151 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+from src.config import (RESULT_CACHE_FILE, RESULT_CACHE_TTL, RESULT_CACHE_MAX_ENTRIES,
+                        RESULT_CACHE_STATUSES, RESULT_CACHE_SELLER_TTL)
+
+# Заглушки ненайденных полей: такой результат неполный и в кэш не попадает
+MISSING_VALUES = ('Не найдено', 'Название не найдено', 'Компания не найдена')
+
+
+def is_complete_result(result):
+    """Найдены и название товара, и компания продавца"""
+    product_name = result.get('product_name') or 'Не найдено'
+    company_name = result.get('company_name') or 'Не найдено'
+    return (product_name not in MISSING_VALUES and not product_name.startswith('Ошибка:')
+            and company_name not in MISSING_VALUES)
+
+
+class ResultCache:
+    """Кэш результатов парсинга товаров на диске (SQLite).
+
+    Ключ - ID товара из URL, значение - словарь результата и время записи.
+    Отдельная таблица хранит юридические названия продавцов по ID продавца.
+    """
+
+    def __init__(self, path=RESULT_CACHE_FILE, ttl=RESULT_CACHE_TTL, max_entries=RESULT_CACHE_MAX_ENTRIES,
+                 seller_ttl=RESULT_CACHE_SELLER_TTL):
+        self.logger = logging.getLogger('result_cache')
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.seller_ttl = seller_ttl
+        self.lock = threading.Lock()
+
+        # Одно соединение на процесс: запросы из воркеров сериализуются блокировкой
+        self.connection = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        with self.lock, self.connection:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("""
+                CREATE TABLE IF NOT EXISTS products (
+                    product_id TEXT PRIMARY KEY,
+                    result TEXT NOT NULL,
+                    cached_at REAL NOT NULL
+                )
+            """)
+            self.connection.execute("CREATE INDEX IF NOT EXISTS products_cached_at ON products (cached_at)")
+            self.connection.execute("""
+                CREATE TABLE IF NOT EXISTS sellers (
+                    seller_id TEXT PRIMARY KEY,
+                    company_name TEXT NOT NULL,
+                    cached_at REAL NOT NULL
+                )
+            """)
+        self.prune()
+
+    def get(self, product_id):
+        """Результат товара или None, если записи нет или она устарела"""
+        if not product_id:
+            return None
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT result, cached_at FROM products WHERE product_id = ?", (product_id,)
+            ).fetchone()
+        if row is None or time.time() - row[1] > self.ttl:
+            return None
+        return json.loads(row[0])
+
+    def put(self, product_id, result):
+        """Сохранение результата. Ошибки, блокировки и неполные результаты не кэшируются"""
+        if not product_id or result.get('status') not in RESULT_CACHE_STATUSES:
+            return
+        if not is_complete_result(result):
+            return
+        record = {
+            'product_name': result.get('product_name', 'Не найдено'),
+            'company_name': result.get('company_name', 'Не найдено'),
+            'image_url': result.get('image_url', 'Не найдено'),
+            'status': result.get('status')
+        }
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO products (product_id, result, cached_at) VALUES (?, ?, ?)",
+                (product_id, json.dumps(record, ensure_ascii=False), time.time())
+            )
+
+    def get_seller(self, seller_id):
+        """Юридическое название продавца или None"""
+        if not seller_id:
+            return None
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT company_name, cached_at FROM sellers WHERE seller_id = ?", (seller_id,)
+            ).fetchone()
+        if row is None or time.time() - row[1] > self.seller_ttl:
+            return None
+        return row[0]
+
+    def put_seller(self, seller_id, company_name):
+        """Сохранение юридического названия продавца"""
+        if not seller_id or not company_name:
+            return
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO sellers (seller_id, company_name, cached_at) VALUES (?, ?, ?)",
+                (seller_id, company_name, time.time())
+            )
+
+    def prune(self):
+        """Удаление устаревших записей и самых старых сверх лимита"""
+        with self.lock, self.connection:
+            expired = self.connection.execute(
+                "DELETE FROM products WHERE cached_at < ?", (time.time() - self.ttl,)
+            ).rowcount
+            evicted = self.connection.execute("""
+                DELETE FROM products WHERE product_id IN (
+                    SELECT product_id FROM products ORDER BY cached_at DESC LIMIT -1 OFFSET ?
+                )
+            """, (self.max_entries,)).rowcount
+            expired += self.connection.execute(
+                "DELETE FROM sellers WHERE cached_at < ?", (time.time() - self.seller_ttl,)
+            ).rowcount
+        if expired or evicted:
+            self.logger.info(f"Кэш товаров: удалено устаревших {expired}, вытеснено {evicted}")
+
+    def get_statistics(self):
+        """Размер кэша"""
+        with self.lock:
+            count = self.connection.execute("SELECT COUNT(*) FROM products").fetchone()[0]
+            sellers = self.connection.execute("SELECT COUNT(*) FROM sellers").fetchone()[0]
+        return {'entries': count, 'sellers': sellers, 'max_entries': self.max_entries, 'ttl': self.ttl}
+
+    def close(self):
+        """Закрытие соединения с базой"""
+        with self.lock:
+            self.connection.close()
+
+
+# Общий кэш процесса: одно соединение для всех задач бота
+_shared_cache = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_result_cache():
+    """Получение общего кэша результатов"""
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = ResultCache()
+        return _shared_cache
@@ -0,0 +1,122 @@
+"""
+Локальный стенд Ozon: отдает записанные ответы по пути URL.
+
+Каталог записей содержит manifest.json вида
+{"/product/name-123/": {"file": "name-123.html", "status": 200, "content_type": "text/html; charset=utf-8"}}
+
+Задержка ответа latency + случайная добавка до jitter секунд имитирует сеть и сервер.
+
+Запуск из командной строки:
+    python -m src.utils.standin_server records/ --port 8080 --latency 0.3 --jitter 0.2
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+logger = logging.getLogger('standin_server')
+
+
+class StandinRequestHandler(BaseHTTPRequestHandler):
+    """Ответ из записей стенда или 404"""
+
+    protocol_version = 'HTTP/1.1'  # keep-alive, как у настоящего сервера
+
+    def do_GET(self):
+        self.server.delay()
+        record = self.server.find_record(self.path)
+        if record is None:
+            self._send(404, b'not found', 'text/plain; charset=utf-8')
+            return
+        status, body, content_type = record
+        self._send(status, body, content_type)
+
+    def _send(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+
+class StandinServer(ThreadingHTTPServer):
+    """HTTP-сервер с записанными ответами Ozon"""
+
+    daemon_threads = True
+
+    def __init__(self, records_dir, host='127.0.0.1', port=0, latency=0.0, jitter=0.0):
+        super().__init__((host, port), StandinRequestHandler)
+        self.records_dir = records_dir
+        self.latency = latency
+        self.jitter = jitter
+        self.records = {}
+        self.thread = None
+        manifest_path = os.path.join(records_dir, 'manifest.json') if records_dir else None
+        if manifest_path and os.path.exists(manifest_path):
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                self.records = json.load(f)
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def delay(self):
+        """Имитация задержки сети и сервера"""
+        delay = self.latency + (random.uniform(0, self.jitter) if self.jitter else 0)
+        if delay > 0:
+            time.sleep(delay)
+
+    def find_record(self, path):
+        """(статус, тело, content-type) для пути запроса или None"""
+        entry = self.records.get(path) or self.records.get(path.split('?', 1)[0])
+        if entry is None:
+            return None
+        with open(os.path.join(self.records_dir, entry['file']), 'rb') as f:
+            body = f.read()
+        return entry.get('status', 200), body, entry.get('content_type', 'text/html; charset=utf-8')
+
+    def record_count(self):
+        """Число записанных ответов"""
+        return len(self.records)
+
+    def start(self):
+        """Запуск в фоновом потоке. Возвращает базовый URL стенда"""
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        logger.info(f"Стенд Ozon запущен: {self.base_url} ({self.record_count()} записей)")
+        return self.base_url
+
+    def stop(self):
+        """Остановка сервера"""
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Локальный стенд Ozon с записанными ответами")
+    arg_parser.add_argument('records_dir', help="Каталог с manifest.json и файлами ответов")
+    arg_parser.add_argument('--host', default='127.0.0.1')
+    arg_parser.add_argument('--port', type=int, default=8080)
+    arg_parser.add_argument('--latency', type=float, default=0.0, help="Задержка ответа (секунды)")
+    arg_parser.add_argument('--jitter', type=float, default=0.0, help="Случайная добавка к задержке (секунды)")
+    args = arg_parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    server = StandinServer(args.records_dir, args.host, args.port, args.latency, args.jitter)
+    logger.info(f"Стенд Ozon: {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from src.config import TRACE_ENABLED, TRACE_DIR, TRACE_MAX_EVENTS
+
+# Общий пустой контекст: выключенная трассировка не создает объектов на каждый этап
+_NO_SPAN = nullcontext()
+
+
+class Tracer:
+    """Трассировка этапов разбора в формате Chrome trace events.
+
+    События ("ph": "X") пишутся потоково в JSON-массив, который открывается
+    в chrome://tracing или ui.perfetto.dev. Каждое событие помечено воркером
+    и URL из контекста потока. Файл открывается при начале первой задачи и
+    закрывается после окончания последней
+    """
+
+    def __init__(self, enabled=TRACE_ENABLED, trace_dir=TRACE_DIR, max_events=TRACE_MAX_EVENTS):
+        self.logger = logging.getLogger('tracing')
+        self.enabled = enabled
+        self.trace_dir = trace_dir
+        self.max_events = max_events
+        self.file = None
+        self.path = None
+        self.jobs = 0
+        self.events_written = 0
+        self.named_threads = set()
+        self.local = threading.local()
+        self.pid = os.getpid()
+        self.origin = time.perf_counter()
+        self.lock = threading.Lock()
+
+    def begin_job(self, name):
+        """Начало задачи: открывает файл трассировки, если он еще не открыт. Возвращает путь"""
+        if not self.enabled:
+            return None
+        with self.lock:
+            self.jobs += 1
+            if self.file is None:
+                try:
+                    os.makedirs(self.trace_dir, exist_ok=True)
+                    self.path = os.path.join(self.trace_dir, f"trace_{name}.json")
+                    self.file = open(self.path, 'w', encoding='utf-8')
+                    self.file.write('[\n')
+                    self.events_written = 0
+                    self.named_threads = set()
+                    self.logger.info(f"Трассировка этапов: {os.path.abspath(self.path)}")
+                except OSError as e:
+                    self.logger.error(f"Не удалось открыть файл трассировки: {str(e)}")
+                    self.file = None
+            return self.path
+
+    def end_job(self):
+        """Окончание задачи: после последней задачи файл закрывается"""
+        if not self.enabled:
+            return
+        with self.lock:
+            self.jobs = max(0, self.jobs - 1)
+            if self.jobs or self.file is None:
+                return
+            # Закрывающая скобка после последнего события без запятой
+            self.file.write(json.dumps(self._process_name_event(), ensure_ascii=False) + '\n]\n')
+            self.file.close()
+            self.file = None
+            self.logger.info(f"Трассировка сохранена: {self.events_written} событий в {self.path}")
+
+    @contextmanager
+    def context(self, worker=None, url=None):
+        """Воркер и URL для событий текущего потока"""
+        previous = getattr(self.local, 'tags', None)
+        self.local.tags = {'worker': worker, 'url': url}
+        try:
+            yield
+        finally:
+            self.local.tags = previous
+
+    def span(self, name, **args):
+        """Этап разбора: with get_tracer().span('driver.get'): ..."""
+        if not self.enabled or self.file is None:
+            return _NO_SPAN
+        return self._span(name, args)
+
+    @contextmanager
+    def _span(self, name, args):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._write_event(name, started, time.perf_counter(), args)
+
+    def _write_event(self, name, started, finished, args):
+        tags = getattr(self.local, 'tags', None) or {}
+        thread = threading.current_thread()
+        event = {
+            'name': name,
+            'cat': name.split('.', 1)[0],
+            'ph': 'X',
+            'ts': round((started - self.origin) * 1e6, 1),
+            'dur': round((finished - started) * 1e6, 1),
+            'pid': self.pid,
+            'tid': thread.ident,
+            'args': {**{key: value for key, value in tags.items() if value is not None}, **args}
+        }
+        with self.lock:
+            if self.file is None or self.events_written >= self.max_events:
+                return
+            lines = []
+            # Имя потока в просмотрщике: воркер, если известен
+            if thread.ident not in self.named_threads:
+                self.named_threads.add(thread.ident)
+                label = f"Воркер {tags['worker']}" if tags.get('worker') is not None else thread.name
+                lines.append(json.dumps({'name': 'thread_name', 'ph': 'M', 'pid': self.pid, 'tid': thread.ident,
+                                         'args': {'name': label}}, ensure_ascii=False))
+            lines.append(json.dumps(event, ensure_ascii=False, default=str))
+            self.file.write(',\n'.join(lines) + ',\n')
+            self.events_written += 1
+
+    def _process_name_event(self):
+        return {'name': 'process_name', 'ph': 'M', 'pid': self.pid, 'tid': 0, 'args': {'name': 'ozon_parser'}}
+
+
+def traced(name):
+    """Декоратор этапа: метод выполняется внутри span(name)"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            tracer = _tracer or get_tracer()
+            if not tracer.enabled or tracer.file is None:
+                return func(*args, **kwargs)
+            with tracer._span(name, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# Общий трассировщик процесса: этапы всех задач в одном файле
+_tracer = None
+_tracer_lock = threading.Lock()
+
+
+def get_tracer():
+    """Получение общего трассировщика"""
+    global _tracer
+    with _tracer_lock:
+        if _tracer is None:
+            _tracer = Tracer()
+        return _tracer
@@ -0,0 +1,54 @@
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.utils.rate_limiter import RateLimiter
+from src.utils.standin_server import StandinServer
+
+STANDIN_RECORDS = os.path.join(os.path.dirname(__file__), 'fixtures', 'standin')
+
+
+class CountingStandinServer(StandinServer):
+    """Стенд, запоминающий наибольшее число одновременных запросов"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.paths = []
+        self.counter_lock = threading.Lock()
+
+    def delay(self):
+        # Задержка ответа - время, в течение которого запрос считается выполняющимся
+        with self.counter_lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            super().delay()
+        finally:
+            with self.counter_lock:
+                self.in_flight -= 1
+
+    def find_record(self, path):
+        with self.counter_lock:
+            self.paths.append(path)
+        return super().find_record(path)
+
+
+@pytest.fixture
+def standin():
+    """Локальный стенд Ozon с записанными ответами tests/fixtures/standin"""
+    server = CountingStandinServer(STANDIN_RECORDS, latency=0.2)
+    server.start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def no_rate_limit():
+    """Ограничитель без ожиданий: стенд локальный"""
+    return RateLimiter(enabled=False)
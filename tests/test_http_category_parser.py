@@ -0,0 +1,91 @@
+import json
+
+import pytest
+
+from src.config import TOTAL_LINKS
+from src.parser.http_category_parser import HttpCategoryParser
+
+CATEGORY_URL = "https://www.ozon.ru/category/elektrochayniki-10001/"
+CATEGORY_PATH = "/category/elektrochayniki-10001/"
+
+
+def listing(numbers):
+    """Ожидаемые ссылки и изображения карточек tests/fixtures/standin/category-*"""
+    return {
+        f"https://www.ozon.ru/product/tovar-{n}-{2000 + n}/": f"https://ir.ozone.ru/s3/multimedia-1/wc250/{2000 + n}.jpg"
+        for n in numbers
+    }
+
+
+@pytest.fixture
+def crawl(standin, no_rate_limit, tmp_path, monkeypatch):
+    # Ссылки сохраняются в LINKS_OUTPUT_FILE текущего каталога
+    monkeypatch.chdir(tmp_path)
+
+    def run(**kwargs):
+        parser = HttpCategoryParser(CATEGORY_URL, base_url=standin.base_url, **kwargs)
+        parser.rate_limiter = no_rate_limit
+        return parser, parser.run()
+    return run
+
+
+def test_collects_all_pages_in_listing_order(crawl, tmp_path):
+    parser, (success, links) = crawl(max_links=100)
+
+    assert success
+    # Рекламная карточка и повтор с первой страницы пропущены
+    assert links == listing(range(1, 21))
+    assert list(links) == list(listing(range(1, 21)))
+    assert [tile['sku'] for tile in parser.tiles] == [str(2000 + n) for n in range(1, 21)]
+    assert parser.tiles[0]['title'] == 'Термопот 1'
+    # Волна после первой страницы - страницы 2-9; начиная с 6-й стенд отдает первую
+    # страницу (запись без query), и повтор карточек завершает сбор
+    assert parser.pages_fetched == 9
+    with open(tmp_path / 'links.json', encoding='utf-8') as f:
+        assert json.load(f) == links
+
+
+def test_pages_are_fetched_concurrently(crawl, standin):
+    crawl(max_links=100, concurrency=8)
+
+    requested = [path for path in standin.paths if path.startswith(CATEGORY_PATH)]
+    assert requested[0] == CATEGORY_PATH
+    assert f"{CATEGORY_PATH}?page=5" in requested
+    # После первой страницы остальные запрашиваются волной
+    assert standin.max_in_flight > 1
+
+
+def test_truncates_to_max_links_like_link_parser(crawl):
+    # OzonLinkParser.run возвращает первые TOTAL_LINKS ссылок в порядке ленты
+    parser, (success, links) = crawl(max_links=10)
+
+    assert success
+    assert links == listing(range(1, 11))
+    assert list(links) == list(listing(range(1, 11)))
+    assert len(parser.tiles) == 10
+
+
+def test_max_links_defaults_to_total_links():
+    assert HttpCategoryParser(CATEGORY_URL).max_links == TOTAL_LINKS
+
+
+def test_streams_links_and_stops_with_receiver(crawl):
+    received = []
+
+    def on_links(links):
+        received.extend(links)
+        return len(received) < 8
+
+    parser, (success, links) = crawl(max_links=100, on_links=on_links, concurrency=1)
+
+    assert success
+    assert received == list(links)
+    assert 8 <= len(received) < 20
+
+
+def test_missing_category_fails(standin, no_rate_limit, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    parser = HttpCategoryParser("https://www.ozon.ru/category/net-na-stende-1/", base_url=standin.base_url)
+    parser.rate_limiter = no_rate_limit
+
+    assert parser.run() == (False, {})
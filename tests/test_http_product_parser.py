@@ -0,0 +1,86 @@
+import pytest
+
+from src.parser.http_product_parser import HttpProductParser
+from src.utils.result_cache import ResultCache
+
+OZON = "https://www.ozon.ru"
+
+
+@pytest.fixture
+def parser(standin, no_rate_limit):
+    http_parser = HttpProductParser(base_url=standin.base_url)
+    http_parser.rate_limiter = no_rate_limit
+    return http_parser
+
+
+def test_product_in_stock_from_html_widget_states(parser):
+    url = f"{OZON}/product/chaynik-elektricheskiy-1001/"
+    resolved, unresolved = parser.run([url])
+
+    assert unresolved == []
+    assert resolved[url] == {
+        'product_name': 'Чайник электрический 1,7 л, стальной',
+        'company_name': 'ООО "Ромашка"',
+        'image_url': 'https://ir.ozone.ru/s3/multimedia-1/wc1000/1001.jpg',
+        'status': 'success'
+    }
+
+
+def test_product_from_entrypoint_json(parser):
+    url = f"{OZON}/product/utyug-parovoy-1002/"
+    resolved, _ = parser.run([url])
+
+    assert resolved[url]['product_name'] == 'Утюг паровой 2400 Вт'
+    assert resolved[url]['company_name'] == 'ИП Иванов Иван Иванович'
+    assert resolved[url]['image_url'] == 'https://ir.ozone.ru/s3/multimedia-2/wc1000/1002.jpg'
+
+
+def test_out_of_stock_uses_shop_name(parser):
+    url = f"{OZON}/product/nabor-nozhey-1003/"
+    resolved, _ = parser.run([url])
+
+    assert resolved[url] == {
+        'product_name': 'Набор ножей, 5 предметов',
+        'company_name': 'Кухня',
+        'image_url': 'Изображение не найдено',
+        'status': 'out_of_stock'
+    }
+
+
+@pytest.mark.parametrize('path', [
+    '/product/skovoroda-1004/',  # Юридическое название только в тултипе
+    '/product/kastryulya-1005/',  # Нет состояний виджетов
+    '/product/blokirovka-1006/',  # Блокировка (403)
+    '/product/net-na-stende-1007/'  # Нет записи (404)
+])
+def test_falls_back_to_browser(parser, path):
+    url = OZON + path
+    resolved, unresolved = parser.run([url])
+
+    assert resolved == {}
+    assert unresolved == [url]
+
+
+def test_seller_cache_completes_missing_legal_name(standin, no_rate_limit, tmp_path):
+    cache = ResultCache(str(tmp_path / 'cache.sqlite3'))
+    http_parser = HttpProductParser(base_url=standin.base_url, seller_cache=cache)
+    http_parser.rate_limiter = no_rate_limit
+    first, second = f"{OZON}/product/chaynik-elektricheskiy-1001/", f"{OZON}/product/skovoroda-1004/"
+
+    http_parser.run([first])
+    assert cache.get_seller('501') == 'ООО "Ромашка"'
+
+    cache.put_seller('502', 'АО "Посуда"')
+    resolved, unresolved = http_parser.run([second])
+    assert unresolved == []
+    assert resolved[second]['company_name'] == 'АО "Посуда"'
+    assert resolved[second]['image_url'] == 'https://ir.ozone.ru/s3/multimedia-3/wc1000/1004.jpg'
+
+
+def test_pages_are_fetched_concurrently(parser, standin):
+    urls = [OZON + path for path in ('/product/chaynik-elektricheskiy-1001/', '/product/utyug-parovoy-1002/',
+                                     '/product/nabor-nozhey-1003/', '/product/skovoroda-1004/')]
+    resolved, unresolved = parser.run(urls)
+
+    assert len(resolved) == 3 and len(unresolved) == 1
+    assert standin.max_in_flight > 1
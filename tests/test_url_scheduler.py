@@ -0,0 +1,54 @@
+import threading
+
+from src.parser.url_scheduler import UrlScheduler
+
+
+def queues(scheduler):
+    return {worker_id: list(queue) for worker_id, queue in scheduler.local_queues.items()}
+
+
+def test_abandoned_worker_urls_go_to_live_workers():
+    scheduler = UrlScheduler(3)
+    scheduler.add_urls([f"url-{i}" for i in range(6)])
+    in_flight = scheduler.next_url(1)
+
+    assert scheduler.abandon_worker(1) == []
+    assert queues(scheduler)[1] == []
+    assert sorted(sum(queues(scheduler).values(), [])) == sorted(f"url-{i}" for i in range(6))
+    assert in_flight in queues(scheduler)[2] + queues(scheduler)[3]
+
+
+def test_requeue_skips_abandoned_worker():
+    scheduler = UrlScheduler(2)
+    scheduler.abandon_worker(1)
+    url = 'url-0'
+    scheduler.in_flight[2].add(url)
+
+    assert scheduler.requeue(2, url)
+    assert queues(scheduler) == {1: [], 2: [url]}
+
+
+def test_streaming_input_skips_abandoned_worker():
+    scheduler = UrlScheduler(3, streaming=True)
+    scheduler.abandon_worker(2)
+    for i in range(4):
+        scheduler.add_url(f"url-{i}")
+
+    assert queues(scheduler) == {1: ['url-0', 'url-2'], 2: [], 3: ['url-1', 'url-3']}
+
+
+def test_streaming_input_rejected_when_all_workers_exited():
+    scheduler = UrlScheduler(2, streaming=True, capacity=3)
+    for i in range(3):
+        assert scheduler.add_url(f"url-{i}")
+
+    results = []
+    producer = threading.Thread(target=lambda: results.append(scheduler.add_url('url-3', poll_interval=5)))
+    producer.start()
+    scheduler.abandon_worker(1)
+    scheduler.abandon_worker(2)
+    producer.join(timeout=2)
+
+    assert not producer.is_alive()
+    assert results == [False]
+    assert scheduler.add_url('url-4') is False